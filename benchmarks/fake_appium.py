@@ -0,0 +1,566 @@
+"""
+A WebDriver-protocol stand-in for an Appium server.
+
+The fake backend answers the W3C and Appium commands the MCP tools use with a
+generated UI tree, so tools can be driven end to end without a device. Per
+command latency, per character typing latency, tree depth and element counts
+are configurable, and every command is counted along with the bytes it sent
+and received.
+
+The backend can be served over HTTP with FakeAppiumServer, or used by a
+WebDriver client in-process through InProcessConnection.
+"""
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib import parse
+
+from appium.webdriver.appium_connection import AppiumConnection
+
+try:
+    from appium.webdriver.client_config import AppiumClientConfig
+except ImportError:  # Appium-Python-Client < 4
+    AppiumClientConfig = None
+
+# Key identifying a web element reference in W3C responses
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+APP_PACKAGE = "com.example.app"
+
+# The screens behind the login screen when navigation is on:
+# screen -> [(resource id, widget class, text, screen a tap opens)]
+SCREENS = {
+    "home": [
+        ("title", "TextView", "Home", None),
+        ("settings", "Button", "Settings", "settings"),
+        ("profile", "Button", "Profile", "profile"),
+    ],
+    "settings": [
+        ("title", "TextView", "Settings", None),
+        ("notifications", "Switch", "Notifications", None),
+        ("about", "Button", "About", "about"),
+    ],
+    "profile": [
+        ("title", "TextView", "Profile", None),
+        ("name", "EditText", "", None),
+        ("save", "Button", "Save", None),
+    ],
+    "about": [
+        ("title", "TextView", "About", None),
+        ("version", "TextView", "Version 1.0", None),
+    ],
+}
+
+
+class FakeUI:
+    """A generated login screen with a list of repeated items below it.
+
+    The fixed elements are a title, username and password fields and a login
+    button. `item_count` list items share the resource id
+    `com.example.app:id/item`, so one locator matches all of them. The
+    elements are nested `depth` layouts deep, which makes the page source grow
+    the way a real screen hierarchy does.
+
+    With `navigation`, tapping the login button opens the SCREENS behind it,
+    and back returns to the previous screen. Elements of a screen that is no
+    longer shown are stale. Each session then has a UI of its own, like
+    separate devices.
+    """
+
+    def __init__(self, item_count: int = 50, depth: int = 5, navigation: bool = False):
+        self.item_count = item_count
+        self.depth = depth
+        self.navigation = navigation
+        self.stack = ["login"]
+        self.targets: Dict[str, str] = {}
+        self.focused: Optional[str] = None
+        self.texts: Dict[str, str] = {}
+        self._source = None
+        self._root = None
+        self._by_id: Dict[str, ET.Element] = {}
+
+    @property
+    def screen(self) -> str:
+        return self.stack[-1]
+
+    def _nodes(self) -> List[Dict]:
+        if self.screen != "login":
+            return [
+                {"class": f"android.widget.{widget}", "resource-id": f"{APP_PACKAGE}:id/{resource_id}",
+                 "text": text, "content-desc": text, "target": target,
+                 "clickable": "false" if widget == "TextView" else "true"}
+                for resource_id, widget, text, target in SCREENS[self.screen]
+            ]
+        nodes = [
+            {"class": "android.widget.TextView", "resource-id": f"{APP_PACKAGE}:id/title",
+             "text": "Welcome", "content-desc": "", "clickable": "false"},
+            {"class": "android.widget.EditText", "resource-id": f"{APP_PACKAGE}:id/username",
+             "text": "", "content-desc": "Username", "clickable": "true"},
+            {"class": "android.widget.EditText", "resource-id": f"{APP_PACKAGE}:id/password",
+             "text": "", "content-desc": "Password", "clickable": "true"},
+            {"class": "android.widget.Button", "resource-id": f"{APP_PACKAGE}:id/login",
+             "text": "Log in", "content-desc": "Login", "clickable": "true",
+             "target": "home" if self.navigation else None},
+        ]
+        for index in range(self.item_count):
+            nodes.append({
+                "class": "android.widget.TextView", "resource-id": f"{APP_PACKAGE}:id/item",
+                "text": f"Item {index}", "content-desc": f"Item {index}", "clickable": "true",
+            })
+        return nodes
+
+    def root(self) -> ET.Element:
+        """The UI hierarchy; element ids are stored in the `element-id` attribute."""
+        if self._root is None:
+            root = ET.Element("hierarchy", {"rotation": "0"})
+            parent = root
+            for level in range(self.depth):
+                parent = ET.SubElement(parent, "android.widget.FrameLayout", {
+                    "class": "android.widget.FrameLayout", "resource-id": "", "text": "",
+                    "content-desc": "", "clickable": "false", "bounds": "[0,0][1080,2340]",
+                    "element-id": f"layout-{level}",
+                })
+            prefix = "el" if self.screen == "login" else self.screen
+            self.targets = {}
+            for index, node in enumerate(self._nodes()):
+                top = 200 + index * 120
+                attributes = dict(node)
+                target = attributes.pop("target", None)
+                attributes.update({
+                    "enabled": "true", "displayed": "true", "package": APP_PACKAGE,
+                    "bounds": f"[40,{top}][1040,{top + 100}]", "element-id": f"{prefix}-{index}",
+                })
+                if target:
+                    self.targets[attributes["element-id"]] = target
+                ET.SubElement(parent, node["class"], attributes)
+            self._by_id = {node.get("element-id"): node for node in root.iter() if node.get("element-id")}
+            self._root = root
+        return self._root
+
+    def source(self) -> str:
+        if self._source is None:
+            root = self.root()
+            for node in root.iter():
+                element_id = node.get("element-id")
+                if element_id in self.texts:
+                    node.set("text", self.texts[element_id])
+            self._source = "<?xml version='1.0' encoding='UTF-8'?>" + ET.tostring(root, encoding="unicode")
+        return self._source
+
+    def set_text(self, element_id: str, text: str) -> None:
+        self.texts[element_id] = text
+        self._source = None
+
+    def element(self, element_id: str) -> Optional[ET.Element]:
+        self.root()
+        return self._by_id.get(element_id)
+
+    def show(self, stack: List[str]) -> None:
+        self.stack = stack
+        self._root = None
+        self._source = None
+
+    def tap(self, element_id: str) -> None:
+        self.root()
+        if element_id in self.targets:
+            self.show(self.stack + [self.targets[element_id]])
+
+    def back(self) -> None:
+        if len(self.stack) > 1:
+            self.show(self.stack[:-1])
+
+    def find(self, using: str, value: str) -> List[ET.Element]:
+        root = self.root()
+        if using == "id":
+            matches = [node for node in root.iter() if node.get("resource-id") in (value, f"{APP_PACKAGE}:id/{value}")]
+        elif using == "accessibility id":
+            matches = [node for node in root.iter() if node.get("content-desc") == value]
+        elif using == "class name":
+            matches = [node for node in root.iter() if node.get("class") == value]
+        elif using == "xpath":
+            matches = self._xpath(value)
+        elif using == "-android uiautomator":
+            matches = self._ui_selector(value)
+        else:
+            raise ValueError(f"Locator strategy '{using}' is not supported")
+        return [node for node in matches if node.get("element-id")]
+
+    def _xpath(self, value: str) -> List[ET.Element]:
+        # ElementTree supports a subset of XPath relative to the root element
+        expression = "." + value if value.startswith("/") else value
+        wrapper = ET.Element("root")
+        wrapper.append(self.root())
+        try:
+            matches = wrapper.findall(expression)
+        except SyntaxError as e:
+            raise ValueError(f"Unsupported XPath '{value}': {e}")
+        finally:
+            wrapper.remove(self.root())
+        return matches
+
+    def _ui_selector(self, value: str) -> List[ET.Element]:
+        attributes = {"resourceId": "resource-id", "text": "text", "description": "content-desc",
+                      "className": "class"}
+        criteria = re.findall(
+            r'\.(resourceId|text|description|className)(Contains)?\("([^"]*)"\)', value
+        )
+        if not criteria:
+            raise ValueError(f"Unsupported UiSelector '{value}'")
+
+        def matches(node, name, contains, expected):
+            actual = node.get(attributes[name]) or ""
+            return expected in actual if contains else actual == expected
+
+        return [
+            node for node in self.root().iter()
+            if all(matches(node, *criterion) for criterion in criteria)
+        ]
+
+
+class FakeAppiumBackend:
+    """Answers WebDriver commands and records what was asked of it."""
+
+    # A minimal valid PNG, padded to the configured screenshot size
+    PNG = base64.b64decode(
+        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+    )
+
+    def __init__(self, latency: float = 0.0, item_count: int = 50, depth: int = 5,
+                 screenshot_bytes: int = 200_000, command_latency: Optional[Dict[str, float]] = None,
+                 typing_latency: float = 0.0, navigation: bool = False):
+        self.latency = latency
+        self.command_latency = dict(command_latency or {})
+        # Added per character sent with send_keys, which devices type one key at a time
+        self.typing_latency = typing_latency
+        self.item_count = item_count
+        self.depth = depth
+        self.screenshot_bytes = screenshot_bytes
+        self.sessions: Dict[str, Dict] = {}
+        self.navigation = navigation
+        self._ui = FakeUI(item_count, depth, navigation)
+        self.session_uis: Dict[str, FakeUI] = {}
+        self._local = threading.local()
+        self.orientation = "PORTRAIT"
+        self.context = "NATIVE_APP"
+        self.clipboard = ""
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def ui(self) -> FakeUI:
+        """The UI of the session whose command is being answered, or of the first session."""
+        return getattr(self._local, "ui", None) or self._ui
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.commands: List[Tuple[str, str]] = []
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "commands": len(self.commands),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "by_command": [f"{method} {name}" for method, name in self.commands],
+            }
+
+    def handle(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        """Answer one WebDriver command; returns the HTTP status and JSON body."""
+        body = body or {}
+        # Strip base paths such as /wd/hub
+        match = re.search(r"/(session|status).*$", path.split("?", 1)[0])
+        path = match.group(0) if match else path
+        try:
+            name, status, value = self._dispatch(method, path, body)
+        finally:
+            self._local.ui = None
+
+        delay = self.command_latency.get(name, self.latency)
+        if name == "elementValue":
+            delay += self.typing_latency * len(body.get("text") or "".join(body.get("value", [])))
+        if delay:
+            time.sleep(delay)
+        response = {"value": value}
+        with self._lock:
+            self.commands.append((method, name))
+            self.bytes_in += len(json.dumps(body))
+            self.bytes_out += len(json.dumps(response))
+        return status, response
+
+    @staticmethod
+    def error(status: int, error: str, message: str) -> Tuple[int, Dict]:
+        return status, {"error": error, "message": message, "stacktrace": ""}
+
+    def _element_ref(self, node) -> Dict:
+        return {ELEMENT_KEY: node.get("element-id")}
+
+    def _dispatch(self, method: str, path: str, body: Dict) -> Tuple[str, int, object]:
+        if path == "/status":
+            return "status", 200, {"ready": True, "build": {"version": "2.0.0-fake"}}
+        if method == "POST" and path == "/session":
+            return ("newSession", 200) + (self._new_session(body),)
+
+        match = re.match(r"^/session/([^/]+)(/.*)?$", path)
+        if not match:
+            return ("unknown",) + self.error(404, "unknown command", f"Unknown path {path}")
+        session_id, rest = match.group(1), match.group(2) or ""
+        if session_id not in self.sessions:
+            return ("unknown",) + self.error(
+                404, "invalid session id", f"A session is either terminated or not started: {session_id}"
+            )
+        if method == "DELETE" and rest == "":
+            del self.sessions[session_id]
+            self.session_uis.pop(session_id, None)
+            return "deleteSession", 200, None
+        self._local.ui = self.session_uis.get(session_id)
+
+        element = re.match(r"^/element/([^/]+)(/.*)$", rest)
+        if element and rest not in ("/element/active",):
+            element_id, command = element.group(1), element.group(2)
+            node = self.ui.element(element_id)
+            if node is None:
+                return ("element" + command,) + self.error(404, "stale element reference", element_id)
+            return self._element_command(method, command, node, body)
+
+        routes = {
+            ("POST", "/element"): self._find_one,
+            ("POST", "/elements"): self._find_all,
+            ("GET", "/timeouts"): lambda b: {"implicit": 0, "pageLoad": 300000, "script": 30000},
+            ("POST", "/timeouts"): lambda b: None,
+            ("GET", "/source"): lambda b: self.ui.source(),
+            ("GET", "/screenshot"): lambda b: self._screenshot(),
+            ("POST", "/back"): lambda b: self.ui.back(),
+            ("GET", "/orientation"): lambda b: self.orientation,
+            ("POST", "/orientation"): self._set_orientation,
+            ("GET", "/context"): lambda b: self.context,
+            ("POST", "/context"): self._set_context,
+            ("GET", "/contexts"): lambda b: ["NATIVE_APP", "WEBVIEW_com.example.app"],
+            ("GET", "/window/rect"): lambda b: {"x": 0, "y": 0, "width": 1080, "height": 2340},
+            ("POST", "/actions"): lambda b: None,
+            ("DELETE", "/actions"): lambda b: None,
+            ("POST", "/execute/sync"): self._execute,
+            ("GET", "/appium/device/system_time"): lambda b: "2024-01-01T12:00:00+00:00",
+            ("POST", "/appium/device/system_time"): lambda b: "2024-01-01T12:00:00+00:00",
+            ("POST", "/appium/device/press_keycode"): lambda b: None,
+            ("POST", "/appium/device/activate_app"): lambda b: None,
+            ("POST", "/appium/device/terminate_app"): self._terminate_app,
+            ("POST", "/appium/device/install_app"): lambda b: None,
+            ("POST", "/appium/device/remove_app"): lambda b: True,
+            ("GET", "/appium/device/current_package"): lambda b: APP_PACKAGE,
+            ("POST", "/appium/device/hide_keyboard"): lambda b: None,
+        }
+        handler = routes.get((method, rest))
+        name = rest.strip("/") or "session"
+        if handler is None:
+            return (name,) + self.error(404, "unknown command", f"Unknown command {method} {rest}")
+        try:
+            return name, 200, handler(body)
+        except LookupError as e:
+            return (name,) + self.error(404, "no such element", str(e))
+        except ValueError as e:
+            return (name,) + self.error(400, "invalid selector", str(e))
+
+    def _new_session(self, body: Dict) -> Dict:
+        requested = body.get("capabilities", {}).get("alwaysMatch", {})
+        capabilities = {key.split(":", 1)[-1]: value for key, value in requested.items()}
+        capabilities.setdefault("appPackage", APP_PACKAGE)
+        capabilities.setdefault("appActivity", ".MainActivity")
+        session_id = str(uuid.uuid4())
+        self.sessions[session_id] = capabilities
+        if self.navigation:
+            # The first session drives the default UI; later ones get their own
+            in_use = self._ui in self.session_uis.values()
+            self.session_uis[session_id] = FakeUI(self.item_count, self.depth, True) if in_use else self._ui
+        return {"sessionId": session_id, "capabilities": capabilities}
+
+    def _find_one(self, body: Dict):
+        matches = self.ui.find(body.get("using"), body.get("value"))
+        if not matches:
+            raise LookupError(f"An element could not be located using {body.get('using')}={body.get('value')}")
+        return self._element_ref(matches[0])
+
+    def _find_all(self, body: Dict):
+        return [self._element_ref(node) for node in self.ui.find(body.get("using"), body.get("value"))]
+
+    def _screenshot(self) -> str:
+        padding = max(self.screenshot_bytes - len(self.PNG), 0)
+        return base64.b64encode(self.PNG + b"\0" * padding).decode("ascii")
+
+    def _terminate_app(self, body: Dict) -> bool:
+        self.ui.show(["login"])
+        return True
+
+    def _set_orientation(self, body: Dict):
+        self.orientation = body.get("orientation", self.orientation)
+
+    def _set_context(self, body: Dict):
+        self.context = body.get("name", self.context)
+
+    def _execute(self, body: Dict):
+        """The `mobile:` extensions text entry and app restarts use; other scripts do nothing."""
+        script = body.get("script")
+        arguments = (body.get("args") or [{}])[0]
+        if script == "mobile: replaceElementValue":
+            if self.ui.element(arguments.get("elementId")) is None:
+                raise LookupError(f"No element with id {arguments.get('elementId')}")
+            self.ui.set_text(arguments["elementId"], arguments.get("text", ""))
+        elif script == "mobile: setClipboard":
+            self.clipboard = base64.b64decode(arguments.get("content", "")).decode("utf-8")
+        elif script == "mobile: pressKey" and arguments.get("keycode") == 279 and self.ui.focused:
+            # KEYCODE_PASTE inserts the clipboard into the focused field
+            node = self.ui.element(self.ui.focused)
+            current = self.ui.texts.get(self.ui.focused, node.get("text", ""))
+            self.ui.set_text(self.ui.focused, current + self.clipboard)
+        elif script == "mobile: terminateApp":
+            return self._terminate_app(arguments)
+        return None
+
+    def _element_command(self, method: str, command: str, node, body: Dict):
+        name = "element" + command.split("/")[1].capitalize()
+        bounds = [int(n) for n in re.findall(r"\d+", node.get("bounds", "[0,0][0,0]"))]
+        if command in ("/element", "/elements"):
+            matches = self.ui.find(body.get("using"), body.get("value"))
+            if command == "/element":
+                if not matches:
+                    return (name,) + self.error(404, "no such element", body.get("value"))
+                return name, 200, self._element_ref(matches[0])
+            return name, 200, [self._element_ref(match) for match in matches]
+        if method == "GET" and command == "/text":
+            return name, 200, self.ui.texts.get(node.get("element-id"), node.get("text", ""))
+        if method == "GET" and (command.startswith("/attribute/") or command.startswith("/property/")):
+            attribute = command.split("/", 2)[2]
+            if attribute == "text":
+                return name, 200, self.ui.texts.get(node.get("element-id"), node.get("text"))
+            return name, 200, node.get(attribute)
+        if method == "GET" and command == "/rect":
+            return name, 200, {"x": bounds[0], "y": bounds[1],
+                               "width": bounds[2] - bounds[0], "height": bounds[3] - bounds[1]}
+        if method == "GET" and command == "/location":
+            return name, 200, {"x": bounds[0], "y": bounds[1]}
+        if method == "GET" and command == "/size":
+            return name, 200, {"width": bounds[2] - bounds[0], "height": bounds[3] - bounds[1]}
+        if method == "GET" and command == "/name":
+            return name, 200, node.get("class")
+        if method == "GET" and command in ("/displayed", "/enabled"):
+            return name, 200, node.get(command[1:]) == "true"
+        if method == "GET" and command == "/selected":
+            return name, 200, False
+        if method == "POST" and command == "/click":
+            self.ui.focused = node.get("element-id")
+            self.ui.tap(node.get("element-id"))
+            return name, 200, None
+        if method == "POST" and command == "/clear":
+            self.ui.set_text(node.get("element-id"), "")
+            return name, 200, None
+        if method == "POST" and command == "/value":
+            text = body.get("text") or "".join(body.get("value", []))
+            current = self.ui.texts.get(node.get("element-id"), node.get("text", ""))
+            self.ui.set_text(node.get("element-id"), current + text)
+            return name, 200, None
+        return (name,) + self.error(404, "unknown command", f"Unknown element command {method} {command}")
+
+
+class FakeAppiumServer:
+    """Serve a FakeAppiumBackend over HTTP on a local port."""
+
+    def __init__(self, backend: Optional[FakeAppiumBackend] = None, host: str = "127.0.0.1", port: int = 0):
+        self.backend = backend or FakeAppiumBackend()
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; do not let Nagle delay the body
+            disable_nagle_algorithm = True
+
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                status, payload = backend.handle(method, self.path, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def do_DELETE(self):
+                self._respond("DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAppiumServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-appium", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeAppiumServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class InProcessConnection(AppiumConnection):
+    """Command executor that sends commands straight to a backend, without HTTP.
+
+    Use it as the command_executor of webdriver.Remote to count the commands a
+    tool issues deterministically.
+    """
+
+    def __init__(self, backend: FakeAppiumBackend, url: str = "http://fake-appium"):
+        if AppiumClientConfig is not None:
+            super().__init__(client_config=AppiumClientConfig(remote_server_addr=url))
+        else:
+            super().__init__(url)
+        self.backend = backend
+
+    def _request(self, method, url, body=None) -> dict:
+        payload = json.loads(body) if body else {}
+        status, response = self.backend.handle(method, parse.urlparse(url).path, payload)
+        if status >= 400:
+            # Error responses are parsed by the client's error handler
+            return {"status": status, "value": json.dumps(response)}
+        return response
+
+
+def connect(backend: FakeAppiumBackend):
+    """A WebDriver client for a session on the fake app, talking to the backend in-process."""
+    from appium import webdriver
+    from appium.options.android import UiAutomator2Options
+
+    options = UiAutomator2Options()
+    options.app_package = APP_PACKAGE
+    options.app_activity = ".MainActivity"
+    return webdriver.Remote(InProcessConnection(backend), options=options)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+"""
+Load test the MCP server with many concurrent clients.
+
+Each client connects to the server, creates a session on a shared fake Appium
+server and replays a tool-call mix until the run ends. With the stdio
+transport every client gets its own server process, the way desktop MCP hosts
+run it. With an HTTP transport all clients share one server at --url, and with
+the memory transport they share a server running in the harness process.
+
+The harness reports throughput and latency percentiles, and samples each
+server's event loop lag and memory over time through get_server_stats.
+
+Usage:
+    python benchmarks/load_test.py --clients 8 --duration 30
+    python benchmarks/load_test.py --transport streamable-http --url http://127.0.0.1:8000/mcp --clients 32
+    python benchmarks/load_test.py --transport memory --clients 8
+    python benchmarks/load_test.py --mix recorded_calls.json --output load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fake_appium import APP_PACKAGE, FakeAppiumBackend, FakeAppiumServer  # noqa: E402
+
+LOGIN = {"by": "id", "value": f"{APP_PACKAGE}:id/login"}
+
+# A tool-call mix resembling an agent exploring and filling in a screen
+DEFAULT_MIX = [
+    {"tool": "find_element", "arguments": LOGIN, "weight": 3},
+    {"tool": "tap_element", "arguments": LOGIN, "weight": 3},
+    {"tool": "get_text", "arguments": {"by": "id", "value": f"{APP_PACKAGE}:id/title"}, "weight": 2},
+    {"tool": "set_text", "arguments": {"by": "id", "value": f"{APP_PACKAGE}:id/username", "text": "user"},
+     "weight": 2},
+    {"tool": "find_elements", "arguments": {"by": "id", "value": f"{APP_PACKAGE}:id/item"}, "weight": 1},
+    {"tool": "get_page_source", "arguments": {}, "weight": 1},
+    {"tool": "take_screenshot", "arguments": {}, "weight": 1},
+    {"tool": "go_back", "arguments": {}, "weight": 1},
+]
+
+
+def load_mix(path: str) -> List[Dict]:
+    """Load a tool-call mix.
+
+    The file holds a JSON list of {"tool", "arguments", "weight"} calls, or of
+    action log entries ({"type", "details": {"args"}}) recorded by the server.
+    Without weights the calls are replayed in order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    mix = []
+    for entry in entries:
+        if "tool" in entry:
+            mix.append({"tool": entry["tool"], "arguments": entry.get("arguments", {}),
+                        "weight": entry.get("weight")})
+        elif "type" in entry:
+            mix.append({"tool": entry["type"], "arguments": entry.get("details", {}).get("args", {}),
+                        "weight": None})
+    if not mix:
+        raise ValueError(f"No tool calls in {path}")
+    return mix
+
+
+def call_sequence(mix: List[Dict], rng: random.Random):
+    """Yield calls forever: weighted random when the mix has weights, else in order."""
+    if all(call.get("weight") is None for call in mix):
+        while True:
+            yield from mix
+    weights = [call.get("weight") or 1 for call in mix]
+    while True:
+        yield rng.choices(mix, weights)[0]
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 2)
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 2) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else None,
+    }
+
+
+def summarize(calls: List[Dict], samples: List[Dict], duration: float, clients: int) -> Dict:
+    """Aggregate the recorded calls and server samples into a report."""
+    by_tool = {}
+    for call in calls:
+        by_tool.setdefault(call["tool"], []).append(call)
+    # Server samples by second; the memory of several stdio servers adds up
+    timeline = {}
+    for sample in samples:
+        timeline.setdefault(int(sample["t"]), []).append(sample)
+    return {
+        "clients": clients,
+        "duration_s": round(duration, 2),
+        "calls": len(calls),
+        "errors": sum(1 for call in calls if call["error"]),
+        "throughput_per_s": round(len(calls) / duration, 2) if duration else None,
+        # Tool calls running at once inside one server, not counting waiting ones
+        "peak_concurrency": max((s.get("peak_running") or 0 for s in samples), default=None),
+        "latency": latency_summary([call["latency_ms"] for call in calls]),
+        "tools": {
+            tool: dict(latency_summary([call["latency_ms"] for call in tool_calls]),
+                       errors=sum(1 for call in tool_calls if call["error"]))
+            for tool, tool_calls in sorted(by_tool.items())
+        },
+        "server_timeline": [
+            {
+                "t": second,
+                "calls_per_s": sum(1 for call in calls if int(call["t"]) == second),
+                "loop_lag_max_ms": max((s["loop_lag_ms"] or 0 for s in timeline.get(second, [])), default=None),
+                "rss_mb": round(sum(s["rss_mb"] or 0 for s in timeline[second]), 1) if second in timeline else None,
+            }
+            for second in range(int(duration) + 1)
+        ],
+    }
+
+
+def result_text(result) -> str:
+    return "".join(getattr(item, "text", "") or "" for item in result.content)
+
+
+def is_error(result) -> bool:
+    text = result_text(result)
+    return bool(result.isError) or '"error"' in text[:200] or text.startswith("Failed")
+
+
+async def run_client(client, index: int, mix: List[Dict], fake_url: str, deadline: float,
+                     started: float, calls: List[Dict], think: float, seed: int) -> None:
+    """Create a session, then replay the mix until the deadline."""
+    created = await client.call_tool("create_android_driver", {
+        "app_package": APP_PACKAGE,
+        "app_activity": ".MainActivity",
+        "device_name": f"load-client-{index}",
+        "appium_server_url": fake_url,
+        "reuse_session": False,
+    })
+    if is_error(created):
+        raise RuntimeError(f"Client {index} could not create a session: {result_text(created)}")
+
+    sequence = call_sequence(mix, random.Random(seed + index))
+    try:
+        while time.perf_counter() < deadline:
+            call = next(sequence)
+            call_started = time.perf_counter()
+            result = await client.call_tool(call["tool"], call["arguments"])
+            calls.append({
+                "client": index,
+                "tool": call["tool"],
+                "t": call_started - started,
+                "latency_ms": (time.perf_counter() - call_started) * 1000,
+                "error": is_error(result),
+            })
+            if think:
+                await asyncio.sleep(think)
+    finally:
+        await client.call_tool("stop_appium_driver", {})
+
+
+async def sample_servers(servers, deadline: float, started: float, interval: float, samples: List[Dict]) -> None:
+    """Poll get_server_stats on each server process until the deadline."""
+    while True:
+        for client in servers:
+            result = await client.call_tool("get_server_stats", {})
+            stats = json.loads(result_text(result))
+            samples.append({
+                "t": time.perf_counter() - started,
+                "pid": stats["pid"],
+                "loop_lag_ms": stats["event_loop_lag"].get("recent_max_ms"),
+                "rss_mb": stats["memory"]["rss_mb"],
+                "peak_running": stats["clients"]["peak_running"],
+            })
+        if time.perf_counter() >= deadline:
+            return
+        await asyncio.sleep(interval)
+
+
+async def open_clients(stack: contextlib.AsyncExitStack, transport: str, count: int,
+                       url: Optional[str] = None, env: Optional[Dict] = None, errlog=None):
+    """Connect `count` MCP client sessions; return them and the one used per server."""
+    from mcp import ClientSession
+
+    async def connect(streams):
+        read, write = streams[0], streams[1]
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        return session
+
+    if transport == "stdio":
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        parameters = StdioServerParameters(
+            command=sys.executable, args=[os.path.join(ROOT, "main.py")], env=env, cwd=ROOT,
+        )
+        clients = []
+        for _ in range(count):
+            streams = await stack.enter_async_context(stdio_client(parameters, errlog=errlog or sys.stderr))
+            clients.append(await connect(streams))
+        # Every stdio client has a server process of its own
+        return clients, clients
+
+    if transport == "memory":
+        from mcp.shared.memory import create_connected_server_and_client_session
+
+        # The harness environment only applies if main is not imported yet
+        for key, value in (env or {}).items():
+            os.environ.setdefault(key, value)
+        import main
+
+        clients = [
+            await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+            for _ in range(count + 1)
+        ]
+        # All clients share the in-process server; sample it through the extra connection
+        return clients[:count], clients[count:]
+
+    if transport == "sse":
+        from mcp.client.sse import sse_client as http_client
+    elif transport == "streamable-http":
+        from mcp.client.streamable_http import streamablehttp_client as http_client
+    else:
+        raise ValueError(f"Unknown transport '{transport}'")
+    clients = [await connect(await stack.enter_async_context(http_client(url))) for _ in range(count)]
+    # All HTTP clients share the server; sample it through an extra connection
+    monitor = await connect(await stack.enter_async_context(http_client(url)))
+    return clients, [monitor]
+
+
+async def run_load_test(fake_url: str, clients: int = 4, duration: float = 30.0,
+                        transport: str = "stdio", url: Optional[str] = None,
+                        mix: Optional[List[Dict]] = None, think_ms: float = 0.0,
+                        sample_interval: float = 1.0, seed: int = 0, server_log: Optional[str] = None) -> Dict:
+    """Run the load test and return the report."""
+    env = dict(os.environ)
+    env.setdefault("APPIUM_MCP_STATE_DIR", tempfile.mkdtemp(prefix="appium-mcp-load-"))
+    env.update({
+        "APPIUM_MCP_DEVICE_PROFILES": "0",
+        "APPIUM_MCP_REATTACH_SESSIONS": "0",
+        "APPIUM_MCP_HEARTBEAT_INTERVAL": "0",
+    })
+    calls: List[Dict] = []
+    samples: List[Dict] = []
+    with contextlib.ExitStack() as files:
+        errlog = files.enter_context(open(server_log or os.devnull, "a", encoding="utf-8"))
+        async with contextlib.AsyncExitStack() as stack:
+            sessions, servers = await open_clients(stack, transport, clients, url, env, errlog)
+            started = time.perf_counter()
+            deadline = started + duration
+            await asyncio.gather(
+                sample_servers(servers, deadline, started, sample_interval, samples),
+                *(
+                    run_client(session, index, mix or DEFAULT_MIX, fake_url, deadline, started,
+                               calls, think_ms / 1000, seed)
+                    for index, session in enumerate(sessions)
+                ),
+            )
+            elapsed = time.perf_counter() - started
+    return summarize(calls, samples, elapsed, clients)
+
+
+def format_report(report: Dict) -> str:
+    latency = report["latency"]
+    lines = [
+        f"Clients: {report['clients']}  Duration: {report['duration_s']}s  "
+        f"Calls: {report['calls']}  Errors: {report['errors']}",
+        f"Throughput: {report['throughput_per_s']} calls/s  "
+        f"Peak concurrency: {report['peak_concurrency']} running calls",
+        f"Latency: p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  "
+        f"p99 {latency['p99_ms']} ms  max {latency['max_ms']} ms",
+        "",
+        f"{'tool':28} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}",
+    ]
+    for tool, stats in report["tools"].items():
+        lines.append(
+            f"{tool:28} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+            f"{stats['p99_ms']:>9} {stats['errors']:>7}"
+        )
+    lines += ["", f"{'t (s)':>6} {'calls/s':>8} {'loop lag max ms':>16} {'rss MB':>8}"]
+    for point in report["server_timeline"]:
+        lag = "-" if point["loop_lag_max_ms"] is None else point["loop_lag_max_ms"]
+        rss = "-" if point["rss_mb"] is None else point["rss_mb"]
+        lines.append(f"{point['t']:>6} {point['calls_per_s']:>8} {lag:>16} {rss:>8}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent MCP clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http", "memory"], default="stdio")
+    parser.add_argument("--url", help="Server URL for the sse and streamable-http transports")
+    parser.add_argument("--mix", help="JSON file with the tool-call mix to replay")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a client's calls")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake server latency per WebDriver command")
+    parser.add_argument("--items", type=int, default=50, help="List items on the fake screen")
+    parser.add_argument("--fake-port", type=int, default=0,
+                        help="Port for the fake Appium server; fix it when the MCP server runs elsewhere")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between server samples")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the weighted call mix")
+    parser.add_argument("--server-log", help="File receiving the stderr of stdio server processes")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.transport in ("sse", "streamable-http") and not args.url:
+        parser.error(f"--url is required with --transport {args.transport}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    mix = load_mix(args.mix) if args.mix else None
+    backend = FakeAppiumBackend(latency=args.latency_ms / 1000, item_count=args.items)
+    with FakeAppiumServer(backend, port=args.fake_port) as fake_server:
+        report = asyncio.run(run_load_test(
+            fake_server.url, args.clients, args.duration, args.transport, args.url, mix,
+            args.think_ms, args.sample_interval, args.seed, args.server_log,
+        ))
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
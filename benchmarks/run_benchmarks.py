@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Benchmark the MCP tools against a local fake Appium server.
+
+Every tool is called through the real MCP interface (an in-memory client
+session connected to the server in main.py). For each tool the benchmark
+reports latency, the number of WebDriver commands it sent and the bytes it
+moved, both over WebDriver and in its MCP result.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency-ms 20 --items 200 --iterations 50
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fake_appium import APP_PACKAGE, FakeAppiumBackend, FakeAppiumServer  # noqa: E402
+
+ITEM_ID = f"{APP_PACKAGE}:id/item"
+
+# Tool calls to benchmark, in order; each runs against the session created first
+SCENARIOS = [
+    ("find_element", {"by": "id", "value": f"{APP_PACKAGE}:id/login"}),
+    ("find_elements", {"by": "id", "value": ITEM_ID}),
+    ("wait_for_element", {"by": "accessibility_id", "value": "Login"}),
+    ("wait_for_element_to_be_clickable", {"by": "id", "value": f"{APP_PACKAGE}:id/login"}),
+    ("explain_locator", {"by": "xpath", "value": "//*[@text='Log in']"}),
+    ("tap_element", {"by": "id", "value": f"{APP_PACKAGE}:id/login"}),
+    ("long_press_element", {"by": "id", "value": f"{APP_PACKAGE}:id/login", "duration_ms": 0}),
+    ("get_text", {"by": "id", "value": f"{APP_PACKAGE}:id/title"}),
+    ("set_text", {"by": "id", "value": f"{APP_PACKAGE}:id/username", "text": "user@example.com"}),
+    ("fill_form", {"fields": [
+        {"by": "id", "value": f"{APP_PACKAGE}:id/username", "text": "user@example.com"},
+        {"by": "id", "value": f"{APP_PACKAGE}:id/password", "text": "secret"},
+    ]}),
+    ("get_attribute", {"by": "id", "value": f"{APP_PACKAGE}:id/login", "attribute": "content-desc"}),
+    ("read_many", {"locators": [
+        {"by": "id", "value": f"{APP_PACKAGE}:id/title"},
+        {"by": "accessibility_id", "value": "Login"},
+        {"by": "id", "value": ITEM_ID},
+    ], "attributes": ["text", "enabled"]}),
+    ("save_screen", {"name": "LoginScreen"}),
+    ("identify_screen", {}),
+    ("go_back", {}),
+    ("go_home", {}),
+    ("launch_app", {}),
+    ("close_app", {}),
+    ("reset_app", {"strategy": "terminate_activate"}),
+    ("get_page_source", {}),
+    ("swipe", {"start_x": 500, "start_y": 1500, "end_x": 500, "end_y": 500, "duration_ms": 0}),
+    ("scroll_to_element", {"by": "xpath", "value": "//*[@text='Item 3']", "max_swipes": 1}),
+    ("pinch", {"element_by": "id", "element_value": f"{APP_PACKAGE}:id/title"}),
+    ("zoom", {"element_by": "id", "element_value": f"{APP_PACKAGE}:id/title"}),
+    ("take_screenshot", {}),
+    ("get_device_time", {}),
+    ("get_device_info", {}),
+    ("get_device_orientation", {}),
+    ("set_device_orientation", {"orientation": "PORTRAIT"}),
+    ("get_current_context", {}),
+    ("get_contexts", {}),
+    ("switch_to_context", {"context_name": "NATIVE_APP"}),
+    ("check_session_health", {}),
+    ("list_sessions", {}),
+    ("set_test_name", {"name": "benchmark"}),
+]
+
+# Tools that start or stop sessions; measured as a pair per iteration
+LIFECYCLE = ("create_android_driver", "stop_appium_driver")
+
+# Tools that are not benchmarked, and why
+SKIPPED = {
+    "start_appium_server": "starts a real Appium server",
+    "create_ios_driver": "same code path as create_android_driver",
+    "create_mac_driver": "same code path as create_android_driver",
+    "create_drivers": "measured by create_android_driver",
+    "prewarm_sessions": "starts sessions in the background",
+    "get_prewarm_status": "no WebDriver commands",
+    "switch_session": "no WebDriver commands",
+    "reap_sessions": "no WebDriver commands",
+    "list_device_profiles": "no WebDriver commands",
+    "forget_device_profile": "no WebDriver commands",
+    "start_report": "writes report files",
+    "finish_report": "writes report files",
+    "configure_tracing": "no WebDriver commands",
+    "get_server_stats": "no WebDriver commands",
+    "read_payload": "no WebDriver commands",
+    "list_screens": "no WebDriver commands",
+    "forget_screen": "no WebDriver commands",
+    "navigate_to": "replays tap_element, swipe and go_back calls, which are measured",
+    "configure_navigation": "no WebDriver commands",
+    "get_navigation_graph": "no WebDriver commands",
+    "crawl_app": "explores a whole app; its cost depends on the app, not on the tool",
+}
+
+# Relative increase that counts as a regression, and the absolute noise floors
+DEFAULT_THRESHOLD = 0.25
+LATENCY_NOISE_MS = 1.0
+PAYLOAD_NOISE_BYTES = 64
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(tool: str, samples: List[Dict]) -> Dict:
+    latencies = [sample["latency_ms"] for sample in samples]
+    return {
+        "tool": tool,
+        "iterations": len(samples),
+        "errors": sum(1 for sample in samples if sample["error"]),
+        "latency_ms": {
+            "median": round(statistics.median(latencies), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "mean": round(statistics.mean(latencies), 3),
+        },
+        "webdriver_commands": round(statistics.mean(s["commands"] for s in samples), 2),
+        "webdriver_bytes": round(statistics.mean(s["webdriver_bytes"] for s in samples)),
+        "result_bytes": round(statistics.mean(s["result_bytes"] for s in samples)),
+        "command_sequence": samples[-1]["command_sequence"],
+    }
+
+
+async def call_tool(client, backend: FakeAppiumBackend, tool: str, arguments: Dict) -> Dict:
+    """Call one tool and measure it."""
+    backend.reset_stats()
+    started = time.perf_counter()
+    result = await client.call_tool(tool, arguments)
+    latency_ms = (time.perf_counter() - started) * 1000
+    stats = backend.stats()
+    text = "".join(getattr(item, "text", "") or getattr(item, "data", "") or "" for item in result.content)
+    error = result.isError or '"error"' in text[:200] or text.startswith("Failed")
+    return {
+        "latency_ms": latency_ms,
+        "commands": stats["commands"],
+        "webdriver_bytes": stats["bytes_in"] + stats["bytes_out"],
+        "result_bytes": len(text.encode("utf-8")),
+        "command_sequence": stats["by_command"],
+        "error": error,
+        "text": text,
+    }
+
+
+async def run_benchmarks(
+    server_url: str,
+    backend: FakeAppiumBackend,
+    iterations: int = 20,
+    tools: Optional[List[str]] = None,
+    warmup: int = 1,
+) -> Dict[str, Dict]:
+    """Run every scenario through an in-memory MCP client; return results by tool."""
+    import main
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    driver_args = {
+        "app_package": APP_PACKAGE,
+        "app_activity": ".MainActivity",
+        "device_name": "fake-device",
+        "appium_server_url": server_url,
+        "reuse_session": False,
+    }
+    selected = [(tool, args) for tool, args in SCENARIOS if not tools or tool in tools]
+    results = {}
+    async with create_connected_server_and_client_session(main.mcp._mcp_server) as client:
+        lifecycle = {tool: [] for tool in LIFECYCLE}
+        if not tools or any(tool in tools for tool in LIFECYCLE):
+            for iteration in range(warmup + iterations):
+                created = await call_tool(client, backend, "create_android_driver", driver_args)
+                if created["error"]:
+                    raise RuntimeError(f"Could not create a session on the fake server: {created['text']}")
+                stopped = await call_tool(client, backend, "stop_appium_driver", {})
+                if iteration >= warmup:
+                    lifecycle["create_android_driver"].append(created)
+                    lifecycle["stop_appium_driver"].append(stopped)
+            for tool, samples in lifecycle.items():
+                results[tool] = summarize(tool, samples)
+
+        created = await call_tool(client, backend, "create_android_driver", driver_args)
+        if created["error"]:
+            raise RuntimeError(f"Could not create a session on the fake server: {created['text']}")
+        try:
+            for tool, arguments in selected:
+                samples = []
+                for iteration in range(warmup + iterations):
+                    sample = await call_tool(client, backend, tool, arguments)
+                    if iteration >= warmup:
+                        samples.append(sample)
+                results[tool] = summarize(tool, samples)
+        finally:
+            await client.call_tool("stop_appium_driver", {})
+    return results
+
+
+def uncovered_tools(registered: List[str]) -> List[str]:
+    covered = {tool for tool, _ in SCENARIOS} | set(LIFECYCLE) | set(SKIPPED)
+    return sorted(set(registered) - covered)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than the threshold."""
+    regressions = []
+    for tool, current in sorted(results.items()):
+        previous = baseline.get(tool)
+        if previous is None:
+            continue
+        if current["webdriver_commands"] > previous["webdriver_commands"]:
+            regressions.append(
+                f"{tool}: WebDriver commands {previous['webdriver_commands']} -> {current['webdriver_commands']}"
+            )
+        checks = (
+            ("median latency", current["latency_ms"]["median"], previous["latency_ms"]["median"], LATENCY_NOISE_MS),
+            ("WebDriver bytes", current["webdriver_bytes"], previous["webdriver_bytes"], PAYLOAD_NOISE_BYTES),
+            ("result bytes", current["result_bytes"], previous["result_bytes"], PAYLOAD_NOISE_BYTES),
+        )
+        for metric, value, reference, noise in checks:
+            if value > reference * (1 + threshold) and value - reference > noise:
+                regressions.append(f"{tool}: {metric} {reference} -> {value}")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{tool}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def format_table(results: Dict[str, Dict]) -> str:
+    header = f"{'tool':34} {'median ms':>10} {'p95 ms':>9} {'cmds':>6} {'wd bytes':>10} {'result B':>10} {'errors':>6}"
+    lines = [header, "-" * len(header)]
+    for tool, result in results.items():
+        lines.append(
+            f"{tool:34} {result['latency_ms']['median']:>10.2f} {result['latency_ms']['p95']:>9.2f} "
+            f"{result['webdriver_commands']:>6g} {result['webdriver_bytes']:>10} "
+            f"{result['result_bytes']:>10} {result['errors']:>6}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=20, help="Measured calls per tool")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured calls per tool")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake server latency per command")
+    parser.add_argument("--items", type=int, default=50, help="List items on the fake screen")
+    parser.add_argument("--depth", type=int, default=5, help="Layout nesting depth of the fake screen")
+    parser.add_argument("--screenshot-kb", type=int, default=200, help="Size of fake screenshots")
+    parser.add_argument("--tool", action="append", dest="tools", help="Only benchmark this tool (repeatable)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Save the results as a baseline file")
+    parser.add_argument("--compare", help="Compare against a baseline file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative increase that counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Keep the server under test from touching the user's state or starting background work
+    os.environ.setdefault("APPIUM_MCP_STATE_DIR", tempfile.mkdtemp(prefix="appium-mcp-bench-"))
+    os.environ.setdefault("APPIUM_MCP_DEVICE_PROFILES", "0")
+    os.environ.setdefault("APPIUM_MCP_HEARTBEAT_INTERVAL", "0")
+    os.environ.setdefault("APPIUM_MCP_REAPER_INTERVAL", "0")
+    import main as server
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    backend = FakeAppiumBackend(
+        latency=args.latency_ms / 1000, item_count=args.items, depth=args.depth,
+        screenshot_bytes=args.screenshot_kb * 1024,
+    )
+    registered = [tool.name for tool in asyncio.run(server.mcp.list_tools())]
+    missing = uncovered_tools(registered)
+    if missing:
+        print(f"Warning: tools without a benchmark scenario: {', '.join(missing)}", file=sys.stderr)
+
+    with FakeAppiumServer(backend) as fake_server:
+        results = asyncio.run(run_benchmarks(fake_server.url, backend, args.iterations, args.tools, args.warmup))
+    print(format_table(results))
+
+    report = {
+        "config": {
+            "iterations": args.iterations,
+            "latency_ms": args.latency_ms,
+            "items": args.items,
+            "depth": args.depth,
+            "screenshot_kb": args.screenshot_kb,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("latency_ms") != args.latency_ms:
+            print("Warning: the baseline was recorded with a different fake latency", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
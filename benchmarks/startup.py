@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Measure how quickly the MCP server starts.
+
+Two measurements, each repeated and reported as median and worst:
+- Import time of main.py, from `python -X importtime`, with the modules that
+  contribute most to it
+- Time to first response: from spawning `python main.py` until it answers
+  the MCP `initialize` request over stdio, and until it answers `tools/list`
+
+MCP clients spawn the server on demand and give up on slow starts, so
+--target-ms makes the run fail when the median time to first response is
+above the target.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --target-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MAIN = os.path.join(ROOT, "main.py")
+
+DEFAULT_TARGET_MS = 1000
+
+
+def server_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("APPIUM_MCP_STATE_DIR", tempfile.mkdtemp(prefix="appium-mcp-startup-"))
+    env.setdefault("APPIUM_MCP_REATTACH_SESSIONS", "0")
+    return env
+
+
+def import_profile(env: Dict[str, str]) -> Dict:
+    """Import main once under -X importtime; return the total and per-module times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time: <self us> | <cumulative us> | <indented module name>
+        self_us, cumulative_us, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        modules[name] = {"self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000}
+    return {"total_ms": modules.get("main", {}).get("cumulative_ms"), "modules": modules}
+
+
+def top_level_imports(modules: Dict[str, Dict], count: int) -> List[tuple]:
+    """The packages that take longest to import, by cumulative time."""
+    packages = {}
+    for name, times in modules.items():
+        if name == "main":
+            continue
+        package = name.split(".")[0]
+        # The outermost import of a package carries its whole cumulative time
+        packages[package] = max(packages.get(package, 0), times["cumulative_ms"])
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def first_response(env: Dict[str, str], timeout: float = 30.0) -> Dict:
+    """Spawn the server over stdio and time its initialize and tools/list responses."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, MAIN], cwd=ROOT, env=env, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        def request(message):
+            process.stdin.write(json.dumps(message) + "\n")
+            process.stdin.flush()
+
+        def response(request_id):
+            while time.perf_counter() - started < timeout:
+                line = process.stdout.readline()
+                if not line:
+                    raise RuntimeError("The server exited before responding")
+                message = json.loads(line)
+                if message.get("id") == request_id:
+                    return message
+            raise TimeoutError("The server did not respond in time")
+
+        request({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05", "capabilities": {},
+                "clientInfo": {"name": "startup-benchmark", "version": "1.0"},
+            },
+        })
+        response(1)
+        initialize_ms = (time.perf_counter() - started) * 1000
+        request({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        request({"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = response(2)["result"]["tools"]
+        list_tools_ms = (time.perf_counter() - started) * 1000
+    finally:
+        process.kill()
+        process.wait()
+    return {"initialize_ms": initialize_ms, "list_tools_ms": list_tools_ms, "tools": len(tools)}
+
+
+def summary(values: List[float]) -> Dict:
+    return {"median_ms": round(statistics.median(values), 1), "max_ms": round(max(values), 1)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of each measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help="Fail if the median time to the initialize response is above this")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    env = server_env()
+
+    profiles = [import_profile(env) for _ in range(args.runs)]
+    responses = [first_response(env) for _ in range(args.runs)]
+    slowest = top_level_imports(profiles[-1]["modules"], args.top)
+    loaded = sorted(name for name in profiles[-1]["modules"] if name.split(".")[0] in ("appium", "selenium"))
+
+    results = {
+        "import_main": summary([profile["total_ms"] for profile in profiles]),
+        "initialize": summary([response["initialize_ms"] for response in responses]),
+        "list_tools": summary([response["list_tools_ms"] for response in responses]),
+        "tools": responses[-1]["tools"],
+        "slowest_imports": [{"package": name, "cumulative_ms": round(ms, 1)} for name, ms in slowest],
+        "webdriver_modules_imported_at_startup": len(loaded),
+        "target_ms": args.target_ms,
+    }
+
+    print(f"import main:           median {results['import_main']['median_ms']} ms, "
+          f"max {results['import_main']['max_ms']} ms")
+    print(f"initialize response:   median {results['initialize']['median_ms']} ms, "
+          f"max {results['initialize']['max_ms']} ms (target {args.target_ms:g} ms)")
+    print(f"tools/list response:   median {results['list_tools']['median_ms']} ms, "
+          f"max {results['list_tools']['max_ms']} ms ({results['tools']} tools)")
+    print(f"Appium/Selenium modules imported at startup: {len(loaded)}")
+    print("\nSlowest imports:")
+    for entry in results["slowest_imports"]:
+        print(f"  {entry['package']:24} {entry['cumulative_ms']:>8} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if results["initialize"]["median_ms"] > args.target_ms:
+        print(f"\nTime to first response is above the {args.target_ms:g} ms target.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Compare the set_text entry modes on short, medium and long inputs.
+
+Each mode enters texts of 10, 100 and 1000 characters into a field of the fake
+Appium backend and reports the median time, the WebDriver commands it sent
+and whether the field ended up with the right text. The fake backend charges
+--latency-ms per command and --key-latency-ms per character sent with
+send_keys, which UiAutomator2 and XCUITest type one key at a time; measure a
+real device to calibrate those two numbers.
+
+Usage:
+    python benchmarks/text_entry.py
+    python benchmarks/text_entry.py --lengths 10 100 --key-latency-ms 5 --runs 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fake_appium import APP_PACKAGE, FakeAppiumBackend, InProcessConnection  # noqa: E402
+
+FIELD = {"by": "id", "value": f"{APP_PACKAGE}:id/username"}
+
+MODES = ("keys", "replace", "clipboard", "auto")
+
+
+def sample_text(length: int) -> str:
+    return ("user@example.com " * (length // 17 + 1))[:length]
+
+
+async def measure(server, backend: FakeAppiumBackend, mode: str, length: int, runs: int) -> Dict:
+    """Time set_text with one mode and text length; checks the field's text afterwards."""
+    text = sample_text(length)
+    times, commands, correct = [], 0, True
+    for _ in range(runs):
+        backend.reset_stats()
+        started = time.perf_counter()
+        result = await server.set_text(text=text, mode=mode, **FIELD)
+        times.append((time.perf_counter() - started) * 1000)
+        commands = backend.stats()["commands"]
+        element = server.driver.find_element(server.AppiumBy.ID, FIELD["value"])
+        correct = correct and "error" not in result and element.text == text
+    return {
+        "mode": mode,
+        "length": length,
+        "median_ms": round(statistics.median(times), 1),
+        "commands": commands,
+        "used": result.get("mode"),
+        "correct": correct,
+    }
+
+
+async def run_text_entry(lengths: List[int], runs: int = 5, latency_ms: float = 5.0,
+                         key_latency_ms: float = 2.0) -> List[Dict]:
+    os.environ.setdefault("APPIUM_MCP_STATE_DIR", tempfile.mkdtemp(prefix="appium-mcp-text-"))
+    import main as server
+    logging.getLogger().setLevel(logging.WARNING)
+    from appium import webdriver
+    from appium.options.android import UiAutomator2Options
+
+    backend = FakeAppiumBackend(latency=latency_ms / 1000, typing_latency=key_latency_ms / 1000)
+    options = UiAutomator2Options()
+    options.app_package = APP_PACKAGE
+    options.app_activity = ".MainActivity"
+    previous = server.driver, server.active_session
+    server.driver = webdriver.Remote(InProcessConnection(backend), options=options)
+    server.active_session = None
+    try:
+        return [await measure(server, backend, mode, length, runs) for length in lengths for mode in MODES]
+    finally:
+        server.driver.quit()
+        server.driver, server.active_session = previous
+
+
+def format_table(results: List[Dict]) -> str:
+    lines = [f"{'chars':>6}  {'mode':10} {'median ms':>10} {'commands':>9}  {'used':10} correct"]
+    for row in results:
+        lines.append(f"{row['length']:>6}  {row['mode']:10} {row['median_ms']:>10} {row['commands']:>9}  "
+                     f"{row['used'] or '-':10} {'yes' if row['correct'] else 'NO'}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000], help="Text lengths to enter")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of each measurement")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake server latency per command")
+    parser.add_argument("--key-latency-ms", type=float, default=2.0,
+                        help="Fake server latency per character typed with send_keys")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run_text_entry(args.lengths, args.runs, args.latency_ms, args.key_latency_ms))
+    print(format_table(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(row["correct"] for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,150 @@
 #!/usr/bin/env python
 import os
+import asyncio
+import base64
 import json
+import collections
+import contextlib
+import contextvars
 import datetime
+import functools
+import hashlib
+import heapq
+import html
+import inspect
 import logging
+import re
+import secrets
+import shutil
 import sys
+import threading
+import time
 import traceback
-from typing import Any, Dict, List, Optional, Union
-from appium import webdriver
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.actions import interaction
-from selenium.webdriver.common.actions.action_builder import ActionBuilder
-from selenium.webdriver.common.actions.pointer_input import PointerInput
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException
-from mcp.server.fastmcp import FastMCP
+import weakref
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import importlib
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.lowlevel.server import request_ctx
+
+# Appium and Selenium are imported on first use: together they take about as
+# long to import as the rest of the server, and MCP clients that spawn it on
+# demand time out waiting for the initialize response.
+# name -> (module, attribute); attribute None means the module itself
+LAZY_IMPORTS = {
+    "webdriver": ("appium.webdriver", None),
+    "AppiumBy": ("appium.webdriver.common.appiumby", "AppiumBy"),
+    "WebDriverWait": ("selenium.webdriver.support.ui", "WebDriverWait"),
+    "ActionChains": ("selenium.webdriver.common.action_chains", "ActionChains"),
+    "interaction": ("selenium.webdriver.common.actions.interaction", None),
+    "ActionBuilder": ("selenium.webdriver.common.actions.action_builder", "ActionBuilder"),
+    "PointerInput": ("selenium.webdriver.common.actions.pointer_input", "PointerInput"),
+    "EC": ("selenium.webdriver.support.expected_conditions", None),
+    "WebDriverException": ("selenium.common.exceptions", "WebDriverException"),
+    "NoSuchElementException": ("selenium.common.exceptions", "NoSuchElementException"),
+    "StaleElementReferenceException": ("selenium.common.exceptions", "StaleElementReferenceException"),
+    "TimeoutException": ("selenium.common.exceptions", "TimeoutException"),
+}
+
+if TYPE_CHECKING:
+    # The names load_webdriver() provides, for type checkers and linters
+    from appium import webdriver
+    from appium.webdriver.common.appiumby import AppiumBy
+    from selenium.common.exceptions import (
+        NoSuchElementException,
+        StaleElementReferenceException,
+        TimeoutException,
+        WebDriverException,
+    )
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.actions import interaction
+    from selenium.webdriver.common.actions.action_builder import ActionBuilder
+    from selenium.webdriver.common.actions.pointer_input import PointerInput
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    # A webdriver.Remote subclass, see attached_remote_class()
+    AttachedRemote = webdriver.Remote
+
+
+def load_webdriver() -> None:
+    """Import Appium and Selenium into this module; names already set are kept."""
+    module_globals = globals()
+    for name, (module_name, attribute) in LAZY_IMPORTS.items():
+        if name not in module_globals:
+            module = importlib.import_module(module_name)
+            module_globals[name] = module if attribute is None else getattr(module, attribute)
+    if "AttachedRemote" not in module_globals:
+        module_globals["AttachedRemote"] = attached_remote_class()
+
+
+def __getattr__(name):
+    # main.webdriver, main.AppiumBy, ... from outside the module (e.g. patch())
+    if name in LAZY_IMPORTS or name == "AttachedRemote":
+        load_webdriver()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Configure logging
+LOG_FILE = os.path.expanduser(
+    os.environ.get("APPIUM_MCP_LOG_FILE", "~/Library/Logs/Claude/mcp-server-appium.log")
+)
+
+
+def log_handlers() -> List[logging.Handler]:
+    # stdout carries the MCP stdio transport, so logs must not go there
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if LOG_FILE:
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        except OSError:
+            return handlers
+        # delay: the file is opened when the first record is written
+        handlers.append(logging.FileHandler(LOG_FILE, delay=True))
+    return handlers
+
+
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get("APPIUM_MCP_LOG_LEVEL", "DEBUG").upper(),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(
-            os.path.expanduser("~/Library/Logs/Claude/mcp-server-appium.log")
-        ),
-    ],
+    handlers=log_handlers(),
 )
 logger = logging.getLogger("appium-mcp")
 logger.info("Starting Appium MCP server")
 
+# Tools that run on the server's event loop: they do not block it, and
+# report progress through the request context, which belongs to that loop
+EVENT_LOOP_TOOLS = {"create_drivers", "get_server_stats"}
+
+# Tools that use no session, so they neither wait for nor count as a client's call
+SERVER_TOOLS = {"get_server_stats"}
+
+
+class AppiumMCP(FastMCP):
+    """FastMCP server that runs each tool call in the calling client's session.
+
+    Tool bodies send blocking WebDriver commands, so they run in a worker
+    thread with an event loop of its own. The server's loop stays free to
+    accept the calls of other clients. Calls on different sessions run
+    concurrently; calls on the same session wait for their turn or are
+    rejected when too many are waiting.
+    """
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        if name in SERVER_TOOLS:
+            return await super().call_tool(name, arguments)
+        async with client_router.turn(current_client()):
+            if name in EVENT_LOOP_TOOLS:
+                return await super().call_tool(name, arguments)
+            return await asyncio.to_thread(asyncio.run, super().call_tool(name, arguments))
+
+
 try:
     # Initialize FastMCP server
     logger.info("Initializing FastMCP server")
-    mcp = FastMCP("Appium")
+    mcp = AppiumMCP("Appium")
     logger.info("FastMCP server initialized successfully")
 
     # Add more detailed logging for the connection process
@@ -53,9 +163,1411 @@ except Exception as e:
     logger.error(traceback.format_exc())
     sys.exit(1)
 
-# Global variable to store the Appium driver instance
+# Driver that tool calls go to outside a client's call (direct calls, startup)
 driver = None
 
+# Directory for state persisted between server runs
+STATE_DIR = os.path.expanduser(os.environ.get("APPIUM_MCP_STATE_DIR", "~/.appium-mcp"))
+
+
+def write_state_file(name: str, data) -> None:
+    """Atomically write a JSON file in the state directory."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True, default=str)
+    os.replace(tmp_path, path)
+
+
+def read_state_file(name: str, default=None):
+    """Read a JSON file from the state directory, or return the default."""
+    try:
+        with open(os.path.join(STATE_DIR, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable state file {name}: {e}")
+        return default
+
+
+# Tracing
+class Span:
+    """A timed operation within a trace (tool call, wait or WebDriver command)."""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, kind="internal"):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class SpanExporter:
+    """Base class for span exporters.
+
+    Subclasses receive every finished span of a trace in one batch once the
+    root span (the tool call) ends.
+    """
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """Append spans to a file as OTLP/JSON, one export request per line."""
+
+    SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _attribute_value(value) -> Dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _encode_span(self, span: Span) -> Dict:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": self.SPAN_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": self._attribute_value(value)}
+                for key, value in span.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        return encoded
+
+    def export(self, spans: List[Span]) -> None:
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "appium-mcp"}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "appium-mcp"},
+                            "spans": [self._encode_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Create nested spans and hand finished traces to an exporter."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+        self._current = contextvars.ContextVar("appium_mcp_span", default=None)
+        self._finished = contextvars.ContextVar("appium_mcp_trace", default=None)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def set_exporter(self, exporter: Optional[SpanExporter]) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+        self.exporter = exporter
+
+    @contextlib.contextmanager
+    def start_span(self, name, attributes=None, kind="internal"):
+        """Open a span as a child of the current one, or start a new trace."""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = self._current.get()
+        if parent is None:
+            span = Span(name, secrets.token_hex(16), None, attributes, kind)
+            finished = []
+            finished_token = self._finished.set(finished)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes, kind)
+            finished = self._finished.get()
+            finished_token = None
+        token = self._current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._current.reset(token)
+            if finished is not None:
+                finished.append(span)
+            if finished_token is not None:
+                self._finished.reset(finished_token)
+                try:
+                    self.exporter.export(finished)
+                except Exception as e:
+                    logger.error(f"Failed to export trace: {e}")
+
+
+tracer = Tracer(
+    OTLPJsonFileExporter(os.environ["APPIUM_MCP_TRACE_FILE"])
+    if os.environ.get("APPIUM_MCP_TRACE_FILE")
+    else None
+)
+
+
+def session_attributes(current_driver) -> Dict:
+    """Span attributes that identify the Appium session and device."""
+    if current_driver is None:
+        return {}
+    attributes = {}
+    try:
+        attributes["appium.session_id"] = str(current_driver.session_id)
+        capabilities = current_driver.capabilities or {}
+        attributes["appium.device"] = str(
+            capabilities.get("udid")
+            or capabilities.get("deviceName")
+            or capabilities.get("appium:deviceName")
+        )
+        attributes["appium.platform"] = str(capabilities.get("platformName"))
+    except Exception:
+        pass
+    return attributes
+
+
+def instrument_driver(new_driver):
+    """Wrap a driver's command execution so each WebDriver command gets a span.
+
+    A rewritten locator the server rejects is searched for again as the
+    XPath it was rewritten from.
+    """
+    execute = new_driver.execute
+
+    def traced(driver_command, params=None):
+        if not tracer.enabled:
+            return execute(driver_command, params)
+        attributes = {"webdriver.command": str(driver_command)}
+        if isinstance(params, dict) and params.get("using"):
+            attributes["webdriver.using"] = str(params.get("using"))
+            attributes["webdriver.value"] = str(params.get("value"))
+        with tracer.start_span(f"webdriver {driver_command}", attributes, kind="client"):
+            return execute(driver_command, params)
+
+    @functools.wraps(execute)
+    def traced_execute(driver_command, params=None):
+        try:
+            return traced(driver_command, params)
+        except WebDriverException as e:
+            fallback = xpath_fallback(new_driver, params, e)
+            if fallback is None:
+                raise
+            return traced(driver_command, fallback)
+
+    new_driver.execute = traced_execute
+    return new_driver
+
+
+def wait_until(condition, timeout: float):
+    """Wait for a condition on the current driver, traced as a wait span."""
+    with tracer.start_span(
+        "wait",
+        {"wait.condition": getattr(condition, "__qualname__", type(condition).__name__),
+         "wait.timeout_s": float(timeout)},
+    ):
+        load_webdriver()
+        return WebDriverWait(get_driver(), timeout).until(condition)
+
+
+def _tool_succeeded(result) -> bool:
+    """Decide whether a tool result represents a successful step."""
+    if isinstance(result, dict):
+        return "error" not in result and result.get("success", True) is not False
+    return True
+
+
+def tool_span_attributes(tool_name, arguments) -> Dict:
+    """Span attributes for a tool call: tool, locator, session and device."""
+    attributes = {"mcp.tool": tool_name}
+    by = arguments.get("by") or arguments.get("element_by")
+    value = arguments.get("value") or arguments.get("element_value")
+    if by and value:
+        attributes["appium.locator.by"] = str(by)
+        attributes["appium.locator.value"] = str(value)
+    attributes.update(session_attributes(get_driver()))
+    return attributes
+
+
+# Tools that must not recreate a session that died underneath them
+NO_RECONNECT_TOOLS = {"stop_appium_driver"}
+
+
+def recover_dead_session(tool_name, result) -> bool:
+    """Recreate the active session if a tool failed because it died; True to retry."""
+    session = get_active_session()
+    if (
+        tool_name in NO_RECONNECT_TOOLS
+        or not isinstance(result, dict)
+        or not is_dead_session_error(result.get("error", ""))
+        or session is None
+        or session.driver is not get_driver()
+    ):
+        if session is not None and session.driver is get_driver():
+            session.touch()
+        return False
+
+    session.dead = True
+    session.failure = result["error"]
+    try:
+        reconnect_active_session()
+    except Exception as e:
+        logger.error(str(e))
+        return False
+    return True
+
+
+# Decorator that records every tool call in the action log
+def track_action(func):
+    """Time a tool call and record it as a step in the action log."""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Tool bodies use the Appium and Selenium names directly
+        load_webdriver()
+        bound = signature.bind_partial(*args, **kwargs)
+        details = {"args": dict(bound.arguments)}
+        span_attributes = (
+            tool_span_attributes(func.__name__, details["args"]) if tracer.enabled else None
+        )
+        learn_navigation(func.__name__, details["args"], before=True)
+        started = time.perf_counter()
+        try:
+            with tracer.start_span(f"tool {func.__name__}", span_attributes) as span:
+                result = await func(*args, **kwargs)
+                if recover_dead_session(func.__name__, result):
+                    # Retry once against the recreated session
+                    result = await func(*args, **kwargs)
+                if span is not None and not _tool_succeeded(result):
+                    span.error = str(result.get("error", result.get("message")))
+        except Exception as e:
+            details["error"] = str(e)
+            log_action(
+                func.__name__,
+                details,
+                False,
+                duration_ms=(time.perf_counter() - started) * 1000,
+            )
+            raise
+
+        success = _tool_succeeded(result)
+        if not success and isinstance(result, dict):
+            details["error"] = result.get("error", result.get("message"))
+        else:
+            learn_navigation(func.__name__, details["args"], before=False)
+        screenshot = None
+        if active_report is not None and active_report.wants_screenshot(success):
+            screenshot = active_report.capture_screenshot(get_driver())
+        log_action(
+            func.__name__,
+            details,
+            success,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            screenshot=screenshot,
+        )
+        return result
+
+    return wrapper
+
+
+# Session management
+# Capabilities that do not change which device/app a session drives;
+# obtain_session reproduces the reset flags on reused sessions
+SESSION_KEY_IGNORED_CAPABILITIES = ("noReset", "fullReset", "newCommandTimeout")
+
+
+def normalize_capabilities(capabilities: Dict) -> Dict:
+    """Strip vendor prefixes so equivalent capability sets compare equal."""
+    normalized = {}
+    for name, value in capabilities.items():
+        if ":" in name:
+            name = name.split(":", 1)[1]
+        normalized[name] = value
+    return normalized
+
+
+def session_key(server_url: str, capabilities: Dict) -> str:
+    """Key identifying sessions that are interchangeable for a create call."""
+    normalized = {
+        name: value
+        for name, value in normalize_capabilities(capabilities).items()
+        if name not in SESSION_KEY_IGNORED_CAPABILITIES
+    }
+    return json.dumps(
+        {"server": server_url.rstrip("/"), "capabilities": normalized},
+        sort_keys=True,
+        default=str,
+    )
+
+
+# Most seconds a session's last use may go without being written to the
+# session store, so a restarted server does not reap sessions in use
+SESSION_PERSIST_INTERVAL = 30.0
+
+
+class ManagedSession:
+    """An Appium session created by this server, with its creation parameters."""
+
+    def __init__(self, session_driver, server_url: str, capabilities: Dict):
+        self.driver = session_driver
+        self.server_url = server_url
+        self.capabilities = dict(capabilities)
+        self.key = session_key(server_url, capabilities)
+        self.session_id = str(session_driver.session_id)
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.last_heartbeat = self.created_at
+        # When the session store last recorded last_used
+        self.persisted_at = self.created_at
+        self.dead = False
+        self.failure = None
+        self.reattached = False
+        # Started by the prewarmer and not yet handed to a create call
+        self.prewarmed = False
+        # MCP client that last used the session as its current one
+        self.owner = None
+
+    @property
+    def app_id(self) -> Optional[str]:
+        """Package or bundle id of the app under test, if known."""
+        for capabilities in (self.capabilities, self.driver.capabilities or {}):
+            normalized = normalize_capabilities(capabilities)
+            app_id = normalized.get("appPackage") or normalized.get("bundleId")
+            if app_id:
+                return app_id
+        return None
+
+    def touch(self) -> None:
+        self.last_used = time.time()
+        if self.last_used - self.persisted_at >= SESSION_PERSIST_INTERVAL:
+            session_store.save()
+
+    def is_alive(self) -> bool:
+        """Check with a cheap command that the session still exists on the server.
+
+        The command also resets the server's newCommandTimeout for the session.
+        Only errors saying the session is gone mark it dead; other failures,
+        such as a network blip, leave it to be checked again later.
+        """
+        try:
+            self.driver.execute("getTimeouts")
+            self.last_heartbeat = time.time()
+            self.failure = None
+            return True
+        except Exception as e:
+            self.failure = str(e)
+            if is_dead_session_error(e):
+                self.dead = True
+            else:
+                logger.warning(f"Could not reach session {self.session_id}, will check again: {e}")
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting session {self.session_id}: {e}")
+
+
+class SessionPool:
+    """Idle sessions kept warm for reuse, keyed by normalized capabilities."""
+
+    def __init__(self, idle_ttl: float = 300.0):
+        self.idle_ttl = idle_ttl
+        self._idle: Dict[str, List[ManagedSession]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(sessions) for sessions in self._idle.values())
+
+    def release(self, session: ManagedSession) -> None:
+        """Return a session to the pool so a later create call can reuse it."""
+        session.touch()
+        with self._lock:
+            self._idle.setdefault(session.key, []).append(session)
+        logger.info(f"Session {session.session_id} released to the warm pool")
+
+    def acquire(self, key: str) -> Optional[ManagedSession]:
+        """Take the most recently used live session for a key, if any.
+
+        Sessions that cannot be reached but are not known to be dead stay in
+        the pool for the heartbeat to check again.
+        """
+        unreachable = []
+        try:
+            while True:
+                with self._lock:
+                    sessions = self._idle.get(key)
+                    if not sessions:
+                        return None
+                    session = sessions.pop()
+                    if not sessions:
+                        del self._idle[key]
+                if session.is_alive():
+                    session.prewarmed = False
+                    session.touch()
+                    return session
+                if session.dead:
+                    logger.info(f"Discarding dead pooled session {session.session_id}")
+                else:
+                    unreachable.append(session)
+        finally:
+            if unreachable:
+                with self._lock:
+                    self._idle.setdefault(key, [])[:0] = unreachable
+
+    def evict_expired(self, now: Optional[float] = None) -> List[ManagedSession]:
+        """Quit sessions that have been idle longer than the TTL.
+
+        Prewarmed sessions nobody has claimed yet are kept: they exist to wait.
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            for key in list(self._idle):
+                keep = []
+                for session in self._idle[key]:
+                    idle = not session.prewarmed and now - session.last_used > self.idle_ttl
+                    (expired if idle else keep).append(session)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for session in expired:
+            logger.info(f"Evicting idle pooled session {session.session_id}")
+            session.quit()
+        return expired
+
+    def take_oldest(self) -> Optional[ManagedSession]:
+        """Remove the least recently used idle session from the pool without quitting it."""
+        with self._lock:
+            sessions = [session for sessions in self._idle.values() for session in sessions]
+            if not sessions:
+                return None
+            session = min(sessions, key=lambda pooled: pooled.last_used)
+            self._idle[session.key].remove(session)
+            if not self._idle[session.key]:
+                del self._idle[session.key]
+        return session
+
+    def discard(self, session: ManagedSession) -> bool:
+        """Remove a session from the pool without quitting it."""
+        with self._lock:
+            sessions = self._idle.get(session.key, [])
+            if session not in sessions:
+                return False
+            sessions.remove(session)
+            if not sessions:
+                del self._idle[session.key]
+            return True
+
+    def idle_count(self, key: str) -> int:
+        with self._lock:
+            return len(self._idle.get(key, ()))
+
+    def sessions(self) -> List[ManagedSession]:
+        with self._lock:
+            return [session for sessions in self._idle.values() for session in sessions]
+
+
+session_pool = SessionPool(float(os.environ.get("APPIUM_MCP_POOL_IDLE_TTL", "300")))
+
+# Managed session backing the current driver, if it was created by this server
+active_session = None
+
+# Sessions started by create calls and not released to the pool, keyed by session id
+open_sessions: Dict[str, ManagedSession] = {}
+
+
+class ClientState:
+    """The current driver and active session of one MCP client."""
+
+    def __init__(self, current_driver=None, session: Optional[ManagedSession] = None):
+        self.driver = current_driver
+        self.active_session = session
+
+
+# State of the client whose tool call is running; None outside client calls,
+# which use the module-level driver and active_session
+client_state = contextvars.ContextVar("client_state", default=None)
+
+
+def get_driver():
+    """The driver tool calls of the calling client go to."""
+    state = client_state.get()
+    return driver if state is None else state.driver
+
+
+def get_active_session() -> Optional[ManagedSession]:
+    """The managed session behind the calling client's driver, if this server created it."""
+    state = client_state.get()
+    return active_session if state is None else state.active_session
+
+
+def set_current(new_driver, session: Optional[ManagedSession] = None) -> None:
+    """Make a driver, and its session, the calling client's current ones."""
+    global driver, active_session
+
+    state = client_state.get()
+    if state is None:
+        driver, active_session = new_driver, session
+    else:
+        state.driver, state.active_session = new_driver, session
+
+
+def current_sessions() -> List[ManagedSession]:
+    """The sessions that are some client's current one, or the module-level one."""
+    sessions = [state.active_session for state in list(client_router.states.values())]
+    return [session for session in sessions + [active_session] if session is not None]
+
+
+def activate_session(session: ManagedSession) -> None:
+    """Make an open session the one the calling client's tool calls are sent to."""
+    open_sessions[session.session_id] = session
+    session.touch()
+    set_current(session.driver, session)
+    session_store.save()
+
+
+def forget_current(old_driver) -> None:
+    """Stop sending any client's tool calls to a driver."""
+    global driver, active_session
+
+    if driver is old_driver:
+        driver, active_session = None, None
+    for state in client_router.states.values():
+        if state.driver is old_driver:
+            state.driver, state.active_session = None, None
+
+
+def close_session(session: ManagedSession) -> None:
+    """Quit an open session and stop sending tool calls to it."""
+    open_sessions.pop(session.session_id, None)
+    forget_current(session.driver)
+    if not session.dead:
+        session.quit()
+
+
+# Multi-client serving
+class ServerBusy(Exception):
+    """Raised when too many tool calls are already waiting for their turn."""
+
+
+class ClientRouter:
+    """Give every connected MCP client its own current session.
+
+    Over a network transport many clients share one server, with its open
+    sessions, warm pool and caches. Each client has a ClientState with its
+    current driver and active session, which turn() makes the calling
+    client's for the duration of a call. Calls on the same driver run one
+    at a time under that driver's lock, a client without a driver uses a
+    lock of its own, and calls on different drivers run concurrently.
+    Calls beyond max_pending waiting ones are rejected with ServerBusy
+    instead of queueing without bound.
+    """
+
+    def __init__(self, max_pending: int = 0):
+        self.max_pending = max_pending
+        self.waiting = 0
+        self.running = 0
+        self.peak_running = 0
+        self.calls = 0
+        self.rejected = 0
+        # client id -> its current driver and active session
+        self.states: Dict[str, ClientState] = {}
+        self._clients = weakref.WeakKeyDictionary()
+        self._next_id = 0
+        # lock key -> [asyncio.Lock, number of calls holding or waiting for it]
+        self._locks: Dict[Any, list] = {}
+
+    def client_id(self, client_session) -> str:
+        client = self._clients.get(client_session)
+        if client is None:
+            self._next_id += 1
+            client = self._clients[client_session] = f"client-{self._next_id}"
+        return client
+
+    def connected(self) -> List[str]:
+        return list(self._clients.values())
+
+    def owned_by_other(self, session: ManagedSession, client: Optional[str]) -> bool:
+        """Whether the session is the current one of another connected client."""
+        return session.owner not in (None, client) and session.owner in self.connected()
+
+    def state_for(self, client: str) -> ClientState:
+        """The client's state, made when it first calls a tool."""
+        connected = self.connected()
+        for gone in [other for other in self.states if other not in connected]:
+            # Its session is left to the reaper, or to switch_session
+            del self.states[gone]
+        state = self.states.get(client)
+        if state is None:
+            state = self.states[client] = ClientState()
+            # A new client takes over the session nobody else holds, e.g. the one reattached at startup
+            taken = [other.active_session for other in self.states.values() if other is not state]
+            if active_session is None or (active_session not in taken and not self.owned_by_other(active_session, client)):
+                state.driver, state.active_session = driver, active_session
+        elif state.active_session is not None and open_sessions.get(state.active_session.session_id) is not state.active_session:
+            # Closed or reaped while the client was away
+            state.driver, state.active_session = None, None
+        return state
+
+    @contextlib.asynccontextmanager
+    async def turn(self, client: Optional[str]):
+        """Wait for the client's turn on its driver and run the call in its state; None means no MCP client."""
+        state = self.state_for(client) if client is not None else None
+        current = driver if state is None else state.driver
+        key = ("client", client) if current is None and client is not None else current
+        if self.max_pending and self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise ServerBusy(
+                f"Server busy: {self.waiting} tool calls are already waiting. Retry later."
+            )
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.waiting += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._unlock(key, entry, acquired=False)
+            raise
+        finally:
+            self.waiting -= 1
+        token = client_state.set(state)
+        self.calls += 1
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        try:
+            yield
+        finally:
+            self.running -= 1
+            client_state.reset(token)
+            if state is not None and state.active_session is not None:
+                state.active_session.owner = client
+            self._unlock(key, entry, acquired=True)
+
+    def _unlock(self, key, entry: list, acquired: bool) -> None:
+        if acquired:
+            entry[0].release()
+        entry[1] -= 1
+        if entry[1] == 0 and self._locks.get(key) is entry:
+            del self._locks[key]
+
+    def stats(self) -> Dict:
+        return {
+            "connected": len(self._clients),
+            "waiting": self.waiting,
+            "running": self.running,
+            "peak_running": self.peak_running,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "max_pending": self.max_pending,
+        }
+
+
+client_router = ClientRouter(int(os.environ.get("APPIUM_MCP_MAX_PENDING_CALLS", "64")))
+
+
+def current_client() -> Optional[str]:
+    """Id of the MCP client whose request is being handled, if any."""
+    try:
+        context = request_ctx.get()
+    except LookupError:
+        return None
+    return client_router.client_id(context.session)
+
+
+# Persisted per-device capability profiles
+class DeviceProfileStore:
+    """Remember what is installed on each device to skip redundant setup.
+
+    After a session starts, the profile records the device's udid, the app
+    build (by content hash), its package/bundle id and the Appium server
+    version. Later sessions on the same device use that to launch the
+    installed app and skip driver server installation, as long as nothing
+    has changed. Profiles are only applied to sessions that ask for a udid
+    or a named profile, and the device a session lands on must be the one
+    its profile was recorded on.
+    """
+
+    FILE_NAME = "device_profiles.json"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hash_cache: Dict[tuple, str] = {}
+        self._server_versions: Dict[str, tuple] = {}
+
+    @staticmethod
+    def profile_name(capabilities: Dict, udid: Optional[str] = None) -> Optional[str]:
+        """Profile of the requested (or given) udid; device names are shared, so they do not count."""
+        normalized = normalize_capabilities(capabilities)
+        platform = str(normalized.get("platformName", "")).lower()
+        udid = udid or normalized.get("udid")
+        return f"{platform}:{udid}" if isinstance(udid, str) and udid else None
+
+    def app_hash(self, app_path: Optional[str]) -> Optional[str]:
+        """SHA-256 of a local app file, cached by path, size and mtime."""
+        if not app_path or not os.path.isfile(app_path):
+            return None
+        stat = os.stat(app_path)
+        cache_key = (os.path.abspath(app_path), stat.st_size, stat.st_mtime)
+        if cache_key not in self._hash_cache:
+            digest = hashlib.sha256()
+            with open(app_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._hash_cache[cache_key] = digest.hexdigest()
+        return self._hash_cache[cache_key]
+
+    def server_version(self, server_url: str) -> Optional[str]:
+        """Appium server version from its status endpoint, cached briefly."""
+        cached = self._server_versions.get(server_url)
+        if cached and time.time() - cached[1] < 60:
+            return cached[0]
+        version = None
+        try:
+            import urllib.request
+
+            with urllib.request.urlopen(server_url.rstrip("/") + "/status", timeout=2) as response:
+                status = json.loads(response.read().decode("utf-8"))
+            version = (status.get("value") or {}).get("build", {}).get("version")
+        except Exception as e:
+            logger.debug(f"Could not read Appium server status: {e}")
+        self._server_versions[server_url] = (version, time.time())
+        return version
+
+    def load(self) -> Dict:
+        with self._lock:
+            return read_state_file(self.FILE_NAME, {})
+
+    def forget(self, name: str) -> bool:
+        with self._lock:
+            profiles = read_state_file(self.FILE_NAME, {})
+            removed = profiles.pop(name, None) is not None
+            if removed:
+                write_state_file(self.FILE_NAME, profiles)
+            return removed
+
+    def optimize(self, server_url: str, capabilities: Dict, name: Optional[str] = None):
+        """Return (profile name, optimized capabilities), or None when it is not safe."""
+        normalized = normalize_capabilities(capabilities)
+        if normalized.get("fullReset"):
+            return None
+        name = name or self.profile_name(capabilities)
+        profile = self.load().get(name) if name else None
+        if not profile or not profile.get("device"):
+            return None
+        if str(profile.get("automation_name")).lower() != str(normalized.get("automationName")).lower():
+            return None
+        version = self.server_version(server_url)
+        if version is None or version != profile.get("appium_version"):
+            return None
+
+        platform = str(normalized.get("platformName", "")).lower()
+        optimized = dict(capabilities)
+        if platform == "android":
+            optimized["appium:skipServerInstallation"] = True
+            optimized["appium:skipDeviceInitialization"] = True
+        elif platform == "ios":
+            optimized["appium:usePrebuiltWDA"] = True
+
+        # Launch the installed app instead of reinstalling an identical build
+        app_path = normalized.get("app")
+        installed = (
+            app_path
+            and profile.get("app_id")
+            and os.path.abspath(app_path) == profile.get("app_path")
+            and self.app_hash(app_path) == profile.get("app_hash")
+        )
+        if installed and platform == "android" and profile.get("app_activity"):
+            optimized.pop("appium:app", None)
+            optimized["appium:appPackage"] = profile["app_id"]
+            optimized["appium:appActivity"] = profile["app_activity"]
+        elif installed and platform == "ios":
+            optimized.pop("appium:app", None)
+            optimized["appium:bundleId"] = profile["app_id"]
+        return name, optimized
+
+    def record(self, server_url: str, capabilities: Dict, session_driver, name: Optional[str] = None) -> None:
+        """Store what a successfully started session installed on its device.
+
+        Nothing is stored when the session does not report the udid it runs on.
+        """
+        normalized = normalize_capabilities(capabilities)
+        session_caps = normalize_capabilities(session_driver.capabilities or {})
+
+        def text(value):
+            return value if isinstance(value, str) else None
+
+        udid = text(session_caps.get("udid"))
+        name = name or self.profile_name(capabilities, udid)
+        if not udid or not name:
+            return
+        app_path = text(normalized.get("app"))
+        profile = {
+            "platform": str(normalized.get("platformName", "")).lower(),
+            "device": udid,
+            "server_url": server_url,
+            "automation_name": normalized.get("automationName"),
+            "appium_version": self.server_version(server_url),
+            "app_path": os.path.abspath(app_path) if app_path else None,
+            "app_hash": self.app_hash(app_path),
+            "app_id": text(session_caps.get("appPackage") or session_caps.get("bundleId")
+                           or normalized.get("appPackage") or normalized.get("bundleId")),
+            "app_activity": text(session_caps.get("appActivity") or normalized.get("appActivity")),
+            "updated_at": datetime.datetime.now().isoformat(),
+        }
+        with self._lock:
+            profiles = read_state_file(self.FILE_NAME, {})
+            profiles[name] = profile
+            write_state_file(self.FILE_NAME, profiles)
+
+    def matches(self, name: str, session_driver) -> bool:
+        """Whether a session runs on the device its profile was recorded on."""
+        profile = self.load().get(name) or {}
+        udid = normalize_capabilities(session_driver.capabilities or {}).get("udid")
+        return bool(udid) and udid == profile.get("device")
+
+
+device_profiles = DeviceProfileStore()
+use_device_profiles = os.environ.get("APPIUM_MCP_DEVICE_PROFILES", "1") != "0"
+
+
+def launch_session(server_url: str, options, device_profile: Optional[str] = None) -> ManagedSession:
+    """Start a new Appium session, skipping setup the device profile says is done."""
+    from appium.options.common import AppiumOptions
+
+    load_webdriver()
+    requested = options.to_capabilities()
+    optimized = None
+    if use_device_profiles:
+        try:
+            optimized = device_profiles.optimize(server_url, requested, device_profile)
+        except Exception as e:
+            logger.warning(f"Could not apply device profile: {e}")
+
+    with session_reaper.reserve():
+        if optimized is not None:
+            name, capabilities = optimized
+            logger.info(f"Applying device profile '{name}': {capabilities}")
+            try:
+                new_driver = webdriver.Remote(
+                    server_url, options=AppiumOptions().load_capabilities(capabilities)
+                )
+                if not device_profiles.matches(name, new_driver):
+                    with contextlib.suppress(Exception):
+                        new_driver.quit()
+                    raise RuntimeError("the session started on a different device")
+            except Exception as e:
+                # The device no longer matches its profile; start from scratch
+                logger.warning(f"Session start with device profile '{name}' failed, retrying without it: {e}")
+                device_profiles.forget(name)
+                new_driver = webdriver.Remote(server_url, options=options)
+        else:
+            new_driver = webdriver.Remote(server_url, options=options)
+
+    session = ManagedSession(instrument_driver(new_driver), server_url, requested)
+    if use_device_profiles:
+        try:
+            device_profiles.record(server_url, requested, new_driver, device_profile)
+        except Exception as e:
+            logger.warning(f"Could not record device profile: {e}")
+    return session
+
+
+def session_isolation(capabilities: Dict) -> str:
+    """Isolation level a new session with these capabilities starts the app with."""
+    normalized = normalize_capabilities(capabilities)
+    if normalized.get("fullReset"):
+        return "install"
+    if not normalized.get("noReset"):
+        return "data"
+    return "process"
+
+
+def restart_app(session: ManagedSession, capabilities: Dict) -> None:
+    """Give a reused session the app state a new session with these capabilities would have."""
+    app_id = session.app_id
+    if app_id is None:
+        raise ValueError("app package or bundle id unknown")
+    reset_app_state(session.driver, "auto", session_isolation(capabilities), app_id)
+
+
+def obtain_session(
+    server_url: str, options, reuse: bool = True, device_profile: Optional[str] = None
+):
+    """Get a session for the given options and whether it was reused.
+
+    A warm session with matching capabilities is reused when available,
+    after resetting the app as the noReset and fullReset capabilities ask.
+    Otherwise, or if that reset fails, a new session is created.
+    """
+    capabilities = options.to_capabilities()
+    session_pool.evict_expired()
+    session = session_pool.acquire(session_key(server_url, capabilities)) if reuse else None
+    if session is not None:
+        logger.info(f"Reusing warm session {session.session_id}")
+        device_metadata.invalidate(session.driver)
+        try:
+            restart_app(session, capabilities)
+        except Exception as e:
+            logger.warning(f"Could not reset warm session {session.session_id}, starting a new one: {e}")
+            session.quit()
+            session = None
+    if session is not None:
+        reused = True
+    else:
+        session = launch_session(server_url, options, device_profile)
+        reused = False
+    return session, reused
+
+
+def open_session(
+    server_url: str, options, reuse: bool = True, device_profile: Optional[str] = None
+) -> bool:
+    """Make a session for the given options the current driver.
+
+    Returns True when a warm session was reused.
+    """
+    session, reused = obtain_session(server_url, options, reuse, device_profile)
+    activate_session(session)
+    # Top up pre-warmed sessions, including any taken or evicted above
+    session_prewarmer.replenish()
+    start_session_monitors()
+    return reused
+
+
+# Session health checks and reconnection
+DEAD_SESSION_ERRORS = (
+    "invalid session id",
+    "session is either terminated or not started",
+    "no such session",
+    "nosuchdrivererror",
+)
+RECONNECT_ATTEMPTS = int(os.environ.get("APPIUM_MCP_RECONNECT_ATTEMPTS", "3"))
+
+
+def is_dead_session_error(message) -> bool:
+    """Whether an error message means the Appium session no longer exists."""
+    message = str(message).lower()
+    return any(pattern in message for pattern in DEAD_SESSION_ERRORS)
+
+
+def managed_sessions() -> List[ManagedSession]:
+    """Every session this server is keeping alive: the open ones and the pooled ones."""
+    sessions = session_pool.sessions() + list(open_sessions.values())
+    return sessions + [session for session in current_sessions() if session not in sessions]
+
+
+class SessionHeartbeat:
+    """Background thread that keeps idle sessions alive and detects dead ones early."""
+
+    def __init__(self, interval: float = 30.0):
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def ensure_started(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="appium-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            self.beat()
+
+    def beat(self, now: Optional[float] = None) -> List[ManagedSession]:
+        """Ping sessions that have been quiet for a full interval; return dead ones."""
+        now = time.time() if now is None else now
+        dead = []
+        for session in managed_sessions():
+            if session.dead or now - max(session.last_used, session.last_heartbeat) < self.interval:
+                continue
+            if not session.is_alive() and session.dead:
+                logger.warning(f"Session {session.session_id} failed its heartbeat: {session.failure}")
+                dead.append(session)
+                session_pool.discard(session)
+        return dead
+
+
+session_heartbeat = SessionHeartbeat(float(os.environ.get("APPIUM_MCP_HEARTBEAT_INTERVAL", "30")))
+
+
+# Idle session reaping and resource limits
+class SessionLimitReached(Exception):
+    """Raised when starting a session would exceed the configured session limit."""
+
+
+class SessionReaper:
+    """Background thread that quits abandoned sessions and enforces session limits.
+
+    Open sessions idle for longer than idle_ttl, and any session older than
+    max_age, are quit so their devices are freed. New sessions are refused
+    once max_sessions live sessions exist and no pooled session can be evicted
+    to make room. A limit of 0 means no limit.
+    """
+
+    def __init__(self, interval: float = 60.0, idle_ttl: float = 1800.0, max_sessions: int = 0,
+                 max_age: float = 0.0):
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self.reclaimed = collections.deque(maxlen=100)
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def ensure_started(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="appium-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper failed: {e}")
+
+    def limits(self) -> Dict:
+        return {
+            "idle_ttl": self.idle_ttl,
+            "pool_idle_ttl": session_pool.idle_ttl,
+            "max_sessions": self.max_sessions,
+            "max_age": self.max_age,
+        }
+
+    @staticmethod
+    def live_count() -> int:
+        return sum(1 for session in managed_sessions() if not session.dead)
+
+    def _note(self, session: ManagedSession, reason: str, now: float) -> Dict:
+        capabilities = normalize_capabilities(session.capabilities)
+        entry = {
+            "session_id": session.session_id,
+            "reason": reason,
+            "device_name": capabilities.get("udid") or capabilities.get("deviceName"),
+            "idle_seconds": round(now - session.last_used, 1),
+            "age_seconds": round(now - session.created_at, 1),
+            "reaped_at": datetime.datetime.fromtimestamp(now).isoformat(),
+        }
+        self.reclaimed.append(entry)
+        return entry
+
+    @contextlib.contextmanager
+    def reserve(self):
+        """Hold a slot for a session that is being started.
+
+        Pooled sessions evicted to make room are picked under the lock but
+        quit after it is released, so other starts do not wait on the server.
+        """
+        evicted = []
+        try:
+            with self._lock:
+                if self.max_sessions > 0:
+                    while self.live_count() + self._starting >= self.max_sessions:
+                        session = session_pool.take_oldest()
+                        if session is None:
+                            raise SessionLimitReached(
+                                f"Session limit of {self.max_sessions} reached. Stop a session "
+                                f"with stop_appium_driver or reap idle ones with reap_sessions."
+                            )
+                        evicted.append(session)
+                        self._note(session, "limit", time.time())
+                self._starting += 1
+        finally:
+            for session in evicted:
+                logger.info(f"Evicting pooled session {session.session_id} to stay within the session limit")
+                session.quit()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._starting -= 1
+
+    def reap(self, now: Optional[float] = None) -> List[Dict]:
+        """Quit idle, expired and dead sessions; return what was reclaimed."""
+        now = time.time() if now is None else now
+        reclaimed = [self._note(session, "pool_idle", now) for session in session_pool.evict_expired(now)]
+        if self.max_age > 0:
+            for session in session_pool.sessions():
+                if now - session.created_at > self.max_age and session_pool.discard(session):
+                    session.quit()
+                    reclaimed.append(self._note(session, "max_age", now))
+
+        for session in list(open_sessions.values()):
+            if session.dead and session not in current_sessions():
+                reason = "dead"
+            elif self.idle_ttl > 0 and now - session.last_used > self.idle_ttl:
+                reason = "idle"
+            elif self.max_age > 0 and now - session.created_at > self.max_age:
+                reason = "max_age"
+            else:
+                continue
+            logger.info(f"Reaping session {session.session_id} ({reason})")
+            close_session(session)
+            reclaimed.append(self._note(session, reason, now))
+
+        if reclaimed:
+            session_store.save()
+            # Start replacements for prewarmed sessions that reached max_age
+            session_prewarmer.replenish()
+        return reclaimed
+
+
+session_reaper = SessionReaper(
+    interval=float(os.environ.get("APPIUM_MCP_REAPER_INTERVAL", "60")),
+    idle_ttl=float(os.environ.get("APPIUM_MCP_SESSION_IDLE_TTL", "1800")),
+    max_sessions=int(os.environ.get("APPIUM_MCP_MAX_SESSIONS", "0")),
+    max_age=float(os.environ.get("APPIUM_MCP_MAX_SESSION_AGE", "0")),
+)
+
+
+def start_session_monitors() -> None:
+    session_heartbeat.ensure_started()
+    session_reaper.ensure_started()
+
+
+def reconnect_active_session() -> None:
+    """Replace the dead active session with a new one using the same capabilities."""
+    from appium.options.common import AppiumOptions
+
+    dead = get_active_session()
+    last_error = None
+    for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+        try:
+            logger.info(f"Recreating dead session {dead.session_id} (attempt {attempt})")
+            options = AppiumOptions().load_capabilities(dead.capabilities)
+            session = launch_session(dead.server_url, options)
+        except Exception as e:
+            last_error = e
+            logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+            if attempt < RECONNECT_ATTEMPTS:
+                time.sleep(min(2 ** (attempt - 1), 10))
+            continue
+        open_sessions.pop(dead.session_id, None)
+        activate_session(session)
+        logger.info(f"Session {dead.session_id} replaced by {session.session_id}")
+        return
+    raise Exception(
+        f"Appium session {dead.session_id} is gone and could not be recreated after "
+        f"{RECONNECT_ATTEMPTS} attempts: {last_error}"
+    )
+
+
+def session_created_message(reused: bool) -> str:
+    if reused:
+        logger.info("Reused warm Appium session")
+        return f"Appium driver created successfully (reused warm session {get_active_session().session_id})."
+    logger.info("Appium driver created successfully")
+    return "Appium driver created successfully."
+
+
+# Sessions persisted so that a restarted server can reattach to them
+def attached_remote_class():
+    """Define AttachedRemote; it subclasses webdriver.Remote, which is imported lazily."""
+
+    class AttachedRemote(webdriver.Remote):
+        """WebDriver client for an existing session; no new session is created."""
+
+        def __init__(self, server_url: str, session_id: str, capabilities: Dict):
+            from appium.options.common import AppiumOptions
+
+            self._attach_to = (session_id, dict(capabilities))
+            super().__init__(server_url, options=AppiumOptions().load_capabilities(capabilities))
+
+        def start_session(self, capabilities, browser_profile=None) -> None:
+            self.session_id, self.caps = self._attach_to
+
+    return AttachedRemote
+
+
+def process_running(pid) -> bool:
+    """Whether a process with the given id exists."""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class SessionStore:
+    """Record open and pooled sessions in the state directory.
+
+    When the MCP host restarts the server, the new process reattaches to the
+    sessions the old one left running instead of letting them time out.
+    Records of other servers that are still running are left alone.
+    """
+
+    FILE_NAME = "sessions.json"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def record(session: ManagedSession, state: str) -> Dict:
+        session.persisted_at = time.time()
+        return {
+            "server_url": session.server_url,
+            "capabilities": session.capabilities,
+            "session_capabilities": dict(session.driver.capabilities or {}),
+            "created_at": session.created_at,
+            "last_used": session.last_used,
+            "state": state,
+            "pid": os.getpid(),
+        }
+
+    def load(self) -> Dict:
+        with self._lock:
+            return read_state_file(self.FILE_NAME, {})
+
+    def save(self) -> None:
+        """Write this server's sessions, keeping the records of other live servers."""
+        try:
+            records = {}
+            for session in session_pool.sessions():
+                records[session.session_id] = self.record(session, "pooled")
+            for session in list(open_sessions.values()):
+                state = "active" if session in current_sessions() else "open"
+                records[session.session_id] = self.record(session, state)
+            pid = os.getpid()
+            with self._lock:
+                for session_id, record in read_state_file(self.FILE_NAME, {}).items():
+                    owner = record.get("pid")
+                    if owner != pid and process_running(owner):
+                        records.setdefault(session_id, record)
+                write_state_file(self.FILE_NAME, records)
+        except Exception as e:
+            logger.warning(f"Could not persist sessions: {e}")
+
+    def attach(self, session_id: str, record: Dict) -> Optional[ManagedSession]:
+        """Reattach to a recorded session, or return None if it is gone."""
+        load_webdriver()
+        try:
+            attached = AttachedRemote(
+                record["server_url"], session_id, record.get("session_capabilities") or {}
+            )
+            session = ManagedSession(instrument_driver(attached), record["server_url"], record["capabilities"])
+        except Exception as e:
+            logger.warning(f"Could not reattach to session {session_id}: {e}")
+            return None
+        if not session.is_alive() and session.dead:
+            logger.info(f"Recorded session {session_id} no longer exists: {session.failure}")
+            return None
+        session.created_at = record.get("created_at", session.created_at)
+        session.last_used = record.get("last_used", session.last_used)
+        session.reattached = True
+        return session
+
+    def restore(self) -> Dict:
+        """Reattach to the sessions of servers that are no longer running.
+
+        Live sessions get back the role they had: current driver, open or
+        pooled. Orphans idle for longer than the pool TTL are quit, and
+        records of sessions that no longer exist are dropped.
+        """
+        orphans = {
+            session_id: record
+            for session_id, record in self.load().items()
+            if record.get("pid") != os.getpid() and not process_running(record.get("pid"))
+        }
+        result = {"reattached": [], "reaped": [], "gone": []}
+        if not orphans:
+            return result
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(8, len(orphans))) as executor:
+            attached = list(executor.map(lambda item: self.attach(*item), orphans.items()))
+
+        now = time.time()
+        for (session_id, record), session in zip(orphans.items(), attached):
+            if session is None:
+                result["gone"].append(session_id)
+            elif now - session.last_used > session_pool.idle_ttl:
+                logger.info(f"Reaping orphaned session {session_id}")
+                session.quit()
+                result["reaped"].append(session_id)
+            else:
+                logger.info(f"Reattached to session {session_id}")
+                if record.get("state") == "pooled":
+                    session_pool.release(session)
+                elif record.get("state") == "active" and get_active_session() is None:
+                    activate_session(session)
+                else:
+                    open_sessions[session_id] = session
+                result["reattached"].append(session_id)
+        self.save()
+        if result["reattached"]:
+            start_session_monitors()
+        return result
+
+
+session_store = SessionStore()
+
 
 @mcp.tool()
 async def start_appium_server() -> str:
@@ -93,6 +1605,125 @@ async def start_appium_server() -> str:
         return f"Failed to start Appium server: {e}"
 
 
+# Helper functions to build driver options
+def android_options(
+    app_path: str = None,
+    device_name: str = "Android Emulator",
+    platform_version: str = "10.0",
+    app_package: str = None,
+    app_activity: str = None,
+    automation_name: str = "UiAutomator2",
+    no_reset: bool = False,
+    full_reset: bool = False,
+    auto_grant_permissions: bool = True,
+):
+    """Build UiAutomator2 options for an Android session."""
+    from appium.options.android import UiAutomator2Options
+
+    options = UiAutomator2Options()
+    options.platform_name = "Android"
+    options.device_name = device_name
+    options.platform_version = platform_version
+    options.automation_name = automation_name
+    options.no_reset = no_reset
+    options.full_reset = full_reset
+    options.auto_grant_permissions = auto_grant_permissions
+
+    # Add app path or app package/activity if provided
+    if app_path:
+        options.app = app_path
+    elif app_package and app_activity:
+        options.app_package = app_package
+        options.app_activity = app_activity
+    else:
+        raise ValueError(
+            "Either app_path or both app_package and app_activity must be provided."
+        )
+    return options
+
+
+def ios_options(
+    app_path: str = None,
+    device_name: str = "iPhone Simulator",
+    platform_version: str = "15.0",
+    bundle_id: str = None,
+    automation_name: str = "XCUITest",
+    no_reset: bool = False,
+    full_reset: bool = False,
+    auto_accept_alerts: bool = True,
+):
+    """Build XCUITest options for an iOS session."""
+    from appium.options.ios import XCUITestOptions
+
+    options = XCUITestOptions()
+    options.platform_name = "iOS"
+    options.device_name = device_name
+    options.platform_version = platform_version
+    options.automation_name = automation_name
+    options.no_reset = no_reset
+    options.full_reset = full_reset
+    options.auto_accept_alerts = auto_accept_alerts
+
+    # Add app path or bundle ID if provided
+    if app_path:
+        options.app = app_path
+    elif bundle_id:
+        options.bundle_id = bundle_id
+    else:
+        raise ValueError("Either app_path or bundle_id must be provided.")
+    return options
+
+
+def mac_options(
+    app_path: str = None,
+    bundle_id: str = None,
+    app_name: str = None,
+    automation_name: str = "Mac2",
+):
+    """Build Mac2 options for a macOS session."""
+    from appium.options.mac import Mac2Options
+
+    options = Mac2Options()
+    options.platform_name = "Mac"
+    options.automation_name = automation_name
+
+    # Add app path, bundle ID, or app name if provided
+    if app_path:
+        options.app = app_path
+    elif bundle_id:
+        options.bundle_id = bundle_id
+    elif app_name:
+        # For system applications or already installed applications
+        options.app_name = app_name
+    else:
+        raise ValueError("Either app_path, bundle_id, or app_name must be provided.")
+    return options
+
+
+OPTIONS_BUILDERS = {
+    "android": android_options,
+    "ios": ios_options,
+    "mac": mac_options,
+}
+
+
+def build_options(platform: str, driver_options: Dict):
+    """Build driver options for a platform from create_*_driver keyword arguments.
+
+    Returns the Appium server URL and the options.
+    """
+    builder = OPTIONS_BUILDERS.get(platform.lower())
+    if builder is None:
+        raise ValueError(
+            f"Unknown platform '{platform}'. Use one of: {', '.join(OPTIONS_BUILDERS)}"
+        )
+    kwargs = dict(driver_options)
+    server_url = kwargs.pop("appium_server_url", "http://localhost:4723/wd/hub")
+    kwargs.pop("reuse_session", None)
+    kwargs.pop("device_profile", None)
+    return server_url, builder(**kwargs)
+
+
 @mcp.tool()
 async def create_android_driver(
     app_path: str = None,
@@ -105,9 +1736,10 @@ async def create_android_driver(
     no_reset: bool = False,
     full_reset: bool = False,
     auto_grant_permissions: bool = True,
+    reuse_session: bool = True,
+    device_profile: str = None,
 ) -> str:
     """Create an Appium driver instance for Android."""
-    global driver
 
     logger.info("Creating Android Appium driver with parameters:")
     logger.info(f"  App Path: {app_path}")
@@ -120,32 +1752,20 @@ async def create_android_driver(
 
     try:
         logger.info("Initializing Appium driver connection...")
-        
+
         # Create capabilities using AppiumOptions
-        from appium.options.android import UiAutomator2Options
-        
-        options = UiAutomator2Options()
-        options.platform_name = "Android"
-        options.device_name = device_name
-        options.platform_version = platform_version
-        options.automation_name = automation_name
-        options.no_reset = no_reset
-        options.full_reset = full_reset
-        options.auto_grant_permissions = auto_grant_permissions
-        
-        # Add app path or app package/activity if provided
-        if app_path:
-            options.app = app_path
-        elif app_package and app_activity:
-            options.app_package = app_package
-            options.app_activity = app_activity
-        else:
-            return "Either app_path or both app_package and app_activity must be provided."
-        
+        try:
+            options = android_options(
+                app_path, device_name, platform_version, app_package, app_activity,
+                automation_name, no_reset, full_reset, auto_grant_permissions,
+            )
+        except ValueError as e:
+            return str(e)
+
         logger.info(f"Using options: {options.capabilities}")
-        
-        # Create the driver with the options
-        driver = webdriver.Remote(appium_server_url, options=options)
+
+        # Create the driver with the options, reusing a warm session if possible
+        reused = open_session(appium_server_url, options, reuse_session, device_profile)
         logger.info("Appium driver connection established successfully")
     except Exception as e:
         error_msg = f"Failed to create Appium driver: {e}"
@@ -154,8 +1774,7 @@ async def create_android_driver(
         return error_msg
 
     # Return success message
-    logger.info("Appium driver created successfully")
-    return "Appium driver created successfully."
+    return session_created_message(reused)
 
 
 @mcp.tool()
@@ -169,9 +1788,10 @@ async def create_ios_driver(
     no_reset: bool = False,
     full_reset: bool = False,
     auto_accept_alerts: bool = True,
+    reuse_session: bool = True,
+    device_profile: str = None,
 ) -> str:
     """Create an Appium driver instance for iOS."""
-    global driver
 
     logger.info("Creating iOS Appium driver with parameters:")
     logger.info(f"  App Path: {app_path}")
@@ -183,31 +1803,20 @@ async def create_ios_driver(
 
     try:
         logger.info("Initializing Appium driver connection...")
-        
+
         # Create capabilities using AppiumOptions
-        from appium.options.ios import XCUITestOptions
-        
-        options = XCUITestOptions()
-        options.platform_name = "iOS"
-        options.device_name = device_name
-        options.platform_version = platform_version
-        options.automation_name = automation_name
-        options.no_reset = no_reset
-        options.full_reset = full_reset
-        options.auto_accept_alerts = auto_accept_alerts
-        
-        # Add app path or bundle ID if provided
-        if app_path:
-            options.app = app_path
-        elif bundle_id:
-            options.bundle_id = bundle_id
-        else:
-            return "Either app_path or bundle_id must be provided."
-        
+        try:
+            options = ios_options(
+                app_path, device_name, platform_version, bundle_id,
+                automation_name, no_reset, full_reset, auto_accept_alerts,
+            )
+        except ValueError as e:
+            return str(e)
+
         logger.info(f"Using options: {options.capabilities}")
-        
-        # Create the driver with the options
-        driver = webdriver.Remote(appium_server_url, options=options)
+
+        # Create the driver with the options, reusing a warm session if possible
+        reused = open_session(appium_server_url, options, reuse_session, device_profile)
         logger.info("Appium driver connection established successfully")
     except Exception as e:
         error_msg = f"Failed to create Appium driver: {e}"
@@ -216,8 +1825,7 @@ async def create_ios_driver(
         return error_msg
 
     # Return success message
-    logger.info("Appium driver created successfully")
-    return "Appium driver created successfully."
+    return session_created_message(reused)
 
 
 @mcp.tool()
@@ -227,9 +1835,10 @@ async def create_mac_driver(
     app_name: str = None,
     automation_name: str = "Mac2",
     appium_server_url: str = "http://localhost:4723/wd/hub",
+    reuse_session: bool = True,
+    device_profile: str = None,
 ) -> str:
     """Create an Appium driver instance for macOS desktop applications."""
-    global driver
 
     logger.info("Creating macOS Appium driver with parameters:")
     logger.info(f"  App Path: {app_path}")
@@ -240,29 +1849,17 @@ async def create_mac_driver(
 
     try:
         logger.info("Initializing Appium driver connection...")
-        
+
         # Create capabilities using AppiumOptions
-        from appium.options.mac import Mac2Options
-        
-        options = Mac2Options()
-        options.platform_name = "Mac"
-        options.automation_name = automation_name
-        
-        # Add app path, bundle ID, or app name if provided
-        if app_path:
-            options.app = app_path
-        elif bundle_id:
-            options.bundle_id = bundle_id
-        elif app_name:
-            # For system applications or already installed applications
-            options.app_name = app_name
-        else:
-            return "Either app_path, bundle_id, or app_name must be provided."
-        
+        try:
+            options = mac_options(app_path, bundle_id, app_name, automation_name)
+        except ValueError as e:
+            return str(e)
+
         logger.info(f"Using options: {options.capabilities}")
-        
-        # Create the driver with the options
-        driver = webdriver.Remote(appium_server_url, options=options)
+
+        # Create the driver with the options, reusing a warm session if possible
+        reused = open_session(appium_server_url, options, reuse_session, device_profile)
         logger.info("Appium driver connection established successfully")
     except Exception as e:
         error_msg = f"Failed to create Appium driver: {e}"
@@ -271,8 +1868,409 @@ async def create_mac_driver(
         return error_msg
 
     # Return success message
-    logger.info("Appium driver created successfully")
-    return "Appium driver created successfully."
+    return session_created_message(reused)
+
+
+def session_summary(session: ManagedSession) -> Dict:
+    """Describe an open session for tool results."""
+    capabilities = normalize_capabilities(session.capabilities)
+    return {
+        "session_id": session.session_id,
+        "platform": capabilities.get("platformName"),
+        "device_name": capabilities.get("udid") or capabilities.get("deviceName"),
+        "app_id": session.app_id,
+        "server_url": session.server_url,
+        "active": session is get_active_session(),
+        "dead": session.dead,
+        "reattached": session.reattached,
+        "owner": session.owner,
+        "idle_seconds": round(time.time() - session.last_used, 1),
+    }
+
+
+@mcp.tool()
+async def create_drivers(
+    devices: List[Dict[str, Any]],
+    max_parallel: int = 0,
+    ctx: Context = None,
+) -> Dict:
+    """
+    Start Appium sessions on several devices at the same time.
+
+    Sessions are reported as progress as each one becomes ready. The first
+    ready session becomes the current driver if there is none; use
+    switch_session to send tool calls to another one.
+
+    Args:
+        devices: One entry per device, with "platform" (android, ios or mac)
+            and the keyword arguments of the matching create_*_driver tool
+        max_parallel: Maximum number of sessions to start at once, 0 for no limit
+    """
+    if not devices:
+        return {"error": "No devices given."}
+
+    results: List[Optional[Dict]] = [None] * len(devices)
+    pending = []
+    for index, device_options in enumerate(devices):
+        device_options = dict(device_options)
+        platform = device_options.pop("platform", "android")
+        try:
+            server_url, options = build_options(platform, device_options)
+        except Exception as e:
+            results[index] = {"index": index, "success": False, "error": str(e)}
+            continue
+        pending.append((
+            index, server_url, options,
+            device_options.get("reuse_session", True), device_options.get("device_profile"),
+        ))
+
+    logger.info(f"Starting {len(pending)} Appium sessions in parallel")
+    started = time.perf_counter()
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(max_parallel, len(pending)) if max_parallel > 0 else len(pending)
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="appium-create")
+    futures = {
+        executor.submit(obtain_session, server_url, options, reuse, device_profile): index
+        for index, server_url, options, reuse, device_profile in pending
+    }
+    # Each started session is handed out once: to this call, or after a
+    # cancellation to the warm pool, so sessions that are late do not leak
+    claimed = set()
+    claim_lock = threading.Lock()
+    abandoned = threading.Event()
+
+    def claim(future) -> bool:
+        with claim_lock:
+            if future in claimed:
+                return False
+            claimed.add(future)
+            return True
+
+    def adopt(future) -> None:
+        if future.cancelled() or future.exception() is not None or not claim(future):
+            return
+        session, _ = future.result()
+        logger.info(f"Session {session.session_id} finished starting after create_drivers was cancelled")
+        session_pool.release(session)
+
+    for future in futures:
+        future.add_done_callback(lambda future: adopt(future) if abandoned.is_set() else None)
+
+    try:
+        waiting = {asyncio.wrap_future(future): future for future in futures}
+        done = 0
+        while waiting:
+            finished, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for ready in finished:
+                future = waiting.pop(ready)
+                if not claim(future):
+                    continue
+                index = futures[future]
+                done += 1
+                ready_ms = round((time.perf_counter() - started) * 1000)
+                error = ready.exception()
+                if error is not None:
+                    logger.error(f"Failed to create session for device {index}: {error}")
+                    results[index] = {"index": index, "success": False, "error": str(error), "ready_ms": ready_ms}
+                    message = f"Device {index} failed: {error}"
+                else:
+                    session, reused = ready.result()
+                    open_sessions[session.session_id] = session
+                    if get_driver() is None:
+                        activate_session(session)
+                    results[index] = dict(
+                        session_summary(session), index=index, success=True, reused=reused, ready_ms=ready_ms
+                    )
+                    message = f"Device {index} ready: session {session.session_id}"
+                if ctx is not None:
+                    await ctx.info(message)
+                    await ctx.report_progress(done, len(pending))
+    except asyncio.CancelledError:
+        abandoned.set()
+        for future in futures:
+            if future.done():
+                adopt(future)
+        raise
+    finally:
+        # Never block the event loop on sessions that are still starting
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if open_sessions:
+        session_store.save()
+        session_prewarmer.replenish()
+        start_session_monitors()
+    failed = sum(1 for result in results if not result["success"])
+    return {
+        "success": failed == 0,
+        "ready": len(results) - failed,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        "active_session_id": get_active_session().session_id if get_active_session() is not None else None,
+        "sessions": results,
+    }
+
+
+@mcp.tool()
+async def list_sessions() -> Dict:
+    """List the open Appium sessions and which one is current."""
+    return {
+        "success": True,
+        "sessions": [session_summary(session) for session in open_sessions.values()],
+        "warm_pool_size": len(session_pool),
+    }
+
+
+@mcp.tool()
+async def switch_session(session_id: str) -> Dict:
+    """
+    Send subsequent tool calls to another open session.
+
+    Args:
+        session_id: Session id returned by create_drivers or list_sessions
+    """
+    session = open_sessions.get(session_id)
+    if session is None:
+        return {"error": f"No open session with id {session_id}"}
+    if client_router.owned_by_other(session, current_client()):
+        return {"error": f"Session {session_id} is the current session of {session.owner}"}
+    activate_session(session)
+    return {"success": True, "session": session_summary(session)}
+
+
+# Session pre-warming
+class PrewarmProfile:
+    """A capability profile for which warm sessions are kept ready."""
+
+    def __init__(self, name: str, platform: str, count: int, driver_options: Dict):
+        self.name = name
+        self.platform = platform.lower()
+        self.count = count
+        self.driver_options = dict(driver_options)
+        # Validate the options up front so a bad profile fails at configuration time
+        self.server_url, options = self.build()
+        self.key = session_key(self.server_url, options.to_capabilities())
+        self.starting = 0
+        self.created = 0
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = 0.0
+
+    def build(self):
+        server_url, options = build_options(self.platform, self.driver_options)
+        # Keep the server from expiring the session while it waits in the pool
+        options.new_command_timeout = int(session_pool.idle_ttl) + 60
+        return server_url, options
+
+
+class SessionPrewarmer:
+    """Create sessions in the background so create calls find them in the pool."""
+
+    def __init__(self, max_workers: int = 4):
+        self.profiles: Dict[str, PrewarmProfile] = {}
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor = None
+
+    def configure(self, name: str, platform: str, count: int, driver_options: Dict) -> PrewarmProfile:
+        profile = PrewarmProfile(name, platform, count, driver_options)
+        with self._lock:
+            self.profiles[name] = profile
+        self.replenish()
+        start_session_monitors()
+        return profile
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self.profiles.pop(name, None) is not None
+
+    def replenish(self) -> None:
+        """Start enough sessions for every profile to reach its target count."""
+        now = time.time()
+        with self._lock:
+            for profile in self.profiles.values():
+                if now < profile.retry_at:
+                    continue
+                missing = profile.count - session_pool.idle_count(profile.key) - profile.starting
+                for _ in range(max(missing, 0)):
+                    profile.starting += 1
+                    self._submit(profile)
+
+    def _submit(self, profile: PrewarmProfile) -> None:
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="appium-prewarm"
+            )
+        self._executor.submit(self._spawn, profile)
+
+    def _spawn(self, profile: PrewarmProfile) -> None:
+        try:
+            logger.info(f"Pre-warming a session for profile '{profile.name}'")
+            server_url, options = profile.build()
+            session = launch_session(server_url, options)
+            with self._lock:
+                removed = self.profiles.get(profile.name) is not profile
+                profile.created += 1
+                profile.failures = 0
+            if removed:
+                session.quit()
+            else:
+                session.prewarmed = True
+                session_pool.release(session)
+                session_store.save()
+        except Exception as e:
+            logger.error(f"Failed to pre-warm session for profile '{profile.name}': {e}")
+            with self._lock:
+                profile.failures += 1
+                profile.last_error = str(e)
+                # Back off so an offline device does not cause a tight retry loop
+                profile.retry_at = time.time() + min(300, 5 * 2 ** profile.failures)
+        finally:
+            with self._lock:
+                profile.starting -= 1
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    "platform": profile.platform,
+                    "target": profile.count,
+                    "ready": session_pool.idle_count(profile.key),
+                    "starting": profile.starting,
+                    "created": profile.created,
+                    "failures": profile.failures,
+                    "last_error": profile.last_error,
+                }
+                for name, profile in self.profiles.items()
+            }
+
+    def load_profiles(self, path: str) -> None:
+        """Load profiles from a JSON file mapping names to platform/count/options."""
+        with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+        for name, profile in profiles.items():
+            self.configure(
+                name,
+                profile.get("platform", "android"),
+                int(profile.get("count", 1)),
+                profile.get("options", {}),
+            )
+
+
+session_prewarmer = SessionPrewarmer()
+
+
+@mcp.tool()
+async def prewarm_sessions(
+    profile: str,
+    platform: str = "android",
+    count: int = 1,
+    driver_options: Optional[Dict[str, Any]] = None,
+) -> Dict:
+    """
+    Keep sessions for a capability profile ready in the background.
+
+    Args:
+        profile: Name of the capability profile, e.g. "Pixel emulator + our APK"
+        platform: android, ios or mac
+        count: Number of idle sessions to keep ready; 0 removes the profile
+        driver_options: Keyword arguments of the matching create_*_driver tool
+    """
+    if count <= 0:
+        removed = session_prewarmer.remove(profile)
+        return {"success": removed, "message": f"Removed pre-warm profile {profile}" if removed
+                else f"No pre-warm profile named {profile}"}
+
+    try:
+        session_prewarmer.configure(profile, platform, count, driver_options or {})
+    except Exception as e:
+        return {"error": str(e)}
+    return {"success": True, "profiles": session_prewarmer.status()}
+
+
+@mcp.tool()
+async def get_prewarm_status() -> Dict:
+    """Get the number of ready and starting sessions for each pre-warm profile."""
+    return {"success": True, "profiles": session_prewarmer.status()}
+
+
+@mcp.tool()
+async def check_session_health() -> Dict:
+    """Check that the current session is alive, recreating it if it has died."""
+    check_driver()
+
+    if get_active_session() is None or get_active_session().driver is not get_driver():
+        return {"error": "The current driver was not created by this server and cannot be health checked."}
+
+    session_id = get_active_session().session_id
+    started = time.perf_counter()
+    if get_active_session().is_alive():
+        return {
+            "success": True,
+            "alive": True,
+            "session_id": session_id,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    failure = get_active_session().failure
+    if not get_active_session().dead:
+        return {"error": f"Could not reach the session, it will be checked again: {failure}", "session_id": session_id}
+    try:
+        reconnect_active_session()
+    except Exception as e:
+        return {"error": str(e), "alive": False, "session_id": session_id}
+    return {
+        "success": True,
+        "alive": False,
+        "failure": failure,
+        "reconnected": True,
+        "session_id": get_active_session().session_id,
+        "previous_session_id": session_id,
+    }
+
+
+@mcp.tool()
+async def reap_sessions() -> Dict:
+    """Quit idle, expired and dead sessions now and report what was reclaimed."""
+    try:
+        reclaimed = session_reaper.reap()
+    except Exception as e:
+        return {"error": str(e)}
+    return {
+        "success": True,
+        "reclaimed": reclaimed,
+        "recently_reclaimed": list(session_reaper.reclaimed),
+        "live_sessions": session_reaper.live_count(),
+        "limits": session_reaper.limits(),
+    }
+
+
+@mcp.tool()
+async def list_device_profiles() -> Dict:
+    """List the persisted per-device capability profiles."""
+    try:
+        return {"success": True, "profiles": device_profiles.load()}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+async def forget_device_profile(name: str) -> Dict:
+    """
+    Delete a device profile so the next session does a full setup.
+
+    Args:
+        name: Profile name, e.g. "android:emulator-5554"
+    """
+    try:
+        removed = device_profiles.forget(name)
+    except Exception as e:
+        return {"error": str(e)}
+    if not removed:
+        return {"success": False, "message": f"No device profile named {name}"}
+    return {"success": True, "message": f"Forgot device profile {name}"}
 
 
 # Helper function to convert WebElement to dictionary
@@ -341,16 +2339,1238 @@ def element_to_dict(element) -> Dict:
 
 # Helper function to check if driver is initialized
 def check_driver() -> None:
-    """Check if the Appium driver is initialized."""
-    if driver is None:
+    """Check if the Appium driver is initialized, recreating its session if it died."""
+    if get_driver() is None:
         logger.error("Appium driver not initialized. Call create_android_driver, create_ios_driver, or create_mac_driver first.")
         raise Exception(
             "Appium driver not initialized. Call create_android_driver, create_ios_driver, or create_mac_driver first."
         )
+    if get_active_session() is not None and get_active_session().driver is get_driver() and get_active_session().dead:
+        reconnect_active_session()
+
+
+# Device metadata that only changes on known actions
+class DeviceMetadataCache:
+    """Per-driver cache of window size, orientation and contexts.
+
+    Entries go away with their driver. Tools that change a value update or
+    invalidate it: set_device_orientation, switch_to_context and the app
+    lifecycle tools. Getter tools take refresh=True for changes the server
+    cannot see, such as the user rotating the device.
+    """
+
+    def __init__(self):
+        self._entries = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_driver, name: str, fetch):
+        with self._lock:
+            entry = self._entries.get(session_driver, {})
+            if name in entry:
+                self.hits += 1
+                return entry[name]
+        value = fetch()
+        self.set(session_driver, name, value)
+        with self._lock:
+            self.misses += 1
+        return value
+
+    def peek(self, session_driver, name: str):
+        """The cached value, or None, without fetching it."""
+        with self._lock:
+            return self._entries.get(session_driver, {}).get(name)
+
+    def set(self, session_driver, name: str, value) -> None:
+        with self._lock:
+            self._entries.setdefault(session_driver, {})[name] = value
+
+    def invalidate(self, session_driver, *names: str) -> None:
+        """Drop the named values, or all values of the driver when none are named."""
+        with self._lock:
+            entry = self._entries.get(session_driver)
+            if entry is None:
+                return
+            if not names:
+                entry.clear()
+            for name in names:
+                entry.pop(name, None)
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+device_metadata = DeviceMetadataCache()
+
+
+def window_size() -> Dict:
+    """Window size of the current driver, fetched once per orientation."""
+    return device_metadata.get(get_driver(), "window_size", get_driver().get_window_size)
+
+
+# Element handles reused between tool calls
+class ElementCache:
+    """Per-driver cache from locator to the element it found last.
+
+    Tools acting on the same locator again use the cached element instead
+    of searching. A stale element is dropped and searched for again.
+    Taps, gestures, navigation, app lifecycle, rotation and context
+    switches drop every element of the driver, since elements found
+    before may be gone or, in recycled lists, show other content.
+    """
+
+    def __init__(self, max_entries: int = 256, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def get(self, session_driver, key: tuple):
+        if not self.enabled:
+            return None
+        with self._lock:
+            element = self._entries.get(session_driver, {}).get(key)
+            if element is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return element
+
+    def put(self, session_driver, key: tuple, element) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            elements = self._entries.setdefault(session_driver, collections.OrderedDict())
+            elements[key] = element
+            elements.move_to_end(key)
+            while len(elements) > self.max_entries:
+                elements.popitem(last=False)
+
+    def discard(self, session_driver, key: tuple) -> None:
+        """Drop an element that turned out to be stale."""
+        with self._lock:
+            self.stale += 1
+            self._entries.get(session_driver, {}).pop(key, None)
+
+    def invalidate(self, session_driver) -> None:
+        with self._lock:
+            elements = self._entries.get(session_driver)
+            if elements:
+                self.invalidations += 1
+                elements.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stale": self.stale,
+            "invalidations": self.invalidations,
+        }
+
+
+element_cache = ElementCache(
+    int(os.environ.get("APPIUM_MCP_ELEMENT_CACHE_SIZE", "256")),
+    os.environ.get("APPIUM_MCP_ELEMENT_CACHE", "1") != "0",
+)
+
+
+def with_element(by_enum, value: str, timeout: float, action, clickable: bool = False):
+    """Run action on the element a locator finds, reusing the cached element if it is still valid."""
+    key = (by_enum, value)
+    element = element_cache.get(get_driver(), key)
+    if element is not None:
+        try:
+            if clickable:
+                element = wait_until(EC.element_to_be_clickable(element), timeout)
+            return action(element)
+        except (StaleElementReferenceException, NoSuchElementException):
+            element_cache.discard(get_driver(), key)
+    condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+    element = wait_until(condition(key), timeout)
+    element_cache.put(get_driver(), key, element)
+    return action(element)
+
+
+# Large payloads
+class PayloadStore:
+    """Content-addressed LRU store for page sources and screenshots.
+
+    Tools return a resource URI and a summary for payloads above the inline
+    limit; clients read the payload, or byte ranges of it, as MCP resources
+    or with read_payload. The least recently used payloads are dropped once
+    the store holds more than max_bytes.
+    """
+
+    def __init__(self, max_bytes: int, inline_limit: int):
+        self.max_bytes = max_bytes
+        self.inline_limit = inline_limit
+        self.size = 0
+        self._payloads: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._payloads:
+                self._payloads.move_to_end(digest)
+                return digest
+            self._payloads[digest] = (data, mime_type)
+            self.size += len(data)
+            while self.size > self.max_bytes and len(self._payloads) > 1:
+                _, (evicted, _) = self._payloads.popitem(last=False)
+                self.size -= len(evicted)
+        return digest
+
+    def get(self, digest: str) -> tuple:
+        """Return (data, mime type) of a stored payload."""
+        with self._lock:
+            if digest not in self._payloads:
+                raise KeyError(
+                    f"Payload {digest} is no longer cached. Call the tool that produced it again."
+                )
+            self._payloads.move_to_end(digest)
+            return self._payloads[digest]
+
+    @staticmethod
+    def bounds(byte_range: Optional[str], size: int) -> tuple:
+        """Start and end offsets of an inclusive byte range such as "0-1023" or "1024-"."""
+        if not byte_range:
+            return 0, size
+        match = re.fullmatch(r"(\d+)-(\d*)", byte_range)
+        if match is None:
+            raise ValueError(f"Invalid byte range: {byte_range}. Use START-END or START-.")
+        start = int(match.group(1))
+        end = int(match.group(2)) + 1 if match.group(2) else size
+        return start, min(end, size)
+
+    def read(self, digest: str, byte_range: Optional[str] = None) -> bytes:
+        """Read a payload, or an inclusive byte range of it."""
+        data, _ = self.get(digest)
+        start, end = self.bounds(byte_range, len(data))
+        return data[start:end]
+
+
+payload_store = PayloadStore(
+    int(float(os.environ.get("APPIUM_MCP_PAYLOAD_CACHE_MB", "64")) * 1024 * 1024),
+    int(os.environ.get("APPIUM_MCP_INLINE_PAYLOAD_BYTES", "16384")),
+)
+
+PAGE_SOURCE_URI = "appium://page-source/{digest}"
+SCREENSHOT_URI = "appium://screenshots/{digest}"
+# appium://<kind>/<digest> with an optional /<byte_range>
+PAYLOAD_URI = re.compile(r"appium://(?:page-source|screenshots)/([0-9a-f]+)(?:/([^/]+))?/?")
+
+
+def stored_payload(kind_uri: str, data: bytes, mime_type: str) -> Dict:
+    """Store a payload and describe it for a tool result."""
+    digest = payload_store.put(data, mime_type)
+    return {
+        "resource_uri": kind_uri.format(digest=digest),
+        "mime_type": mime_type,
+        "size_bytes": len(data),
+        "sha256": digest,
+    }
+
+
+def png_size(data: bytes) -> Optional[Dict]:
+    """Width and height from a PNG header."""
+    if data[:8] != b"\x89PNG\r\n\x1a\n" or len(data) < 24:
+        return None
+    return {"width": int.from_bytes(data[16:20], "big"), "height": int.from_bytes(data[20:24], "big")}
+
+
+@mcp.resource(PAGE_SOURCE_URI, mime_type="application/xml")
+def page_source_resource(digest: str) -> str:
+    """Page source stored by get_page_source."""
+    return payload_store.read(digest).decode("utf-8")
+
+
+@mcp.resource(PAGE_SOURCE_URI + "/{byte_range}", mime_type="application/xml")
+def page_source_range_resource(digest: str, byte_range: str) -> str:
+    """Byte range of a stored page source, e.g. .../0-65535."""
+    return payload_store.read(digest, byte_range).decode("utf-8", errors="ignore")
+
+
+@mcp.resource(SCREENSHOT_URI, mime_type="image/png")
+def screenshot_resource(digest: str) -> bytes:
+    """Screenshot stored by take_screenshot."""
+    return payload_store.read(digest)
+
+
+@mcp.resource(SCREENSHOT_URI + "/{byte_range}", mime_type="image/png")
+def screenshot_range_resource(digest: str, byte_range: str) -> bytes:
+    """Byte range of a stored screenshot."""
+    return payload_store.read(digest, byte_range)
+
+
+@mcp.tool()
+async def read_payload(resource_uri: str, offset: int = 0, length: int = 65536) -> Dict:
+    """
+    Read part of a page source or screenshot stored by get_page_source or take_screenshot.
+
+    For clients that cannot read MCP resources. Text is returned as is,
+    binary data base64-encoded.
+
+    Args:
+        resource_uri: URI returned by get_page_source or take_screenshot, optionally
+            followed by a byte range such as /0-65535
+        offset: First byte to read, counted from the start of the range
+        length: Number of bytes to read
+    """
+    match = PAYLOAD_URI.fullmatch(resource_uri.strip())
+    if match is None:
+        return {"error": f"Not a page source or screenshot URI: {resource_uri}"}
+    digest, byte_range = match.groups()
+    try:
+        data, mime_type = payload_store.get(digest)
+        start, end = payload_store.bounds(byte_range, len(data))
+    except KeyError as e:
+        return {"error": str(e.args[0])}
+    except ValueError as e:
+        return {"error": str(e)}
+    start = min(start + offset, end)
+    chunk = data[start:min(start + length, end)]
+    result = {
+        "success": True,
+        "offset": start,
+        "length": len(chunk),
+        "size_bytes": len(data),
+        "more": start + len(chunk) < end,
+    }
+    if mime_type.startswith("image/"):
+        result["data_base64"] = base64.b64encode(chunk).decode("ascii")
+    else:
+        result["text"] = chunk.decode("utf-8", errors="ignore")
+    return result
+
+
+# Locators
+# A validated locator; rewritten_from holds the (by, value) it was rewritten from
+Locator = collections.namedtuple("Locator", ["strategy", "value", "rewritten_from"])
+
+rewrite_xpath_locators = os.environ.get("APPIUM_MCP_REWRITE_XPATH", "1") != "0"
+
+# Only the native UI hierarchy has the attributes XPath is rewritten from
+NATIVE_CONTEXT = "NATIVE_APP"
+
+# (using, value) of each rewritten locator -> the XPath it was rewritten from,
+# and per driver the rewrites its server rejected, which are searched for as
+# the XPath from then on
+xpath_rewrites: Dict[tuple, str] = {}
+rejected_rewrites = weakref.WeakKeyDictionary()
+REJECTED_LOCATOR = re.compile(r"invalid selector|locator strategy .* is not supported", re.IGNORECASE)
+
+# Simple XPath patterns that have a faster equivalent. Values with quotes or
+# backslashes are left alone rather than escaped.
+XPATH_ATTRIBUTE = re.compile(r"""//(\*|[A-Za-z][\w.]*)\[@([\w-]+)\s*=\s*(?:'([^'"\\]*)'|"([^'"\\]*)")\]""")
+XPATH_CONTAINS = re.compile(
+    r"""//(\*|[A-Za-z][\w.]*)\[contains\(@([\w-]+),\s*(?:'([^'"\\]*)'|"([^'"\\]*)")\)\]"""
+)
+XPATH_CLASS = re.compile(r"//([A-Za-z][\w.]*)")
+
+# XPath attribute -> UiSelector method, and the iOS attributes predicates can match
+UI_SELECTOR_METHODS = {
+    "resource-id": "resourceId", "text": "text", "content-desc": "description", "class": "className",
+}
+IOS_PREDICATE_ATTRIBUTES = ("name", "label", "value")
+
+
+def normalize_strategy(by: str) -> str:
+    """AppiumBy attribute name for a by argument: "id", "accessibility id", "-android uiautomator"..."""
+    return str(by).strip().lstrip("-").upper().replace(" ", "_").replace("-", "_")
+
+
+def check_xpath(value: str) -> None:
+    """Reject XPath with unbalanced quotes, brackets or parentheses before it reaches the device."""
+    closing = {"]": "[", ")": "("}
+    stack = []
+    quote = None
+    for char in value:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "[(":
+            stack.append(char)
+        elif char in closing:
+            if not stack or stack.pop() != closing[char]:
+                raise ValueError(f"Invalid XPath: unbalanced '{char}' in {value}")
+    if quote or stack:
+        raise ValueError(f"Invalid XPath: unclosed {quote or stack[-1]!r} in {value}")
+
+
+def rewrite_xpath(value: str, platform: Optional[str], context: str = NATIVE_CONTEXT) -> Optional[tuple]:
+    """Equivalent (strategy, value) for a simple XPath on the given platform, if there is one.
+
+    XPath in a webview searches the DOM, which has no native equivalent.
+    """
+    if context != NATIVE_CONTEXT:
+        return None
+    match = XPATH_ATTRIBUTE.fullmatch(value)
+    contains = match is None
+    if contains:
+        match = XPATH_CONTAINS.fullmatch(value)
+    if match is None:
+        match = XPATH_CLASS.fullmatch(value)
+        if match is not None and platform in ("android", "ios"):
+            return "CLASS_NAME", match.group(1)
+        return None
+    tag, attribute = match.group(1), match.group(2)
+    text = match.group(3) if match.group(3) is not None else match.group(4)
+
+    if platform == "android":
+        if tag == "*" and not contains:
+            if attribute == "resource-id" and ":id/" in text:
+                return "ID", text
+            if attribute == "content-desc":
+                return "ACCESSIBILITY_ID", text
+        if attribute not in UI_SELECTOR_METHODS or (contains and attribute not in ("text", "content-desc")):
+            return None
+        selector = "new UiSelector()"
+        if tag != "*":
+            selector += f'.className("{tag}")'
+        method = UI_SELECTOR_METHODS[attribute] + ("Contains" if contains else "")
+        return "ANDROID_UIAUTOMATOR", f'{selector}.{method}("{text}")'
+
+    if platform == "ios":
+        if tag == "*" and attribute == "name" and not contains:
+            return "ACCESSIBILITY_ID", text
+        if attribute not in IOS_PREDICATE_ATTRIBUTES:
+            return None
+        predicate = f'{attribute} {"CONTAINS" if contains else "=="} "{text}"'
+        if tag != "*":
+            predicate = f'type == "{tag}" AND {predicate}'
+        return "IOS_PREDICATE", predicate
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_locator(
+    by: str, value: str, platform: Optional[str] = None, context: str = NATIVE_CONTEXT
+) -> Locator:
+    """Validate a locator and rewrite simple native XPath to a faster strategy."""
+    load_webdriver()
+    strategy = normalize_strategy(by)
+    if not strategy or not hasattr(AppiumBy, strategy):
+        strategies = ", ".join(name.lower() for name in dir(AppiumBy) if name.isupper())
+        raise ValueError(f"Unknown locator strategy '{by}'. Use one of: {strategies}")
+    if not isinstance(value, str) or not value:
+        raise ValueError("Locator value must be a non-empty string")
+    if strategy == "XPATH":
+        check_xpath(value)
+        rewritten = rewrite_xpath(value, platform, context) if rewrite_xpath_locators else None
+        if rewritten is not None:
+            xpath_rewrites[(getattr(AppiumBy, rewritten[0]), rewritten[1])] = value
+            return Locator(rewritten[0], rewritten[1], (by, value))
+    return Locator(strategy, value, None)
+
+
+def session_platform() -> Optional[str]:
+    """Lower-case platform name of the current driver, if it reports one."""
+    capabilities = getattr(get_driver(), "capabilities", None)
+    if not isinstance(capabilities, dict):
+        return None
+    platform = normalize_capabilities(capabilities).get("platformName")
+    return str(platform).lower() if platform else None
+
+
+def session_context() -> str:
+    """Context of the current driver, as last set or read by the context tools.
+
+    Sessions start in the native context unless they ask for autoWebview,
+    so the device is only asked in that case.
+    """
+    if get_driver() is None:
+        return NATIVE_CONTEXT
+    context = device_metadata.peek(get_driver(), "current_context")
+    if context is None:
+        capabilities = getattr(get_driver(), "capabilities", None)
+        if isinstance(capabilities, dict) and normalize_capabilities(capabilities).get("autoWebview"):
+            context = device_metadata.get(get_driver(), "current_context", lambda: get_driver().current_context)
+    return context or NATIVE_CONTEXT
+
+
+def resolve_locator(by: str, value: str) -> tuple:
+    """The (AppiumBy strategy, value) to search with for a tool's locator arguments."""
+    locator = compile_locator(by, value, session_platform(), session_context())
+    target = (getattr(AppiumBy, locator.strategy), locator.value)
+    if locator.rewritten_from is not None and target in rejected_rewrites.get(get_driver(), ()):
+        return AppiumBy.XPATH, value
+    return target
+
+
+def xpath_fallback(session_driver, params, error: Exception) -> Optional[Dict]:
+    """Find parameters searching by the original XPath, when the server rejected a rewritten locator."""
+    if not isinstance(params, dict) or not REJECTED_LOCATOR.search(str(error)):
+        return None
+    target = (params.get("using"), params.get("value"))
+    original = xpath_rewrites.get(target)
+    if original is None:
+        return None
+    logger.info(f"Server rejected the rewritten locator {target}, searching by XPath {original}")
+    rejected_rewrites.setdefault(session_driver, set()).add(target)
+    return dict(params, using=AppiumBy.XPATH, value=original)
+
+
+# Text entry
+TEXT_MODES = ("auto", "keys", "replace", "clipboard")
+
+# Modes tried before send_keys in auto mode, fastest first. XCUITest types
+# the whole string in one XCTest call already and has no replace command.
+FAST_TEXT_MODES = {"android": ("replace", "clipboard")}
+
+# Android key code that pastes the clipboard into the focused field
+KEYCODE_PASTE = 279
+
+# Characters password fields show instead of their text
+MASK_CHARACTERS = set("•●*")
+
+# Fast modes a session's driver rejected; auto mode skips them afterwards
+unsupported_text_modes = weakref.WeakKeyDictionary()
+
+# Error messages of drivers that do not implement a command at all
+UNSUPPORTED_COMMAND = re.compile(
+    r"unknown (mobile )?(command|method)|not (yet )?(been )?implemented|unsupported operation", re.IGNORECASE
+)
+
+
+def unsupported_command(error: Exception) -> bool:
+    """Whether a WebDriver error says the command does not exist, rather than that it failed this time."""
+    return type(error).__name__ == "UnknownMethodException" or bool(UNSUPPORTED_COMMAND.search(str(error)))
+
+
+def text_modes(mode: str) -> List[str]:
+    """The entry modes to try, in order, for a set_text mode argument."""
+    if mode not in TEXT_MODES:
+        raise ValueError(f"Unknown text entry mode '{mode}'. Use one of: {', '.join(TEXT_MODES)}")
+    if mode != "auto":
+        return [mode]
+    unsupported = unsupported_text_modes.get(get_driver(), set())
+    fast = FAST_TEXT_MODES.get(session_platform(), ())
+    return [candidate for candidate in fast if candidate not in unsupported] + ["keys"]
+
+
+def write_text(element, text: str, mode: str) -> None:
+    """Replace the whole text of an element with one of the fast entry modes."""
+    if mode == "replace":
+        get_driver().execute_script("mobile: replaceElementValue", {"elementId": element.id, "text": text})
+    elif mode == "clipboard":
+        get_driver().set_clipboard_text(text)
+        element.clear()
+        element.click()
+        get_driver().press_keycode(KEYCODE_PASTE)
+
+
+def text_matches(actual: Optional[str], expected: str) -> bool:
+    """Whether a field shows the expected text, allowing for masked password fields."""
+    if actual == expected:
+        return True
+    return isinstance(actual, str) and len(actual) == len(expected) and set(actual) <= MASK_CHARACTERS
+
+
+def field_mismatch(actual: Optional[str]) -> str:
+    """Describe a field that did not take the text, without repeating what it holds."""
+    if actual is None:
+        return "field text could not be read"
+    return f"field shows {len(actual)} characters that do not match"
+
+
+def enter_text(
+    element, text: str, clear_first: bool, modes: List[str], current: Optional[str] = None, verify: bool = True
+) -> tuple:
+    """Enter text with the first mode that works; returns the mode and whether it was verified.
+
+    send_keys is trusted as is. The fast modes replace the whole value, so
+    appending reads the current text first (unless the caller knows it), and
+    the field is read back afterwards: a mode that leaves other text behind
+    is not reported as a success. With verify=False the first fast mode the
+    driver accepts is used and the caller checks the result. After a fast
+    mode has touched the field, send_keys types the whole expected text into
+    the cleared field rather than appending to what the fast mode left.
+    """
+    failures = []
+    written = False
+    for mode in modes:
+        if mode == "keys":
+            if clear_first or written:
+                element.clear()
+            element.send_keys(current + text if written else text)
+            return mode, False
+        try:
+            if current is None:
+                current = "" if clear_first else (element.text or "")
+            written = True
+            write_text(element, current + text, mode)
+            if not verify:
+                return mode, False
+            actual = element.text
+        except (StaleElementReferenceException, NoSuchElementException):
+            raise
+        except WebDriverException as e:
+            if unsupported_command(e):
+                unsupported_text_modes.setdefault(get_driver(), set()).add(mode)
+            failures.append(f"{mode}: {e.msg or e.__class__.__name__}")
+            continue
+        if text_matches(actual, current + text):
+            return mode, True
+        failures.append(f"{mode}: {field_mismatch(actual)}")
+    raise RuntimeError("Could not set text. " + "; ".join(failures))
+
+
+# Page snapshots
+UI_SELECTOR_CALL = re.compile(r"""\.(\w+)\("([^"\\]*)"\)""")
+
+# UiSelector method -> page source attribute, and whether it matches a substring
+UI_SELECTOR_ATTRIBUTES = {
+    "resourceId": ("resource-id", False), "text": ("text", False), "description": ("content-desc", False),
+    "className": ("class", False), "textContains": ("text", True), "descriptionContains": ("content-desc", True),
+}
+
+
+class PageSnapshot:
+    """One page source, parsed, answering simple locators without the device.
+
+    match() returns the matching nodes, or None for locators it cannot
+    evaluate (predicates, class chains, most XPath); callers look those up
+    live.
+    """
+
+    def __init__(self, source: str, platform: Optional[str]):
+        self.platform = platform
+        self.root = ET.fromstring(source.encode("utf-8"))
+
+    @classmethod
+    def capture(cls) -> "PageSnapshot":
+        return cls(get_driver().page_source, session_platform())
+
+    def nodes_where(self, conditions: List[tuple]) -> List[ET.Element]:
+        """Nodes whose attributes match all (attribute, text, contains) conditions."""
+        def matches(node, attribute, text, contains):
+            actual = node.tag if attribute == "class" and node.get("class") is None else node.get(attribute)
+            if actual is None:
+                return False
+            return text in actual if contains else actual == text
+
+        return [
+            node for node in self.root.iter()
+            if all(matches(node, *condition) for condition in conditions)
+        ]
+
+    def match(self, locator: Locator) -> Optional[List[ET.Element]]:
+        strategy, value = locator.strategy, locator.value
+        ios = self.platform == "ios"
+        if strategy == "ID":
+            if ios:
+                return self.nodes_where([("name", value, False)])
+            # UiAutomator2 prefixes ids without a package with the app's package
+            return [
+                node for node in self.root.iter()
+                if node.get("resource-id") == value or (node.get("resource-id") or "").endswith(":id/" + value)
+            ]
+        if strategy == "ACCESSIBILITY_ID":
+            return self.nodes_where([("name" if ios else "content-desc", value, False)])
+        if strategy == "CLASS_NAME":
+            return self.nodes_where([("type" if ios else "class", value, False)])
+        if strategy == "ANDROID_UIAUTOMATOR" and value.startswith("new UiSelector()"):
+            calls = UI_SELECTOR_CALL.findall(value)
+            if "new UiSelector()" + "".join(f'.{method}("{text}")' for method, text in calls) != value:
+                return None
+            if not calls or any(method not in UI_SELECTOR_ATTRIBUTES for method, _ in calls):
+                return None
+            conditions = []
+            for method, text in calls:
+                attribute, contains = UI_SELECTOR_ATTRIBUTES[method]
+                conditions.append((attribute, text, contains))
+            return self.nodes_where(conditions)
+        if strategy == "XPATH":
+            match = XPATH_ATTRIBUTE.fullmatch(value) or XPATH_CONTAINS.fullmatch(value)
+            if match is None:
+                match = XPATH_CLASS.fullmatch(value)
+                return [node for node in self.root.iter() if node.tag == match.group(1)] if match else None
+            tag, attribute = match.group(1), match.group(2)
+            text = match.group(3) if match.group(3) is not None else match.group(4)
+            contains = match.re is XPATH_CONTAINS
+            return [
+                node for node in self.nodes_where([(attribute, text, contains)])
+                if tag == "*" or node.tag == tag
+            ]
+        return None
+
+    def text(self, node: ET.Element) -> Optional[str]:
+        """The text a node shows: its value (or label) on iOS, its text on Android."""
+        if self.platform == "ios":
+            return node.get("value") if node.get("value") is not None else node.get("label")
+        return node.get("text")
+
+    def read(self, node: ET.Element, attributes: List[str]) -> Optional[Dict]:
+        """The requested attributes of a node, or None if the page source lacks one of them."""
+        values = {}
+        for attribute in attributes:
+            if attribute == "text":
+                values["text"] = self.text(node)
+            elif attribute in node.attrib:
+                values[attribute] = node.get(attribute)
+            else:
+                return None
+        return values
+
+
+# Screen fingerprints
+def screen_features(snapshot: PageSnapshot) -> frozenset:
+    """Structural features of a screen: its element types and ids, and parent-child pairs of them.
+
+    Texts, descriptions, bounds and states are left out, and a set has no
+    counts, so a list showing 5 or 50 rows of the same layout, or other
+    data, gives the same features.
+    """
+    def token(node):
+        tag = node.get("class") or node.tag
+        if snapshot.platform == "ios":
+            # iOS names default to the label; only a distinct name is an identifier
+            name = node.get("name")
+            identifier = name if name and name not in (node.get("label"), node.get("value")) else ""
+        else:
+            identifier = (node.get("resource-id") or "").rsplit(":id/", 1)[-1]
+        return f"{tag}#{identifier}" if identifier else tag
+
+    features = set()
+    stack = [(snapshot.root, "")]
+    while stack:
+        node, parent = stack.pop()
+        current = token(node)
+        features.add(current)
+        features.add(f"{parent}>{current}")
+        stack.extend((child, current) for child in node)
+    return frozenset(features)
+
+
+def screen_fingerprint(features: frozenset) -> str:
+    return hashlib.sha256("\n".join(sorted(features)).encode("utf-8")).hexdigest()[:16]
+
+
+def screen_similarity(first: frozenset, second: frozenset) -> float:
+    """Jaccard similarity of two feature sets."""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class ScreenIndex:
+    """Named screens and the features of a few examples of each, persisted as JSON.
+
+    identify() compares a screen with every example of every screen of the
+    same app and returns the nearest names. A screen saved again under the
+    same name adds an example, so layouts that vary (a logged in and a
+    logged out menu) can share a name.
+    """
+
+    MAX_EXAMPLES = 5
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._screens = None
+
+    def _load(self) -> Dict:
+        if self._screens is None:
+            screens = read_state_file(self.path, {})
+            self._screens = {
+                name: dict(entry, examples=[frozenset(example) for example in entry.get("examples", [])])
+                for name, entry in screens.items()
+            }
+        return self._screens
+
+    def _write(self) -> None:
+        write_state_file(self.path, {
+            name: dict(entry, examples=[sorted(example) for example in entry["examples"]])
+            for name, entry in self._screens.items()
+        })
+
+    def save(self, name: str, features: frozenset, app_id: Optional[str]) -> int:
+        """Add an example of a screen; returns how many examples it has."""
+        with self._lock:
+            screens = self._load()
+            entry = screens.setdefault(name, {"app_id": app_id, "examples": []})
+            if features not in entry["examples"]:
+                entry["examples"] = (entry["examples"] + [features])[-self.MAX_EXAMPLES:]
+            entry["app_id"] = app_id or entry.get("app_id")
+            entry["updated"] = datetime.datetime.now().isoformat(timespec="seconds")
+            self._write()
+            return len(entry["examples"])
+
+    def forget(self, name: str) -> bool:
+        with self._lock:
+            removed = self._load().pop(name, None) is not None
+            if removed:
+                self._write()
+            return removed
+
+    def identify(self, features: frozenset, app_id: Optional[str], count: int = 3) -> List[tuple]:
+        """The nearest named screens as (name, similarity), most similar first."""
+        with self._lock:
+            screens = list(self._load().items())
+        scores = []
+        for name, entry in screens:
+            if app_id and entry.get("app_id") and entry["app_id"] != app_id:
+                continue
+            if entry["examples"]:
+                scores.append((name, max(screen_similarity(features, example) for example in entry["examples"])))
+        scores.sort(key=lambda score: score[1], reverse=True)
+        return scores[:count]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                name: {"app_id": entry.get("app_id"), "examples": len(entry["examples"]), "updated": entry.get("updated")}
+                for name, entry in self._load().items()
+            }
+
+
+screen_index = ScreenIndex(os.environ.get("APPIUM_MCP_SCREEN_INDEX", "screens.json"))
+
+# Similarity from which identify_screen names a screen
+SCREEN_MATCH_THRESHOLD = float(os.environ.get("APPIUM_MCP_SCREEN_MATCH_THRESHOLD", "0.8"))
+
+
+# Navigation graph
+# Tools whose transitions are learned and replayed by navigate_to
+NAVIGATION_TOOLS = ("tap_element", "long_press_element", "swipe", "go_back")
+
+# Tools after which the current screen is unknown
+SCREEN_RESET_TOOLS = ("launch_app", "close_app", "reset_app", "go_home")
+
+# Set while navigate_to replays steps, which it observes itself
+navigation_replay = contextvars.ContextVar("navigation_replay", default=False)
+
+
+class NavigationGraph:
+    """The screens of each app and the tool calls that lead from one to another.
+
+    Nodes are screen names from the screen index, or fingerprints for
+    unnamed screens; an unnamed screen similar enough to a known node is
+    that node. Each edge holds the tool call that made a transition and
+    how often replaying it reached the expected screen. Transitions are
+    learned while `learn` is on: every navigation tool call then costs a
+    page source read after it (and before it, if the screen is unknown).
+    """
+
+    def __init__(self, path: str, learn: bool):
+        self.path = path
+        self.learn = learn
+        # driver -> node of the screen it was last seen on
+        self.current = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._apps = None
+
+    def _app(self, app_id: Optional[str]) -> Dict:
+        if self._apps is None:
+            self._apps = {
+                app: {
+                    "screens": {node: frozenset(features) for node, features in graph.get("screens", {}).items()},
+                    "edges": graph.get("edges", []),
+                }
+                for app, graph in read_state_file(self.path, {}).items()
+            }
+        return self._apps.setdefault(app_id or "unknown", {"screens": {}, "edges": []})
+
+    def _write(self) -> None:
+        write_state_file(self.path, {
+            app: {"screens": {node: sorted(features) for node, features in graph["screens"].items()},
+                  "edges": graph["edges"]}
+            for app, graph in self._apps.items()
+        })
+
+    def locate(self, features: frozenset, app_id: Optional[str]) -> str:
+        """The node of a screen, added to the graph if it is new."""
+        named = screen_index.identify(features, app_id, count=1)
+        with self._lock:
+            screens = self._app(app_id)["screens"]
+            if named and named[0][1] >= SCREEN_MATCH_THRESHOLD:
+                node = named[0][0]
+            else:
+                nearest = max(
+                    ((screen_similarity(features, known), node) for node, known in screens.items()),
+                    default=(0.0, None),
+                )
+                node = nearest[1] if nearest[0] >= SCREEN_MATCH_THRESHOLD else screen_fingerprint(features)
+            if node not in screens:
+                screens[node] = features
+                self._write()
+        return node
+
+    def name_screen(self, app_id: Optional[str], name: str, features: frozenset) -> None:
+        """Merge the unnamed nodes similar to a newly saved screen into a node with its name."""
+        named = set(screen_index.summary())
+        with self._lock:
+            graph = self._app(app_id)
+            merged = {
+                node for node, known in graph["screens"].items()
+                if node not in named and screen_similarity(features, known) >= SCREEN_MATCH_THRESHOLD
+            }
+            if not merged and name in graph["screens"]:
+                return
+            for node in merged:
+                del graph["screens"][node]
+            graph["screens"][name] = features
+            edges = {}
+            for edge in graph["edges"]:
+                edge = dict(edge, **{end: name for end in ("from", "to") if edge[end] in merged})
+                if edge["from"] == edge["to"]:
+                    continue
+                key = json.dumps([edge["from"], edge["to"], edge["tool"], edge["arguments"]], sort_keys=True)
+                if key in edges:
+                    edges[key]["successes"] += edge["successes"]
+                    edges[key]["failures"] += edge["failures"]
+                else:
+                    edges[key] = edge
+            graph["edges"] = list(edges.values())
+            for session_driver, node in list(self.current.items()):
+                if node in merged:
+                    self.current[session_driver] = name
+            self._write()
+
+    def record(self, app_id: Optional[str], source: str, target: str, tool: str, arguments: Dict) -> None:
+        """Count a transition from source to target made by a tool call."""
+        if source == target:
+            return
+        with self._lock:
+            edges = self._app(app_id)["edges"]
+            for edge in edges:
+                if (edge["from"], edge["to"], edge["tool"], edge["arguments"]) == (source, target, tool, arguments):
+                    edge["successes"] += 1
+                    break
+            else:
+                edges.append({
+                    "from": source, "to": target, "tool": tool, "arguments": arguments,
+                    "successes": 1, "failures": 0,
+                })
+            self._write()
+
+    def failed(self, app_id: Optional[str], edge: Dict) -> None:
+        """Count a replay of an edge that did not reach its screen."""
+        with self._lock:
+            for known in self._app(app_id)["edges"]:
+                if known is edge or all(known[key] == edge[key] for key in ("from", "to", "tool", "arguments")):
+                    known["failures"] += 1
+            self._write()
+
+    def shortest_path(self, app_id: Optional[str], source: str, target: str) -> Optional[List[Dict]]:
+        """The edges of the cheapest known path; an edge costs more the more often its replay failed."""
+        with self._lock:
+            edges = list(self._app(app_id)["edges"])
+        outgoing = collections.defaultdict(list)
+        for edge in edges:
+            outgoing[edge["from"]].append(edge)
+
+        queue = [(0.0, 0, source, [])]
+        settled = set()
+        tie = 0
+        while queue:
+            cost, _, node, path = heapq.heappop(queue)
+            if node == target:
+                return path
+            if node in settled:
+                continue
+            settled.add(node)
+            for edge in outgoing[node]:
+                if edge["to"] not in settled:
+                    tie += 1
+                    step_cost = 1.0 + edge["failures"] / (edge["successes"] + 1)
+                    heapq.heappush(queue, (cost + step_cost, tie, edge["to"], path + [edge]))
+        return None
+
+    def graph(self, app_id: Optional[str]) -> Dict:
+        with self._lock:
+            graph = self._app(app_id)
+            return {"screens": sorted(graph["screens"]), "edges": [dict(edge) for edge in graph["edges"]]}
+
+
+navigation_graph = NavigationGraph(
+    os.environ.get("APPIUM_MCP_NAVIGATION_GRAPH", "navigation.json"),
+    learn=os.environ.get("APPIUM_MCP_LEARN_NAVIGATION", "0") == "1",
+)
+
+
+def observe_screen() -> tuple:
+    """Locate the current driver's screen in the navigation graph; returns (app id, node)."""
+    features = screen_features(PageSnapshot.capture())
+    app_id = current_app_id(get_driver())
+    node = navigation_graph.locate(features, app_id)
+    navigation_graph.current[get_driver()] = node
+    return app_id, node
+
+
+def learn_navigation(tool: str, arguments: Dict, before: bool) -> None:
+    """track_action hook: note the screen before a navigation tool call, and the transition after it."""
+    if get_driver() is None or navigation_replay.get():
+        return
+    if tool in SCREEN_RESET_TOOLS:
+        navigation_graph.current.pop(get_driver(), None)
+        return
+    if not navigation_graph.learn or tool not in NAVIGATION_TOOLS:
+        return
+    try:
+        if before:
+            if get_driver() not in navigation_graph.current:
+                observe_screen()
+            return
+        source = navigation_graph.current.get(get_driver())
+        app_id, target = observe_screen()
+        if source is not None:
+            navigation_graph.record(app_id, source, target, tool, arguments)
+    except Exception as e:
+        logger.debug(f"Could not learn the transition of {tool}: {e}")
+
+
+# App crawler
+# Elements the crawler does not tap: typing into them does not navigate
+CRAWL_SKIPPED_CLASSES = ("EditText", "TextField", "SecureTextField", "SearchField")
+
+# Element types iOS page sources do not mark as clickable, but that are
+IOS_TAPPABLE_TYPES = ("Button", "Cell", "Link", "Switch", "Tab", "MenuItem", "SegmentedControl")
+
+# Directory crawl artifacts go to when no output directory is given
+CRAWL_DIR = os.path.join(STATE_DIR, "crawls")
+
+# Seconds between page source reads while waiting for a screen to settle,
+# and the longest wait before a still-changing screen is taken as it is
+CRAWL_SETTLE_INTERVAL = 0.25
+CRAWL_SETTLE_TIMEOUT = 3.0
+
+# Seconds to wait for each element of a path replayed after relaunching the app
+CRAWL_STEP_TIMEOUT = 10.0
+
+
+def crawl_targets(snapshot: PageSnapshot, avoid: List[str]) -> tuple:
+    """The (by, value) locators of the tappable elements of a screen, and how many had no unique locator."""
+    targets, skipped = [], 0
+    for node in snapshot.root.iter():
+        tag = node.get("class") or node.tag
+        if snapshot.platform == "ios":
+            tappable = any(tag.endswith(kind) for kind in IOS_TAPPABLE_TYPES)
+        else:
+            tappable = node.get("clickable") == "true"
+        if not tappable or node.get("enabled") == "false" or node.get("displayed") == "false":
+            continue
+        if any(tag.endswith(kind) for kind in CRAWL_SKIPPED_CLASSES):
+            continue
+        labels = [node.get(name) or "" for name in ("resource-id", "content-desc", "text", "name", "label")]
+        if any(word.lower() in label.lower() for word in avoid for label in labels):
+            continue
+
+        if snapshot.platform == "ios":
+            candidates = [("accessibility_id", node.get("name"))]
+        else:
+            text = node.get("text") or ""
+            candidates = [
+                ("id", node.get("resource-id")),
+                ("accessibility_id", node.get("content-desc")),
+                ("android_uiautomator", f'new UiSelector().text("{text}")' if text and '"' not in text else None),
+            ]
+        for by, value in candidates:
+            if value and len(snapshot.match(compile_locator(by, value, snapshot.platform)) or []) == 1:
+                targets.append((by, value))
+                break
+        else:
+            skipped += 1
+    return targets, skipped
+
+
+class AppCrawler:
+    """Breadth-first exploration of an app by tapping the elements its screens show as tappable.
+
+    Each work item is a tap on a screen, with the path of taps that leads
+    there from the app's launch screen. Every session runs a worker thread
+    that takes items from a shared queue: it gets to the item's screen
+    (relaunching the app and replaying the path unless it is already
+    there), taps, and locates the screen it reached in the navigation
+    graph. Screens are told apart by fingerprint similarity, so a screen
+    reached again by another path is not explored again. New screens are
+    saved with their page source and a screenshot, and their tappable
+    elements queued. After a tap that changed the screen, the worker
+    presses back, which usually spares the next relaunch.
+    """
+
+    def __init__(self, app_id: Optional[str], platform: Optional[str], output_dir: str, max_screens: int,
+                 max_actions: int, max_depth: int, avoid: List[str], screenshots: bool):
+        self.app_id = app_id
+        self.platform = platform
+        self.output_dir = output_dir
+        self.max_screens = max_screens
+        self.max_actions = max_actions
+        self.max_depth = max_depth
+        self.avoid = avoid
+        self.screenshots = screenshots
+        self.screens: Dict[str, Dict] = {}
+        self.edges: List[Dict] = []
+        self.errors: List[str] = []
+        self.actions = 0
+        self._queue = collections.deque()
+        self._busy = 0
+        self._condition = threading.Condition()
+
+    def limit_reached(self) -> bool:
+        return self.actions >= self.max_actions or len(self.screens) >= self.max_screens
+
+    @staticmethod
+    def settled_source(session_driver) -> str:
+        """The page source once two reads in a row agree, so transition frames are not taken for screens."""
+        source = session_driver.page_source
+        deadline = time.monotonic() + CRAWL_SETTLE_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(CRAWL_SETTLE_INTERVAL)
+            latest = session_driver.page_source
+            if latest == source:
+                break
+            source = latest
+        return source
+
+    def observe(self, session_driver) -> tuple:
+        """(node, snapshot) of the screen a session shows, once it has settled."""
+        snapshot = PageSnapshot(self.settled_source(session_driver), self.platform)
+        return navigation_graph.locate(screen_features(snapshot), self.app_id), snapshot
+
+    def left_app(self, snapshot: PageSnapshot) -> bool:
+        packages = {node.get("package") for node in snapshot.root.iter() if node.get("package")}
+        return bool(self.app_id and packages and self.app_id not in packages)
+
+    def add_screen(self, session_driver, node: str, snapshot: PageSnapshot, path: List[tuple]) -> None:
+        """Save a screen seen for the first time and queue its taps."""
+        targets, skipped = crawl_targets(snapshot, self.avoid)
+        with self._condition:
+            if node in self.screens or len(self.screens) >= self.max_screens:
+                return
+            base = os.path.join(self.output_dir, "screens", re.sub(r"[^\w.-]", "_", node))
+            self.screens[node] = {
+                "screen": node, "depth": len(path), "path": [list(step) for step in path],
+                "tappable": len(targets), "without_locator": skipped, "source": base + ".xml",
+            }
+            if len(path) < self.max_depth:
+                self._queue.extend((node, path, target) for target in targets)
+            self._condition.notify_all()
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        with open(base + ".xml", "w", encoding="utf-8") as f:
+            f.write(ET.tostring(snapshot.root, encoding="unicode"))
+        if self.screenshots:
+            session_driver.get_screenshot_as_file(base + ".png")
+            with self._condition:
+                self.screens[node]["screenshot"] = base + ".png"
+
+    def tap(self, session_driver, by: str, value: str, timeout: float = 0) -> None:
+        """Tap an element, waiting up to timeout seconds for it to become clickable."""
+        locator = compile_locator(by, value, self.platform)
+        target = (getattr(AppiumBy, locator.strategy), locator.value)
+        if timeout > 0:
+            WebDriverWait(session_driver, timeout).until(EC.element_to_be_clickable(target)).click()
+        else:
+            session_driver.find_element(*target).click()
+
+    def relaunch(self, session_driver, path: List[tuple]) -> str:
+        """Restart the app, replay a path of taps, and return the screen reached.
+
+        The app takes a while to start and each screen to appear, so every
+        step waits for its element; one that never appears fails the relaunch.
+        """
+        session_driver.terminate_app(self.app_id)
+        session_driver.activate_app(self.app_id)
+        for step, (by, value) in enumerate(path, 1):
+            try:
+                self.tap(session_driver, by, value, CRAWL_STEP_TIMEOUT)
+            except TimeoutException:
+                raise RuntimeError(
+                    f"Relaunch failed: step {step} {by}={value} did not appear within {CRAWL_STEP_TIMEOUT} s"
+                )
+        return self.observe(session_driver)[0]
+
+    def start(self, session_driver) -> str:
+        """Restart the app and save its launch screen, where the crawl begins."""
+        session_driver.terminate_app(self.app_id)
+        session_driver.activate_app(self.app_id)
+        node, snapshot = self.observe(session_driver)
+        self.add_screen(session_driver, node, snapshot, [])
+        return node
+
+    def explore(self, session_driver, state: Dict, item: tuple) -> None:
+        screen, path, (by, value) = item
+        if state.get("screen") != screen:
+            state["screen"] = self.relaunch(session_driver, path)
+            if state["screen"] != screen:
+                raise RuntimeError(f"Replaying {path} reached {state['screen']} instead of {screen}")
+
+        self.tap(session_driver, by, value)
+        node, snapshot = self.observe(session_driver)
+        state["screen"] = node
+        if self.left_app(snapshot):
+            session_driver.back()
+            state["screen"] = None
+            return
+
+        arguments = {"by": by, "value": value}
+        navigation_graph.record(self.app_id, screen, node, "tap_element", arguments)
+        if node == screen:
+            return
+        with self._condition:
+            self.edges.append({"from": screen, "to": node, "tool": "tap_element", "arguments": arguments})
+        self.add_screen(session_driver, node, snapshot, path + [(by, value)])
+
+        session_driver.back()
+        back, _ = self.observe(session_driver)
+        state["screen"] = back
+        if back == screen:
+            navigation_graph.record(self.app_id, node, screen, "go_back", {})
+            with self._condition:
+                self.edges.append({"from": node, "to": screen, "tool": "go_back", "arguments": {}})
+
+    def work(self, session_driver, session: Optional[ManagedSession] = None) -> int:
+        """Worker loop for one session; returns the number of taps it made."""
+        state, taps = {}, 0
+        while True:
+            with self._condition:
+                while not self._queue and self._busy and not self.limit_reached():
+                    self._condition.wait()
+                if not self._queue or self.limit_reached():
+                    self._condition.notify_all()
+                    return taps
+                item = self._queue.popleft()
+                self._busy += 1
+                self.actions += 1
+            try:
+                self.explore(session_driver, state, item)
+                taps += 1
+            except Exception as e:
+                state["screen"] = None
+                with self._condition:
+                    self.errors.append(f"{item[0]} tap {item[2][0]}={item[2][1]}: {e}")
+            finally:
+                if session is not None:
+                    session.touch()
+                with self._condition:
+                    self._busy -= 1
+                    self._condition.notify_all()
+
+    def write_graph(self, root: Optional[str]) -> str:
+        path = os.path.join(self.output_dir, "graph.json")
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "app_id": self.app_id, "root": root,
+                "screens": self.screens, "edges": self.edges, "errors": self.errors,
+            }, f, indent=2)
+        return path
 
 
 # Find Elements Tools
 @mcp.tool()
+@track_action
 async def find_element(
     by: str, value: str, timeout: float = 10.0
 ) -> Dict:
@@ -358,11 +3578,11 @@ async def find_element(
     check_driver()
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
+        by_enum, value = resolve_locator(by, value)
         
         # Use WebDriverWait to wait for the element to be present
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
+        element = wait_until(
+            EC.presence_of_element_located((by_enum, value)), timeout
         )
         
         return element_to_dict(element)
@@ -371,6 +3591,7 @@ async def find_element(
 
 
 @mcp.tool()
+@track_action
 async def find_elements(
     by: str, value: str, timeout: float = 10.0
 ) -> List[Dict]:
@@ -378,22 +3599,21 @@ async def find_elements(
     check_driver()
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
+        by_enum, value = resolve_locator(by, value)
         
-        # Use WebDriverWait to wait for at least one element to be present
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
+        # Wait for at least one element to be present; the matches of the
+        # successful search are returned, so no second search is needed
+        elements = wait_until(
+            lambda d: d.find_elements(by_enum, value) or False, timeout
         )
         
-        # Get all matching elements
-        elements = driver.find_elements(by_enum, value)
-        
         return [element_to_dict(element) for element in elements]
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def wait_for_element(
     by: str, value: str, timeout: float = 20.0
 ) -> Dict:
@@ -401,10 +3621,30 @@ async def wait_for_element(
     check_driver()
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
+        by_enum, value = resolve_locator(by, value)
+        
+        element = wait_until(
+            EC.presence_of_element_located((by_enum, value)), timeout
+        )
+        
+        return element_to_dict(element)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def wait_for_element_to_be_clickable(
+    by: str, value: str, timeout: float = 20.0
+) -> Dict:
+    """Wait for an element to be clickable."""
+    check_driver()
+
+    try:
+        by_enum, value = resolve_locator(by, value)
         
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
+        element = wait_until(
+            EC.element_to_be_clickable((by_enum, value)), timeout
         )
         
         return element_to_dict(element)
@@ -412,239 +3652,915 @@ async def wait_for_element(
         return {"error": str(e)}
 
 
+def locator_alternatives(
+    by: str, value: str, platform: Optional[str], context: str = NATIVE_CONTEXT
+) -> List[tuple]:
+    """The locator as given, plus its rewritten form, as (strategy, value) pairs."""
+    alternatives = [(normalize_strategy(by), value)]
+    rewritten = rewrite_xpath(value, platform, context) if normalize_strategy(by) == "XPATH" else None
+    if rewritten is not None:
+        alternatives.append(rewritten)
+    return alternatives
+
+
+def element_locators(element, platform: Optional[str]) -> List[tuple]:
+    """Locators built from an element's id and accessibility attributes."""
+    alternatives = []
+    if platform == "ios":
+        name = element.get_attribute("name")
+        if name:
+            alternatives.append(("ACCESSIBILITY_ID", name))
+        return alternatives
+    resource_id = element.get_attribute("resource-id")
+    if resource_id:
+        alternatives.append(("ID", resource_id))
+    description = element.get_attribute("content-desc")
+    if description:
+        alternatives.append(("ACCESSIBILITY_ID", description))
+    return alternatives
+
+
+@mcp.tool()
+@track_action
+async def explain_locator(by: str, value: str, measure: bool = True) -> Dict:
+    """
+    Show how a locator is searched for and what the alternatives cost.
+
+    Args:
+        by: Locator strategy (id, xpath, accessibility_id, class_name, android_uiautomator, ios_predicate, ...)
+        value: Locator value
+        measure: Time each alternative on the current screen
+    """
+    try:
+        platform, context = session_platform(), session_context()
+        locator = compile_locator(by, value, platform, context)
+        result = {
+            "success": True,
+            "strategy": locator.strategy.lower(),
+            "value": locator.value,
+            "rewritten": locator.rewritten_from is not None,
+            "platform": platform,
+        }
+        if not measure:
+            return result
+
+        check_driver()
+        candidates = locator_alternatives(by, value, platform, context)
+        measured = []
+        while candidates:
+            strategy, candidate = candidates.pop(0)
+            if any(entry["by"] == strategy.lower() and entry["value"] == candidate for entry in measured):
+                continue
+            started = time.perf_counter()
+            try:
+                matches = get_driver().find_elements(getattr(AppiumBy, strategy), candidate)
+            except Exception as e:
+                measured.append({"by": strategy.lower(), "value": candidate, "error": str(e)})
+                continue
+            measured.append({
+                "by": strategy.lower(),
+                "value": candidate,
+                "matches": len(matches),
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+            if len(measured) == 1 and len(matches) == 1:
+                # Suggest the element's own id and accessibility id as well
+                candidates.extend(element_locators(matches[0], platform))
+
+        usable = [entry for entry in measured if entry.get("matches") == measured[0].get("matches")]
+        result["alternatives"] = measured
+        if measured[0].get("matches"):
+            fastest = min(usable, key=lambda entry: entry["ms"])
+            result["fastest"] = {"by": fastest["by"], "value": fastest["value"]}
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Element Interaction Tools
+@mcp.tool()
+@track_action
+async def tap_element(
+    by: str, value: str, timeout: float = 10.0
+) -> Dict:
+    """Tap on an element."""
+    check_driver()
+
+    try:
+        by_enum, value = resolve_locator(by, value)
+        
+        # Wait for the element to be clickable, then tap on it
+        with_element(by_enum, value, timeout, lambda element: element.click(), clickable=True)
+        element_cache.invalidate(get_driver())
+        
+        return {"success": True, "message": f"Tapped element {value}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def long_press_element(
+    by: str, value: str, duration_ms: int = 1000, timeout: float = 10.0
+) -> Dict:
+    """Long press on an element."""
+    check_driver()
+
+    try:
+        by_enum, value = resolve_locator(by, value)
+        
+        # Wait for the element to be present and get its location
+        rect = with_element(by_enum, value, timeout, lambda element: element.rect)
+        element_cache.invalidate(get_driver())
+        center_x = rect['x'] + rect['width'] // 2
+        center_y = rect['y'] + rect['height'] // 2
+        
+        # Create a W3C Actions sequence for long press
+        actions = ActionChains(get_driver())
+        actions.w3c_actions = ActionBuilder(get_driver(), mouse=PointerInput(interaction.POINTER_TOUCH, "touch"))
+        actions.w3c_actions.pointer_action.move_to_location(center_x, center_y)
+        actions.w3c_actions.pointer_action.pointer_down()
+        actions.w3c_actions.pointer_action.pause(duration_ms / 1000)  # Convert ms to seconds
+        actions.w3c_actions.pointer_action.release()
+        actions.perform()
+        
+        return {"success": True, "message": f"Long pressed element {value} for {duration_ms}ms"}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def get_text(
+    by: str, value: str, timeout: float = 10.0
+) -> Dict:
+    """Get text from an element."""
+    check_driver()
+
+    try:
+        by_enum, value = resolve_locator(by, value)
+        
+        # Wait for the element to be present and get its text
+        text = with_element(by_enum, value, timeout, lambda element: element.text)
+        
+        return {"success": True, "text": text}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def set_text(
+    by: str, value: str, text: str, clear_first: bool = True, timeout: float = 10.0, mode: str = "auto"
+) -> Dict:
+    """
+    Set text on an element.
+
+    Args:
+        by: Locator strategy
+        value: Locator value
+        text: Text to enter
+        clear_first: Replace the current text rather than append to it
+        timeout: Seconds to wait for the element
+        mode: "keys" types with send_keys; "replace" sets the value with
+            mobile: replaceElementValue; "clipboard" pastes from the
+            clipboard (Android). "auto" tries the fastest mode the platform
+            supports first and falls back to send_keys.
+    """
+    check_driver()
+
+    try:
+        modes = text_modes(mode)
+        by_enum, value = resolve_locator(by, value)
+
+        # Wait for the element to be present and set the text
+        used, verified = with_element(
+            by_enum, value, timeout, lambda element: enter_text(element, text, clear_first, modes)
+        )
+
+        return {
+            "success": True,
+            "message": f"Set text on element {value}",
+            "mode": used,
+            "verified": verified,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def fill_form(
+    fields: List[Dict[str, str]],
+    mode: str = "auto",
+    clear_first: bool = True,
+    hide_keyboard: bool = False,
+    timeout: float = 10.0,
+) -> Dict:
+    """
+    Fill several text fields in one call.
+
+    The fields are looked up in one page source snapshot, so missing fields
+    are reported without waiting for each of them, and filled in order. Text
+    entered with a fast mode is verified from a second snapshot.
+
+    Args:
+        fields: The fields in the order to fill them, each {"by": ..., "value": ..., "text": ...}
+        mode: Text entry mode, as for set_text
+        clear_first: Replace the current text of each field rather than append to it
+        hide_keyboard: Dismiss the on-screen keyboard after the last field
+        timeout: Seconds to wait for the first field, and for fields the snapshot cannot answer
+    """
+    check_driver()
+
+    try:
+        modes = text_modes(mode)
+        platform, context = session_platform(), session_context()
+        results, planned = [], []
+        for field in fields:
+            result = {"by": field.get("by"), "value": field.get("value")}
+            results.append(result)
+            try:
+                if not isinstance(field.get("text"), str):
+                    raise ValueError("Each field needs a text string")
+                locator = compile_locator(field.get("by"), field.get("value"), platform, context)
+            except ValueError as e:
+                result.update(status="error", error=str(e))
+                continue
+            planned.append((result, locator, field["text"]))
+
+        if planned:
+            # The first field appearing means the form is on screen
+            first = planned[0][1]
+            with contextlib.suppress(TimeoutException):
+                with_element(getattr(AppiumBy, first.strategy), first.value, timeout, lambda element: element)
+        snapshot = PageSnapshot.capture() if planned else None
+
+        unverified = []
+        for result, locator, text in planned:
+            nodes = snapshot.match(locator)
+            if nodes == []:
+                result.update(status="not_found", error="No element matches the locator on the current screen")
+                continue
+            if nodes and len(nodes) > 1:
+                result["matches"] = len(nodes)
+            if clear_first:
+                current = ""
+            elif nodes:
+                current = snapshot.text(nodes[0]) or ""
+            else:
+                current = None  # Read from the element and verified right away
+            try:
+                used, verified = with_element(
+                    getattr(AppiumBy, locator.strategy), locator.value, timeout,
+                    lambda element: enter_text(
+                        element, text, clear_first, modes, current=current, verify=current is None
+                    ),
+                )
+            except Exception as e:
+                result.update(status="error", error=str(e))
+                continue
+            result.update(status="set", mode=used, verified=verified)
+            if used != "keys" and current is not None:
+                unverified.append((result, locator, current + text))
+
+        if hide_keyboard:
+            try:
+                get_driver().hide_keyboard()
+            except WebDriverException:
+                pass  # No keyboard was showing
+
+        if unverified:
+            snapshot = PageSnapshot.capture()
+            for result, locator, expected in unverified:
+                by_enum = getattr(AppiumBy, locator.strategy)
+                nodes = snapshot.match(locator)
+                try:
+                    if nodes:
+                        actual = snapshot.text(nodes[0])
+                    else:
+                        actual = with_element(by_enum, locator.value, timeout, lambda element: element.text)
+                    if text_matches(actual, expected):
+                        result["verified"] = True
+                        continue
+                    # Enter the whole text again with the modes after the one that failed
+                    remaining = modes[modes.index(result["mode"]) + 1:]
+                    if not remaining:
+                        raise RuntimeError(f"Could not set text. {result['mode']}: {field_mismatch(actual)}")
+                    result["mode"], result["verified"] = with_element(
+                        by_enum, locator.value, timeout,
+                        lambda element: enter_text(element, expected, True, remaining),
+                    )
+                except Exception as e:
+                    result.update(status="error", error=str(e))
+
+        failed = sum(1 for result in results if result["status"] != "set")
+        return {
+            "success": failed == 0,
+            "filled": len(results) - failed,
+            "failed": failed,
+            "fields": results,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def get_attribute(
+    by: str, value: str, attribute: str, timeout: float = 10.0
+) -> Dict:
+    """Get an attribute from an element."""
+    check_driver()
+
+    try:
+        by_enum, value = resolve_locator(by, value)
+        
+        # Wait for the element to be present and get the attribute
+        attr_value = with_element(by_enum, value, timeout, lambda element: element.get_attribute(attribute))
+        
+        return {"success": True, "attribute": attribute, "value": attr_value}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def read_live(by_enum, value: str, attributes: List[str], timeout: float) -> Dict:
+    """Read attributes of the first element a locator finds on the device."""
+    if timeout > 0:
+        try:
+            elements = wait_until(lambda d: d.find_elements(by_enum, value) or False, timeout)
+        except TimeoutException:
+            elements = []
+    else:
+        elements = get_driver().find_elements(by_enum, value)
+    if not elements:
+        return {"found": False, "count": 0}
+    element = elements[0]
+    element_cache.put(get_driver(), (by_enum, value), element)
+    result = {"found": True, "count": len(elements)}
+    for attribute in attributes:
+        result[attribute] = element.text if attribute == "text" else element.get_attribute(attribute)
+    return result
+
+
+@mcp.tool()
+@track_action
+async def read_many(
+    locators: List[Dict[str, Any]], attributes: Optional[List[str]] = None, timeout: float = 0.0
+) -> Dict:
+    """
+    Read text and attributes of many elements in one call.
+
+    Locators are answered from one page source snapshot where possible;
+    the rest are looked up on the device in parallel.
+
+    Args:
+        locators: Elements to read, each {"by": ..., "value": ...}, optionally with a "name"
+            to key its result by and its own "attributes"
+        attributes: Attributes to read for every locator; "text" is the element's text (default: ["text"])
+        timeout: Seconds to wait for elements the snapshot does not answer (default: look once)
+    """
+    check_driver()
+
+    try:
+        attributes = attributes or ["text"]
+        platform, context = session_platform(), session_context()
+        snapshot = PageSnapshot.capture()
+        values, live = {}, []
+        for item in locators:
+            key = item.get("name") or f"{item.get('by')}={item.get('value')}"
+            wanted = item.get("attributes") or attributes
+            try:
+                locator = compile_locator(item.get("by"), item.get("value"), platform, context)
+            except ValueError as e:
+                values[key] = {"error": str(e)}
+                continue
+            nodes = snapshot.match(locator)
+            if nodes == []:
+                values[key] = {"found": False, "count": 0, "source": "snapshot"}
+                continue
+            read = snapshot.read(nodes[0], wanted) if nodes else None
+            if read is None:
+                live.append((key, getattr(AppiumBy, locator.strategy), locator.value, wanted))
+                continue
+            values[key] = {"found": True, "count": len(nodes), **read, "source": "snapshot"}
+
+        if live:
+            from concurrent.futures import ThreadPoolExecutor
+
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=min(8, len(live)), thread_name_prefix="appium-read") as executor:
+
+                async def lookup(key, by_enum, value, wanted):
+                    try:
+                        result = await loop.run_in_executor(
+                            executor, contextvars.copy_context().run, read_live, by_enum, value, wanted, timeout
+                        )
+                    except Exception as e:
+                        return key, {"error": str(e)}
+                    return key, dict(result, source="device")
+
+                for key, result in await asyncio.gather(*(lookup(*entry) for entry in live)):
+                    values[key] = result
+
+        return {
+            "success": True,
+            "values": values,
+            "from_snapshot": sum(1 for result in values.values() if result.get("source") == "snapshot"),
+            "from_device": len(live),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Screen Identification Tools
+@mcp.tool()
+@track_action
+async def identify_screen(threshold: Optional[float] = None) -> Dict:
+    """
+    Identify the current screen by its structure.
+
+    Args:
+        threshold: Similarity from 0 to 1 needed to name the screen (default: 0.8)
+    """
+    check_driver()
+
+    try:
+        threshold = SCREEN_MATCH_THRESHOLD if threshold is None else threshold
+        features = screen_features(PageSnapshot.capture())
+        app_id = current_app_id(get_driver())
+        candidates = screen_index.identify(features, app_id)
+        match = candidates[0] if candidates and candidates[0][1] >= threshold else None
+        if navigation_graph.learn:
+            navigation_graph.current[get_driver()] = navigation_graph.locate(features, app_id)
+        return {
+            "success": True,
+            "screen": match[0] if match else None,
+            "confidence": round(match[1], 3) if match else None,
+            "fingerprint": screen_fingerprint(features),
+            "candidates": [{"screen": name, "similarity": round(score, 3)} for name, score in candidates],
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
 @mcp.tool()
-async def wait_for_element_to_be_clickable(
-    by: str, value: str, timeout: float = 20.0
-) -> Dict:
-    """Wait for an element to be clickable."""
+@track_action
+async def save_screen(name: str) -> Dict:
+    """
+    Save the current screen under a name so identify_screen recognizes it.
+
+    Args:
+        name: Screen name, e.g. "CheckoutScreen"; saving again under the same name adds another example
+    """
     check_driver()
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable((by_enum, value))
-        )
-        
-        return element_to_dict(element)
+        features = screen_features(PageSnapshot.capture())
+        app_id = current_app_id(get_driver())
+        examples = screen_index.save(name, features, app_id)
+        navigation_graph.name_screen(app_id, name, features)
+        if navigation_graph.learn:
+            navigation_graph.current[get_driver()] = name
+        return {"success": True, "screen": name, "fingerprint": screen_fingerprint(features), "examples": examples}
     except Exception as e:
         return {"error": str(e)}
 
 
-# Element Interaction Tools
 @mcp.tool()
-async def tap_element(
-    by: str, value: str, timeout: float = 10.0
-) -> Dict:
-    """Tap on an element."""
-    check_driver()
-
+async def list_screens() -> Dict:
+    """List the named screens identify_screen knows."""
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        # Wait for the element to be clickable
-        element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable((by_enum, value))
-        )
-        
-        # Tap on the element
-        element.click()
-        
-        return {"success": True, "message": f"Tapped element {value}"}
+        return {"success": True, "screens": screen_index.summary()}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def long_press_element(
-    by: str, value: str, duration_ms: int = 1000, timeout: float = 10.0
-) -> Dict:
-    """Long press on an element."""
-    check_driver()
+async def forget_screen(name: str) -> Dict:
+    """
+    Delete a named screen from the screen index.
 
+    Args:
+        name: Screen name
+    """
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        # Wait for the element to be present
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
-        )
-        
-        # Get element location
-        rect = element.rect
-        center_x = rect['x'] + rect['width'] // 2
-        center_y = rect['y'] + rect['height'] // 2
-        
-        # Create a W3C Actions sequence for long press
-        actions = ActionChains(driver)
-        actions.w3c_actions = ActionBuilder(driver, mouse=PointerInput(interaction.POINTER_TOUCH, "touch"))
-        actions.w3c_actions.pointer_action.move_to_location(center_x, center_y)
-        actions.w3c_actions.pointer_action.pointer_down()
-        actions.w3c_actions.pointer_action.pause(duration_ms / 1000)  # Convert ms to seconds
-        actions.w3c_actions.pointer_action.release()
-        actions.perform()
-        
-        return {"success": True, "message": f"Long pressed element {value} for {duration_ms}ms"}
+        removed = screen_index.forget(name)
     except Exception as e:
         return {"error": str(e)}
+    if not removed:
+        return {"success": False, "message": f"No screen named {name}"}
+    return {"success": True, "message": f"Forgot screen {name}"}
 
 
 @mcp.tool()
-async def get_text(
-    by: str, value: str, timeout: float = 10.0
-) -> Dict:
-    """Get text from an element."""
+@track_action
+async def navigate_to(screen: str, max_steps: int = 20) -> Dict:
+    """
+    Go to a screen along the shortest known path from the current screen.
+
+    The path is replayed server-side from transitions learned while
+    navigation learning was on. After every step the screen is checked;
+    when a step ends elsewhere, the path is planned again from there.
+
+    Args:
+        screen: Screen name from the screen index, or a fingerprint from identify_screen
+        max_steps: Most tool calls to make
+    """
     check_driver()
 
+    token = navigation_replay.set(True)
+    steps = []
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        # Wait for the element to be present
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
-        )
-        
-        # Get the text
-        text = element.text
-        
-        return {"success": True, "text": text}
+        app_id, current = observe_screen()
+        while current != screen:
+            path = navigation_graph.shortest_path(app_id, current, screen)
+            if path is None:
+                return {"error": f"No known path from {current} to {screen}", "screen": current, "steps": steps}
+            if len(steps) >= max_steps:
+                return {"error": f"Not at {screen} after {max_steps} steps", "screen": current, "steps": steps}
+
+            edge = path[0]
+            if edge["tool"] not in NAVIGATION_TOOLS:
+                raise ValueError(f"Navigation graph step uses unsupported tool {edge['tool']}")
+            result = await globals()[edge["tool"]](**edge["arguments"])
+            succeeded = _tool_succeeded(result)
+            app_id, reached = observe_screen()
+            if reached != edge["to"]:
+                navigation_graph.failed(app_id, edge)
+                if succeeded:
+                    # Where the call really leads is worth knowing too
+                    navigation_graph.record(app_id, current, reached, edge["tool"], edge["arguments"])
+            else:
+                navigation_graph.record(app_id, current, reached, edge["tool"], edge["arguments"])
+            step = {"tool": edge["tool"], "arguments": edge["arguments"], "from": current, "to": reached}
+            if not succeeded:
+                step["error"] = result.get("error") if isinstance(result, dict) else str(result)
+            steps.append(step)
+            current = reached
+        return {"success": True, "screen": current, "steps": steps}
     except Exception as e:
-        return {"error": str(e)}
+        return {"error": str(e), "steps": steps}
+    finally:
+        navigation_replay.reset(token)
 
 
 @mcp.tool()
-async def set_text(
-    by: str, value: str, text: str, clear_first: bool = True, timeout: float = 10.0
-) -> Dict:
-    """Set text on an element."""
-    check_driver()
+async def configure_navigation(learn: bool) -> Dict:
+    """
+    Turn learning the navigation graph from tool calls on or off.
+
+    Args:
+        learn: Record the screen transitions tap_element, long_press_element, swipe and go_back make
+    """
+    navigation_graph.learn = learn
+    if not learn:
+        navigation_graph.current.clear()
+    return {"success": True, "learn": learn}
 
+
+@mcp.tool()
+async def get_navigation_graph() -> Dict:
+    """Show the known screens of the current app and the transitions between them."""
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        # Wait for the element to be present
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
-        )
-        
-        # Clear the field if requested
-        if clear_first:
-            element.clear()
-        
-        # Set the text
-        element.send_keys(text)
-        
-        return {"success": True, "message": f"Set text '{text}' on element {value}"}
+        app_id = current_app_id(get_driver()) if get_driver() is not None else None
+        return {"success": True, "app_id": app_id, "learn": navigation_graph.learn, **navigation_graph.graph(app_id)}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def get_attribute(
-    by: str, value: str, attribute: str, timeout: float = 10.0
+@track_action
+async def crawl_app(
+    session_ids: Optional[List[str]] = None,
+    max_screens: int = 50,
+    max_actions: int = 200,
+    max_depth: int = 5,
+    avoid: Optional[List[str]] = None,
+    screenshots: bool = True,
+    output_dir: Optional[str] = None,
 ) -> Dict:
-    """Get an attribute from an element."""
+    """
+    Explore the current app by tapping its elements, in parallel across sessions.
+
+    Args:
+        session_ids: Sessions to crawl with (default: the current session and every other open session of the same app)
+        max_screens: Stop after finding this many distinct screens
+        max_actions: Stop after this many taps in total
+        max_depth: Do not explore screens more than this many taps away from the launch screen
+        avoid: Do not tap elements whose id, text or description contains one of these, e.g. ["logout", "delete"]
+        screenshots: Save a screenshot of each screen next to its page source
+        output_dir: Directory for the screen graph and the per-screen artifacts (default: a new directory under the state directory)
+    """
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
-        
-        # Wait for the element to be present
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by_enum, value))
+        app_id = current_app_id(get_driver())
+        if not app_id:
+            return {"error": "Cannot tell which app to crawl: the session has no appPackage or bundleId"}
+        client = current_client()
+        if session_ids:
+            unknown = [session_id for session_id in session_ids if session_id not in open_sessions]
+            if unknown:
+                return {"error": f"Unknown session(s): {', '.join(unknown)}"}
+            sessions = [open_sessions[session_id] for session_id in session_ids]
+            if any(client_router.owned_by_other(session, client) for session in sessions):
+                return {"error": "Some of these sessions belong to another client"}
+            workers = [(session.driver, session) for session in sessions]
+        else:
+            workers = [(get_driver(), get_active_session())]
+            workers += [
+                (session.driver, session) for session in list(open_sessions.values())
+                if session is not get_active_session() and not session.dead and session.app_id == app_id
+                and not client_router.owned_by_other(session, client)
+            ]
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        crawler = AppCrawler(
+            app_id, session_platform(), output_dir or os.path.join(CRAWL_DIR, f"{app_id}-{stamp}"),
+            max_screens, max_actions, max_depth, avoid or [], screenshots,
         )
-        
-        # Get the attribute
-        attr_value = element.get_attribute(attribute)
-        
-        return {"success": True, "attribute": attribute, "value": attr_value}
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(workers), thread_name_prefix="appium-crawl") as executor:
+            root = await loop.run_in_executor(executor, contextvars.copy_context().run, crawler.start, workers[0][0])
+            taps = await asyncio.gather(*[
+                loop.run_in_executor(executor, contextvars.copy_context().run, crawler.work, *worker)
+                for worker in workers
+            ])
+        for worker_driver, _ in workers:
+            element_cache.invalidate(worker_driver)
+            navigation_graph.current.pop(worker_driver, None)
+
+        graph_file = crawler.write_graph(root)
+        return {
+            "success": True,
+            "app_id": app_id,
+            "root": root,
+            "screens": len(crawler.screens),
+            "edges": len(crawler.edges),
+            "actions": crawler.actions,
+            "sessions": {str(worker_driver.session_id): count for (worker_driver, _), count in zip(workers, taps)},
+            "duration_ms": round((time.perf_counter() - started) * 1000),
+            "truncated": crawler.limit_reached() or any(
+                len(details["path"]) >= max_depth and details["tappable"] for details in crawler.screens.values()
+            ),
+            "errors": crawler.errors[:10],
+            "output_dir": crawler.output_dir,
+            "graph_file": graph_file,
+        }
     except Exception as e:
         return {"error": str(e)}
 
 
 # Navigation and App Control Tools
 @mcp.tool()
+@track_action
 async def go_back() -> Dict:
     """Press the back button."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.back()
+        get_driver().back()
         return {"success": True, "message": "Pressed back button"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def go_home() -> Dict:
     """Press the home button."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.press_keycode(3)  # Android home button keycode
+        get_driver().press_keycode(3)  # Android home button keycode
         return {"success": True, "message": "Pressed home button"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def launch_app() -> Dict:
     """Launch the app under test."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.launch_app()
+        get_driver().launch_app()
+        device_metadata.invalidate(get_driver())
         return {"success": True, "message": "App launched"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def close_app() -> Dict:
     """Close the app under test."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.close_app()
+        get_driver().close_app()
+        device_metadata.invalidate(get_driver())
         return {"success": True, "message": "App closed"}
     except Exception as e:
         return {"error": str(e)}
 
 
+# App reset strategies and the isolation each one provides, weakest first:
+# navigation (back at the start route), process (fresh process, data kept),
+# data (app data cleared) and install (app reinstalled)
+ISOLATION_LEVELS = ("navigation", "process", "data", "install")
+RESET_STRATEGIES = {
+    # strategy: (isolation, estimated seconds before it has been measured)
+    "deep_link": ("navigation", 0.5),
+    "terminate_activate": ("process", 2.0),
+    "clear_data": ("data", 4.0),
+    "reinstall": ("install", 20.0),
+}
+
+# Measured reset durations in seconds, keyed by (app id, strategy)
+reset_timings: Dict[tuple, float] = {}
+
+
+class ResetStrategyUnavailable(Exception):
+    """Raised when a reset strategy cannot be used for the current session."""
+
+
+def current_app_id(current_driver) -> Optional[str]:
+    """Package or bundle id of the app under test in the given session."""
+    if get_active_session() is not None and get_active_session().driver is current_driver:
+        app_id = get_active_session().app_id
+        if app_id:
+            return app_id
+    capabilities = normalize_capabilities(current_driver.capabilities or {})
+    app_id = capabilities.get("appPackage") or capabilities.get("bundleId")
+    if not app_id and str(capabilities.get("platformName", "")).lower() == "android":
+        app_id = current_driver.current_package
+    return app_id
+
+
+def run_reset_strategy(current_driver, strategy, app_id, deep_link_url=None) -> None:
+    """Reset the app with a single strategy."""
+    capabilities = normalize_capabilities(current_driver.capabilities or {})
+    platform = str(capabilities.get("platformName", "")).lower()
+
+    if strategy == "deep_link":
+        if not deep_link_url:
+            raise ResetStrategyUnavailable("deep_link requires deep_link_url")
+        id_key = "bundleId" if platform == "ios" else "package"
+        current_driver.execute_script("mobile: deepLink", {"url": deep_link_url, id_key: app_id})
+    elif strategy == "terminate_activate":
+        current_driver.terminate_app(app_id)
+        current_driver.activate_app(app_id)
+    elif strategy == "clear_data":
+        if platform == "android":
+            current_driver.execute_script(
+                "mobile: shell", {"command": "pm", "args": ["clear", app_id]}
+            )
+        elif platform == "ios":
+            current_driver.terminate_app(app_id)
+            current_driver.execute_script("mobile: clearApp", {"bundleId": app_id})
+        else:
+            raise ResetStrategyUnavailable(f"clear_data is not supported on {platform or 'this platform'}")
+        current_driver.activate_app(app_id)
+    elif strategy == "reinstall":
+        app_path = capabilities.get("app")
+        if hasattr(current_driver, "reset"):
+            # Older clients still provide the legacy reset command
+            current_driver.reset()
+        elif app_path:
+            current_driver.remove_app(app_id)
+            current_driver.install_app(app_path)
+            current_driver.activate_app(app_id)
+        else:
+            raise ResetStrategyUnavailable("reinstall requires the session to be created with app_path")
+    else:
+        raise ValueError(
+            f"Unknown reset strategy '{strategy}'. Use auto or one of: {', '.join(RESET_STRATEGIES)}"
+        )
+
+
+def reset_candidates(app_id, isolation) -> List[str]:
+    """Strategies that satisfy an isolation level, fastest (measured or estimated) first."""
+    if isolation not in ISOLATION_LEVELS:
+        raise ValueError(f"Unknown isolation level '{isolation}'. Use one of: {', '.join(ISOLATION_LEVELS)}")
+    required = ISOLATION_LEVELS.index(isolation)
+    candidates = [
+        name for name, (level, _) in RESET_STRATEGIES.items()
+        if ISOLATION_LEVELS.index(level) >= required
+    ]
+    return sorted(
+        candidates,
+        key=lambda name: reset_timings.get((app_id, name), RESET_STRATEGIES[name][1]),
+    )
+
+
+def reset_app_state(current_driver, strategy="auto", isolation="data", app_id=None, deep_link_url=None) -> Dict:
+    """Reset the app, timing the strategy used and falling back on failure in auto mode."""
+    app_id = app_id or current_app_id(current_driver)
+    if not app_id:
+        raise ValueError("App package or bundle id unknown; pass app_id")
+
+    candidates = [strategy] if strategy != "auto" else reset_candidates(app_id, isolation)
+    failures = {}
+    for name in candidates:
+        started = time.perf_counter()
+        try:
+            run_reset_strategy(current_driver, name, app_id, deep_link_url)
+        except ValueError:
+            raise
+        except Exception as e:
+            if strategy != "auto":
+                raise
+            failures[name] = str(e)
+            logger.warning(f"Reset strategy {name} failed, trying the next one: {e}")
+            continue
+        elapsed = time.perf_counter() - started
+        previous = reset_timings.get((app_id, name))
+        reset_timings[(app_id, name)] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+        return {
+            "strategy": name,
+            "isolation": RESET_STRATEGIES[name][0],
+            "duration_ms": round(elapsed * 1000, 1),
+            "failed_strategies": failures,
+        }
+    raise Exception(f"No reset strategy succeeded for isolation '{isolation}': {failures}")
+
+
 @mcp.tool()
-async def reset_app() -> Dict:
-    """Reset the app under test."""
+@track_action
+async def reset_app(
+    strategy: str = "auto",
+    isolation: str = "data",
+    app_id: str = None,
+    deep_link_url: str = None,
+) -> Dict:
+    """
+    Reset the app under test.
+
+    Args:
+        strategy: auto, deep_link, terminate_activate, clear_data or reinstall
+        isolation: Minimum isolation for auto: navigation, process, data or install
+        app_id: Package or bundle id; defaults to the app of the current session
+        deep_link_url: Start route used by the deep_link strategy
+    """
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.reset()
-        return {"success": True, "message": "App reset"}
+        result = reset_app_state(get_driver(), strategy.lower(), isolation.lower(), app_id, deep_link_url)
+        device_metadata.invalidate(get_driver())
+        return {"success": True, "message": f"App reset using {result['strategy']}", **result}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def get_page_source() -> Dict:
-    """Get the XML representation of the current page."""
+@track_action
+async def get_page_source(inline: bool = False) -> Dict:
+    """
+    Get the XML representation of the current page.
+
+    Large page sources are returned as a resource URI with a summary; read
+    them with read_payload or as an MCP resource.
+
+    Args:
+        inline: Return the page source in the result whatever its size
+    """
     check_driver()
 
     try:
-        source = driver.page_source
-        return {"success": True, "source": source}
+        source = get_driver().page_source
+        if inline or len(source) <= payload_store.inline_limit:
+            return {"success": True, "source": source}
+        result = stored_payload(PAGE_SOURCE_URI, source.encode("utf-8"), "application/xml")
+        result["elements"] = len(re.findall(r"<[A-Za-z]", source))
+        return {"success": True, **result}
     except Exception as e:
         return {"error": str(e)}
 
 
 # Gesture Tools
 @mcp.tool()
+@track_action
 async def swipe(
     start_x: int, start_y: int, end_x: int, end_y: int, duration_ms: int = 500
 ) -> Dict:
     """Perform a swipe gesture."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.swipe(start_x, start_y, end_x, end_y, duration_ms)
+        get_driver().swipe(start_x, start_y, end_x, end_y, duration_ms)
         return {
             "success": True,
             "message": f"Swiped from ({start_x}, {start_y}) to ({end_x}, {end_y})"
@@ -654,17 +4570,19 @@ async def swipe(
 
 
 @mcp.tool()
+@track_action
 async def scroll_to_element(
     by: str, value: str, direction: str = "down", max_swipes: int = 10
 ) -> Dict:
     """Scroll until an element is found."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        by_enum = getattr(AppiumBy, by.upper())
+        by_enum, value = resolve_locator(by, value)
         
         # Get screen size
-        size = driver.get_window_size()
+        size = window_size()
         start_x = size['width'] // 2
         start_y = size['height'] * 0.8 if direction.lower() == "down" else size['height'] * 0.2
         end_x = start_x
@@ -673,7 +4591,7 @@ async def scroll_to_element(
         # Try to find the element with scrolling
         for i in range(max_swipes):
             try:
-                element = driver.find_element(by_enum, value)
+                element = get_driver().find_element(by_enum, value)
                 return {
                     "success": True,
                     "message": f"Found element after {i} swipes",
@@ -681,7 +4599,7 @@ async def scroll_to_element(
                 }
             except Exception:
                 # Element not found, swipe and try again
-                driver.swipe(start_x, start_y, end_x, end_y, 500)
+                get_driver().swipe(start_x, start_y, end_x, end_y, 500)
         
         return {
             "success": False,
@@ -692,6 +4610,7 @@ async def scroll_to_element(
 
 
 @mcp.tool()
+@track_action
 async def pinch(
     element_by: str = None, 
     element_value: str = None, 
@@ -700,12 +4619,13 @@ async def pinch(
 ) -> Dict:
     """Perform a pinch gesture on an element or the screen."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
         # Get center coordinates
         if element_by and element_value:
-            by_enum = getattr(AppiumBy, element_by.upper())
-            element = driver.find_element(by_enum, element_value)
+            by_enum, element_value = resolve_locator(element_by, element_value)
+            element = get_driver().find_element(by_enum, element_value)
             rect = element.rect
             center_x = rect['x'] + rect['width'] // 2
             center_y = rect['y'] + rect['height'] // 2
@@ -713,7 +4633,7 @@ async def pinch(
             height = rect['height']
         else:
             # Get screen size
-            size = driver.get_window_size()
+            size = window_size()
             center_x = size['width'] // 2
             center_y = size['height'] // 2
             width = size['width']
@@ -739,8 +4659,8 @@ async def pinch(
         finger1 = PointerInput(interaction.POINTER_TOUCH, "finger1")
         finger2 = PointerInput(interaction.POINTER_TOUCH, "finger2")
         
-        actions = ActionChains(driver)
-        actions.w3c_actions = ActionBuilder(driver, mouse=finger1, keyboard=finger2)
+        actions = ActionChains(get_driver())
+        actions.w3c_actions = ActionBuilder(get_driver(), mouse=finger1, keyboard=finger2)
         
         # Finger 1 actions
         actions.w3c_actions.pointer_action.move_to_location(f1_start_x, f1_start_y)
@@ -778,6 +4698,7 @@ async def pinch(
 
 
 @mcp.tool()
+@track_action
 async def zoom(
     element_by: str = None, 
     element_value: str = None, 
@@ -786,12 +4707,13 @@ async def zoom(
 ) -> Dict:
     """Perform a zoom gesture on an element or the screen."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
         # Get center coordinates
         if element_by and element_value:
-            by_enum = getattr(AppiumBy, element_by.upper())
-            element = driver.find_element(by_enum, element_value)
+            by_enum, element_value = resolve_locator(element_by, element_value)
+            element = get_driver().find_element(by_enum, element_value)
             rect = element.rect
             center_x = rect['x'] + rect['width'] // 2
             center_y = rect['y'] + rect['height'] // 2
@@ -799,7 +4721,7 @@ async def zoom(
             height = rect['height']
         else:
             # Get screen size
-            size = driver.get_window_size()
+            size = window_size()
             center_x = size['width'] // 2
             center_y = size['height'] // 2
             width = size['width']
@@ -825,8 +4747,8 @@ async def zoom(
         finger1 = PointerInput(interaction.POINTER_TOUCH, "finger1")
         finger2 = PointerInput(interaction.POINTER_TOUCH, "finger2")
         
-        actions = ActionChains(driver)
-        actions.w3c_actions = ActionBuilder(driver, mouse=finger1, keyboard=finger2)
+        actions = ActionChains(get_driver())
+        actions.w3c_actions = ActionBuilder(get_driver(), mouse=finger1, keyboard=finger2)
         
         # Finger 1 actions
         actions.w3c_actions.pointer_action.move_to_location(f1_start_x, f1_start_y)
@@ -865,112 +4787,212 @@ async def zoom(
 
 # Utility Tools
 @mcp.tool()
-async def take_screenshot(path: str = None) -> Dict:
-    """Take a screenshot of the device screen."""
+@track_action
+async def take_screenshot(path: str = None, inline: bool = False) -> Dict:
+    """
+    Take a screenshot of the device screen.
+
+    Without a path, large screenshots are returned as a resource URI with
+    their size; read them with read_payload or as an MCP resource.
+
+    Args:
+        path: File to save the screenshot to
+        inline: Return the base64 screenshot in the result whatever its size
+    """
     check_driver()
 
     try:
         if path:
-            driver.save_screenshot(path)
+            get_driver().save_screenshot(path)
             return {"success": True, "message": f"Screenshot saved to {path}"}
         else:
             # Return base64 encoded screenshot
-            screenshot = driver.get_screenshot_as_base64()
-            return {"success": True, "screenshot": screenshot}
+            screenshot = get_driver().get_screenshot_as_base64()
+            if inline or len(screenshot) <= payload_store.inline_limit:
+                return {"success": True, "screenshot": screenshot}
+            data = base64.b64decode(screenshot)
+            result = stored_payload(SCREENSHOT_URI, data, "image/png")
+            result.update(png_size(data) or {})
+            return {"success": True, **result}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def get_device_time() -> Dict:
     """Get the device time."""
     check_driver()
 
     try:
-        device_time = driver.device_time
+        device_time = get_driver().device_time
         return {"success": True, "time": device_time}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def get_device_orientation() -> Dict:
-    """Get the device orientation."""
+@track_action
+async def get_device_info(refresh: bool = False) -> Dict:
+    """
+    Get platform, device and screen details of the current session.
+
+    Most details come from the session capabilities; window size and
+    orientation are cached like in the other tools.
+
+    Args:
+        refresh: Ask the device for window size and orientation again
+    """
+    check_driver()
+
+    try:
+        if refresh:
+            device_metadata.invalidate(get_driver(), "window_size", "orientation")
+        capabilities = normalize_capabilities(get_driver().capabilities or {})
+        return {
+            "success": True,
+            "platform": capabilities.get("platformName"),
+            "platform_version": capabilities.get("platformVersion"),
+            "device_name": capabilities.get("deviceName"),
+            "device_model": capabilities.get("deviceModel"),
+            "udid": capabilities.get("udid"),
+            "automation_name": capabilities.get("automationName"),
+            "screen_density": capabilities.get("deviceScreenDensity"),
+            "screen_size": capabilities.get("deviceScreenSize"),
+            "window_size": window_size(),
+            "orientation": device_metadata.get(get_driver(), "orientation", lambda: get_driver().orientation),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+@track_action
+async def get_device_orientation(refresh: bool = False) -> Dict:
+    """
+    Get the device orientation.
+
+    Args:
+        refresh: Ask the device instead of using the cached orientation
+    """
     check_driver()
 
     try:
-        orientation = driver.orientation
+        if refresh:
+            device_metadata.invalidate(get_driver(), "orientation")
+        orientation = device_metadata.get(get_driver(), "orientation", lambda: get_driver().orientation)
         return {"success": True, "orientation": orientation}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def set_device_orientation(orientation: str) -> Dict:
     """Set the device orientation (LANDSCAPE or PORTRAIT)."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.orientation = orientation.upper()
+        get_driver().orientation = orientation.upper()
+        device_metadata.invalidate(get_driver(), "window_size")
+        device_metadata.set(get_driver(), "orientation", orientation.upper())
         return {"success": True, "message": f"Set orientation to {orientation}"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def get_current_context() -> Dict:
-    """Get the current context (NATIVE_APP or WEBVIEW)."""
+@track_action
+async def get_current_context(refresh: bool = False) -> Dict:
+    """
+    Get the current context (NATIVE_APP or WEBVIEW).
+
+    Args:
+        refresh: Ask the device instead of using the cached context
+    """
     check_driver()
 
     try:
-        context = driver.current_context
+        if refresh:
+            device_metadata.invalidate(get_driver(), "current_context")
+        context = device_metadata.get(get_driver(), "current_context", lambda: get_driver().current_context)
         return {"success": True, "context": context}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def get_contexts() -> Dict:
-    """Get all available contexts."""
+@track_action
+async def get_contexts(refresh: bool = False) -> Dict:
+    """
+    Get all available contexts.
+
+    Args:
+        refresh: Ask the device instead of using the cached list, e.g. after a webview has loaded
+    """
     check_driver()
 
     try:
-        contexts = driver.contexts
+        if refresh:
+            device_metadata.invalidate(get_driver(), "contexts")
+        contexts = device_metadata.get(get_driver(), "contexts", lambda: get_driver().contexts)
         return {"success": True, "contexts": contexts}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
+@track_action
 async def switch_to_context(context_name: str) -> Dict:
     """Switch to a different context."""
     check_driver()
+    element_cache.invalidate(get_driver())
 
     try:
-        driver.switch_to.context(context_name)
+        get_driver().switch_to.context(context_name)
+        device_metadata.set(get_driver(), "current_context", context_name)
         return {"success": True, "message": f"Switched to context {context_name}"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @mcp.tool()
-async def stop_appium_driver() -> Dict:
-    """Stop the Appium driver and clean up resources."""
-    global driver
+@track_action
+async def stop_appium_driver(keep_warm: bool = False) -> Dict:
+    """
+    Stop the Appium driver and clean up resources.
 
+    Args:
+        keep_warm: Keep the session running in the warm pool so that a later
+            create call with the same capabilities can reuse it
+    """
     logger.info("Attempting to stop Appium driver")
 
-    if driver is None:
+    current = get_driver()
+    session = get_active_session()
+    if current is None:
         logger.warning("Appium driver is not running, nothing to stop")
         return {"success": False, "message": "Appium driver is not running."}
 
     try:
+        session_pool.evict_expired()
+
+        if session is not None:
+            open_sessions.pop(session.session_id, None)
+
+        if keep_warm and session is not None and session.driver is current:
+            session_pool.release(session)
+            forget_current(current)
+            session_store.save()
+            return {"success": True, "message": "Appium driver released to the warm session pool."}
+
         # Call the quit method on the driver instance
         logger.info("Stopping Appium driver connection")
-        driver.quit()
+        current.quit()
 
-        # Set the global variable to None
-        driver = None
+        forget_current(current)
+        session_store.save()
         logger.info("Appium driver stopped successfully")
         return {"success": True, "message": "Appium driver stopped successfully."}
     except Exception as e:
@@ -980,8 +5002,9 @@ async def stop_appium_driver() -> Dict:
         return {"error": str(e)}
 
 
-# Global variables to store actions and test information
-action_log = []
+# Global variables to store actions and test information. Only the most
+# recent actions are kept; reports stream every step to disk instead
+action_log = collections.deque(maxlen=int(os.environ.get("APPIUM_MCP_ACTION_LOG_SIZE", "1000")))
 test_info = {
     "name": "Unnamed Test",
     "started_at": None,
@@ -992,7 +5015,7 @@ test_info = {
 }
 
 
-def log_action(action_type, details, success=True):
+def log_action(action_type, details, success=True, duration_ms=None, screenshot=None):
     """Log an action performed during testing."""
     # Initialize test start time if this is the first action
     if test_info["started_at"] is None:
@@ -1005,25 +5028,226 @@ def log_action(action_type, details, success=True):
     else:
         test_info["error_count"] += 1
 
+    entry = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "type": action_type,
+        "details": details,
+        "success": success,
+        "duration_ms": duration_ms,
+        "screenshot": screenshot,
+    }
+
     # Add action to log
-    action_log.append(
-        {
-            "timestamp": datetime.datetime.now().isoformat(),
-            "type": action_type,
-            "details": details,
-            "success": success,
+    action_log.append(entry)
+
+    # Stream the step into the report as soon as it completes
+    if active_report is not None:
+        try:
+            active_report.add_step(entry)
+        except Exception as e:
+            logger.error(f"Failed to write report step: {e}")
+
+
+# Tool arguments with text entered into the app, e.g. passwords
+REDACTED_ARGUMENTS = ("text",)
+
+
+def redact_arguments(value):
+    """Copy of a step's details with entered text masked, for report files."""
+    if isinstance(value, dict):
+        return {
+            name: "***" if name in REDACTED_ARGUMENTS and isinstance(item, str) else redact_arguments(item)
+            for name, item in value.items()
         }
-    )
+    if isinstance(value, list):
+        return [redact_arguments(item) for item in value]
+    return value
 
 
 # Helper function to mark end of test
 def complete_test(success=True):
     """Mark the test as completed with the given status."""
+    global active_report
+
     test_info["finished_at"] = datetime.datetime.now()
     test_info["status"] = (
         "Completed Successfully" if success else "Completed with Errors"
     )
 
+    # Close out the report that was being written during the test
+    if active_report is not None:
+        report = active_report
+        active_report = None
+        return report.finalize(test_info)
+    return None
+
+
+class IncrementalReport:
+    """Write JUnit XML and HTML reports one step at a time.
+
+    Steps are appended to disk as they complete and only running totals are
+    kept in memory, so long soak tests never hold their whole history.
+    """
+
+    SCREENSHOT_POLICIES = ("none", "failures", "all")
+
+    def __init__(self, output_dir, junit=True, html_report=True, screenshots="failures"):
+        if screenshots not in self.SCREENSHOT_POLICIES:
+            raise ValueError(
+                f"screenshots must be one of {', '.join(self.SCREENSHOT_POLICIES)}"
+            )
+        self.output_dir = os.path.abspath(os.path.expanduser(output_dir))
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.screenshots = screenshots
+        # The random suffix keeps reports started within the same second apart
+        self.base_name = f"report-{datetime.datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}"
+        self.junit_path = (
+            os.path.join(self.output_dir, self.base_name + ".xml") if junit else None
+        )
+        self.html_path = (
+            os.path.join(self.output_dir, self.base_name + ".html") if html_report else None
+        )
+        self.started_at = None
+        self.step_count = 0
+        self.failure_count = 0
+        self.total_ms = 0.0
+
+    @property
+    def _junit_part_path(self):
+        return self.junit_path + ".part"
+
+    def wants_screenshot(self, success) -> bool:
+        """Whether a screenshot should be attached to a step with this outcome."""
+        return self.screenshots == "all" or (self.screenshots == "failures" and not success)
+
+    def capture_screenshot(self, current_driver) -> Optional[str]:
+        """Save a screenshot for the next step and return its file name."""
+        if current_driver is None:
+            return None
+        name = f"{self.base_name}-step{self.step_count + 1:05d}.png"
+        try:
+            current_driver.save_screenshot(os.path.join(self.output_dir, name))
+            return name
+        except Exception as e:
+            logger.warning(f"Could not capture report screenshot: {e}")
+            return None
+
+    def add_step(self, entry) -> None:
+        """Append a single completed step to every enabled report."""
+        now = datetime.datetime.fromisoformat(entry["timestamp"])
+        if self.started_at is None:
+            self.started_at = now
+        self.step_count += 1
+        if not entry["success"]:
+            self.failure_count += 1
+        duration_ms = entry.get("duration_ms") or 0.0
+        self.total_ms += duration_ms
+
+        if self.junit_path:
+            with open(self._junit_part_path, "a", encoding="utf-8") as f:
+                f.write(self._junit_testcase(entry, duration_ms))
+        if self.html_path:
+            is_new = not os.path.exists(self.html_path)
+            with open(self.html_path, "a", encoding="utf-8") as f:
+                if is_new:
+                    f.write(self._html_header())
+                f.write(self._html_row(entry, duration_ms, now))
+
+    def finalize(self, info) -> Dict:
+        """Close the reports and return their paths and totals."""
+        result = {
+            "steps": self.step_count,
+            "failures": self.failure_count,
+            "junit": None,
+            "html": None,
+        }
+        if self.junit_path:
+            timestamp = (self.started_at or datetime.datetime.now()).isoformat()
+            with open(self.junit_path, "w", encoding="utf-8") as out:
+                out.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+                out.write(
+                    f"<testsuite name={quoteattr(str(info['name']))} "
+                    f'tests="{self.step_count}" failures="{self.failure_count}" '
+                    f'errors="0" time="{self.total_ms / 1000:.3f}" '
+                    f"timestamp={quoteattr(timestamp)}>\n"
+                )
+                if os.path.exists(self._junit_part_path):
+                    with open(self._junit_part_path, "r", encoding="utf-8") as part:
+                        shutil.copyfileobj(part, out)
+                    os.remove(self._junit_part_path)
+                out.write("</testsuite>\n</testsuites>\n")
+            result["junit"] = self.junit_path
+        if self.html_path:
+            with open(self.html_path, "a", encoding="utf-8") as f:
+                if self.step_count == 0:
+                    f.write(self._html_header())
+                f.write(
+                    "</tbody></table>\n"
+                    f"<p class=\"summary\">{html.escape(str(info['name']))}: "
+                    f"{html.escape(str(info['status']))} &mdash; {self.step_count} steps, "
+                    f"{self.failure_count} failed, {self.total_ms / 1000:.1f} s</p>\n"
+                    "</body></html>\n"
+                )
+            result["html"] = self.html_path
+        return result
+
+    def _junit_testcase(self, entry, duration_ms) -> str:
+        name = f"{self.step_count:05d} {entry['type']}"
+        details = redact_arguments(entry.get("details") or {})
+        xml = (
+            f"<testcase name={quoteattr(name)} "
+            f"classname={quoteattr(str(test_info['name']))} "
+            f'time="{duration_ms / 1000:.3f}">'
+        )
+        if not entry["success"]:
+            message = str(details.get("error", "Step failed"))
+            xml += f"<failure message={quoteattr(message)}/>"
+        xml += (
+            "<system-out>"
+            + html.escape(json.dumps(details.get("args", details), default=str))
+            + "</system-out></testcase>\n"
+        )
+        return xml
+
+    def _html_header(self) -> str:
+        title = html.escape(str(test_info["name"]))
+        return (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{title}</title><style>"
+            "body{font-family:sans-serif;margin:1em}"
+            "table{border-collapse:collapse;width:100%}"
+            "td,th{border-bottom:1px solid #ddd;padding:4px;text-align:left;vertical-align:top}"
+            "tr.fail{background:#fdecea}"
+            ".bar{display:inline-block;height:8px;background:#4a90d9;margin-right:4px}"
+            "tr.fail .bar{background:#d9534f}"
+            "img.thumb{max-width:120px;max-height:200px}"
+            "</style></head><body>\n"
+            f"<h1>{title}</h1>\n<table><thead><tr><th>#</th><th>Offset</th>"
+            "<th>Step</th><th>Duration</th><th>Details</th><th>Screenshot</th>"
+            "</tr></thead><tbody>\n"
+        )
+
+    def _html_row(self, entry, duration_ms, timestamp) -> str:
+        offset = (timestamp - self.started_at).total_seconds()
+        details = redact_arguments(entry.get("details") or {})
+        bar_width = min(int(duration_ms / 10), 400)
+        screenshot = ""
+        if entry.get("screenshot"):
+            src = quoteattr(entry["screenshot"])
+            screenshot = f'<a href={src}><img class="thumb" src={src}></a>'
+        return (
+            f"<tr class=\"{'ok' if entry['success'] else 'fail'}\">"
+            f"<td>{self.step_count}</td><td>+{offset:.2f} s</td>"
+            f"<td>{html.escape(entry['type'])}</td>"
+            f"<td><span class=\"bar\" style=\"width:{bar_width}px\"></span>{duration_ms:.0f} ms</td>"
+            f"<td>{html.escape(json.dumps(details, default=str))}</td>"
+            f"<td>{screenshot}</td></tr>\n"
+        )
+
+
+# Report currently receiving steps, if any
+active_report = None
+
 
 @mcp.tool()
 async def set_test_name(name: str) -> Dict:
@@ -1038,12 +5262,234 @@ async def set_test_name(name: str) -> Dict:
     return {"success": True, "message": f"Test name set to: {name}"}
 
 
+@mcp.tool()
+async def start_report(
+    output_dir: str = "appium-reports",
+    junit: bool = True,
+    html_report: bool = True,
+    screenshots: str = "failures",
+) -> Dict:
+    """
+    Start writing JUnit XML and HTML reports for the current test.
+
+    Steps are appended to the report files as each tool call completes.
+
+    Args:
+        output_dir: Directory where report files and screenshots are written
+        junit: Whether to write a JUnit XML report
+        html_report: Whether to write an HTML timeline report
+        screenshots: When to attach screenshots: none, failures or all
+    """
+    global active_report
+
+    if active_report is not None:
+        return {"error": "A report is already being written. Call finish_report first."}
+
+    try:
+        active_report = IncrementalReport(output_dir, junit, html_report, screenshots.lower())
+    except Exception as e:
+        return {"error": str(e)}
+
+    return {
+        "success": True,
+        "junit": active_report.junit_path,
+        "html": active_report.html_path,
+    }
+
+
+@mcp.tool()
+async def finish_report(success: Optional[bool] = None) -> Dict:
+    """
+    Complete the current test and close its reports.
+
+    Args:
+        success: Final test status; defaults to whether any step failed
+    """
+    if active_report is None:
+        return {"success": False, "message": "No report is being written."}
+
+    if success is None:
+        success = test_info["error_count"] == 0
+    result = complete_test(success)
+    return {"success": True, **result}
+
+
+@mcp.tool()
+async def configure_tracing(enabled: bool = True, path: str = "appium-traces.jsonl") -> Dict:
+    """
+    Enable or disable trace spans for tool calls, waits and WebDriver commands.
+
+    Spans are appended to a local file in OTLP/JSON format, one trace per line.
+
+    Args:
+        enabled: Whether to record spans
+        path: File the spans are written to
+    """
+    if not enabled:
+        tracer.set_exporter(None)
+        return {"success": True, "message": "Tracing disabled"}
+
+    try:
+        exporter = OTLPJsonFileExporter(path)
+    except Exception as e:
+        return {"error": str(e)}
+    tracer.set_exporter(exporter)
+    return {"success": True, "message": f"Writing traces to {exporter.path}", "path": exporter.path}
+
+
+# Server load statistics
+SERVER_STARTED_AT = time.time()
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up from a short sleep.
+
+    Lag shows how long tool calls block the loop, and so how long every
+    other client connected to this server waits.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self.samples = collections.deque(maxlen=window)
+        self._task = None
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected) * 1000)
+
+    def stats(self) -> Dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "current_ms": round(self.samples[-1], 2),
+            # Worst lag within about the last second
+            "recent_max_ms": round(max(list(self.samples)[-max(1, int(1 / self.interval)):]), 2),
+            "mean_ms": round(sum(samples) / len(samples), 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            "max_ms": round(samples[-1], 2),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+def memory_usage() -> Dict:
+    """Current and peak resident memory of this process in MB, where available."""
+    usage = {"rss_mb": None, "max_rss_mb": None}
+    try:
+        with open("/proc/self/statm", "r") as f:
+            usage["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in kilobytes elsewhere
+        usage["max_rss_mb"] = round(max_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    except ImportError:
+        pass
+    return usage
+
+
+@mcp.tool()
+async def get_server_stats() -> Dict:
+    """Get event loop lag, memory and session counts of this server process.
+
+    Event loop lag is sampled from the first call on.
+    """
+    loop_lag_monitor.ensure_started()
+    return {
+        "success": True,
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - SERVER_STARTED_AT, 1),
+        "event_loop_lag": loop_lag_monitor.stats(),
+        "memory": memory_usage(),
+        "threads": threading.active_count(),
+        "sessions": {"open": len(open_sessions), "pooled": len(session_pool)},
+        "clients": client_router.stats(),
+        "device_metadata_cache": device_metadata.stats(),
+        "element_cache": element_cache.stats(),
+        "locator_cache": {
+            "hits": compile_locator.cache_info().hits,
+            "misses": compile_locator.cache_info().misses,
+        },
+        "action_log_entries": len(action_log),
+    }
+
+
 # Run the server
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Appium MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "sse", "streamable-http"],
+        default=os.environ.get("APPIUM_MCP_TRANSPORT", "stdio"),
+        help="stdio serves one client; sse and streamable-http serve many over HTTP",
+    )
+    parser.add_argument("--host", default=os.environ.get("APPIUM_MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("APPIUM_MCP_PORT", "8000")))
+    return parser.parse_args(argv)
+
+
+def transport_security(host: str, extra_hosts: str = ""):
+    """DNS rebinding protection that accepts the names clients can reach the server by.
+
+    Binding to all interfaces accepts the machine's host names and addresses.
+    extra_hosts is a comma-separated list of further names, e.g. of a proxy.
+    """
+    import socket
+    from mcp.server.transport_security import TransportSecuritySettings
+
+    names = {"127.0.0.1", "localhost", "::1"}
+    if host in ("0.0.0.0", "::", ""):
+        hostname = socket.gethostname()
+        names.update({hostname, socket.getfqdn()})
+        with contextlib.suppress(OSError):
+            names.update(socket.gethostbyname_ex(hostname)[2])
+    else:
+        names.add(host)
+    names.update(name.strip() for name in extra_hosts.split(",") if name.strip())
+
+    hosts = sorted(f"[{name}]" if ":" in name else name for name in names)
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=[f"{name}:*" for name in hosts],
+        allowed_origins=[f"{scheme}://{name}:*" for name in hosts for scheme in ("http", "https")],
+    )
+
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        logger.info("Starting MCP server with stdio transport")
-        mcp.run(transport="stdio")
-        logger.info("MCP server running on stdio")
+        if os.environ.get("APPIUM_MCP_REATTACH_SESSIONS", "1") != "0":
+            restored = session_store.restore()
+            logger.info(f"Restored sessions from previous runs: {restored}")
+        if os.environ.get("APPIUM_MCP_PREWARM_PROFILES"):
+            session_prewarmer.load_profiles(os.environ["APPIUM_MCP_PREWARM_PROFILES"])
+        if args.transport != "stdio":
+            mcp.settings.host = args.host
+            mcp.settings.port = args.port
+            if args.host not in ("127.0.0.1", "localhost", "::1") and hasattr(mcp.settings, "transport_security"):
+                # Newer SDKs restrict Host headers to localhost when created with the default host
+                mcp.settings.transport_security = transport_security(
+                    args.host, os.environ.get("APPIUM_MCP_ALLOWED_HOSTS", "")
+                )
+            logger.info(f"Starting MCP server with {args.transport} transport on {args.host}:{args.port}")
+        else:
+            logger.info("Starting MCP server with stdio transport")
+        mcp.run(transport=args.transport)
     except Exception as e:
         logger.error(f"Error running MCP server: {e}")
         logger.error(traceback.format_exc())
@@ -4,6 +4,78 @@ This file is automatically loaded by pytest and can contain fixtures and other s
 """
 import os
 import sys
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
 
 # Add the parent directory to the path so we can import main
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep state persisted by the server (device profiles, sessions) out of the home directory
+os.environ["APPIUM_MCP_STATE_DIR"] = tempfile.mkdtemp(prefix="appium-mcp-tests-")
+
+
+@pytest.fixture
+def make_driver():
+    """Factory for mock drivers that look like live Appium sessions."""
+    def make(session_id):
+        mock_driver = MagicMock()
+        mock_driver.session_id = session_id
+        mock_driver.capabilities = {"appPackage": "com.example.app"}
+        return mock_driver
+    return make
+
+
+@pytest.fixture
+def fake_appium():
+    """Factory making a WebDriver client on a fake Appium backend the current driver.
+
+    Returns (backend, driver); the driver is current until the test ends.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from benchmarks.fake_appium import FakeAppiumBackend, connect
+
+    patches = []
+
+    def start(item_count=5, navigation=False):
+        backend = FakeAppiumBackend(item_count=item_count, navigation=navigation)
+        session_driver = connect(backend)
+        for p in (
+            patch('main.driver', session_driver),
+            patch('main.active_session', None),
+            patch('main.WebDriverWait', WebDriverWait),
+        ):
+            p.start()
+            patches.append(p)
+        return backend, session_driver
+
+    yield start
+    for p in reversed(patches):
+        p.stop()
+
+
+@pytest.fixture
+def no_sessions():
+    """Start with an empty warm pool, no open sessions and no current driver, and leave none behind."""
+    import main
+
+    main.session_pool = main.SessionPool(idle_ttl=300)
+    main.open_sessions.clear()
+    main.driver = None
+    main.active_session = None
+    yield
+    main.open_sessions.clear()
+    main.driver = None
+    main.active_session = None
+
+
+@pytest.fixture(autouse=True)
+def restore_server_state():
+    """Put back the session pool, prewarmer and client router that tests replace."""
+    import main
+
+    saved = {name: getattr(main, name) for name in ("session_pool", "session_prewarmer", "client_router")}
+    yield
+    for name, value in saved.items():
+        setattr(main, name, value)
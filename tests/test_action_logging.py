@@ -10,7 +10,7 @@ class TestActionLogging:
 
     def setup_method(self):
         """Reset the action log and test info before each test."""
-        main.action_log = []
+        main.action_log.clear()
         main.test_info = {
             "name": "Unnamed Test",
             "started_at": None,
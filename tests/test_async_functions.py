@@ -124,7 +124,7 @@ class TestAsyncFunctions:
 
             # Check the result
             assert result["success"] is True
-            assert "Set text 'Test Text' on element test-id" in result["message"]
+            assert result["message"] == "Set text on element test-id"
             mock_element.clear.assert_called_once()
             mock_element.send_keys.assert_called_once_with("Test Text")
 
@@ -0,0 +1,84 @@
+import copy
+import pytest
+from unittest.mock import patch
+from selenium.webdriver.support.ui import WebDriverWait
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE, FakeAppiumBackend, FakeAppiumServer
+from benchmarks.run_benchmarks import SCENARIOS, compare, run_benchmarks, uncovered_tools
+
+
+class TestBenchmarks:
+    """Test class for the benchmark suite and its fake Appium server."""
+
+    def setup_method(self):
+        main.driver = None
+        main.active_session = None
+        main.open_sessions.clear()
+
+    def teardown_method(self):
+        main.driver = None
+        main.active_session = None
+        main.open_sessions.clear()
+
+    def test_fake_backend_answers_webdriver_commands(self):
+        """Test sessions, element lookup and text entry against the fake backend."""
+        backend = FakeAppiumBackend(item_count=3)
+        status, response = backend.handle("POST", "/wd/hub/session", {"capabilities": {"alwaysMatch": {}}})
+        session_id = response["value"]["sessionId"]
+        base = f"/session/{session_id}"
+
+        status, response = backend.handle("POST", base + "/elements", {"using": "id", "value": f"{APP_PACKAGE}:id/item"})
+        assert len(response["value"]) == 3
+
+        status, response = backend.handle("POST", base + "/element", {"using": "id", "value": "missing"})
+        assert status == 404
+        assert response["value"]["error"] == "no such element"
+
+        status, response = backend.handle("POST", base + "/element", {"using": "xpath", "value": "//*[@text='Item 1']"})
+        element = list(response["value"].values())[0]
+        backend.handle("POST", f"{base}/element/{element}/value", {"text": "!"})
+        status, response = backend.handle("GET", f"{base}/element/{element}/text")
+        assert response["value"] == "Item 1!"
+
+        assert backend.stats()["by_command"][1:3] == ["POST elements", "POST element"]
+
+    @pytest.mark.asyncio
+    async def test_tools_run_through_mcp_against_fake_server(self):
+        """Test that the benchmark drives tools end to end and counts their commands."""
+        backend = FakeAppiumBackend(item_count=5)
+        with FakeAppiumServer(backend) as server, \
+             patch('main.WebDriverWait', WebDriverWait), \
+             patch('main.use_device_profiles', False):
+            results = await run_benchmarks(
+                server.url, backend, iterations=2, tools=["get_text", "find_elements", "go_back"], warmup=0
+            )
+
+        assert set(results) == {"get_text", "find_elements", "go_back"}
+        assert results["go_back"]["webdriver_commands"] == 1
+        assert results["go_back"]["command_sequence"] == ["POST back"]
+        assert results["get_text"]["errors"] == 0
+        assert results["find_elements"]["result_bytes"] > results["get_text"]["result_bytes"]
+
+    def test_compare_reports_regressions(self):
+        """Test that extra commands and slower or larger results are regressions."""
+        baseline = {"go_back": {
+            "webdriver_commands": 1, "errors": 0, "latency_ms": {"median": 10.0},
+            "webdriver_bytes": 100, "result_bytes": 50,
+        }}
+        current = copy.deepcopy(baseline)
+        current["go_back"]["latency_ms"]["median"] = 10.5
+        assert compare(current, baseline) == []
+
+        current["go_back"]["webdriver_commands"] = 2
+        current["go_back"]["latency_ms"]["median"] = 20.0
+        regressions = compare(current, baseline)
+        assert len(regressions) == 2
+        assert "WebDriver commands 1 -> 2" in regressions[0]
+
+    @pytest.mark.asyncio
+    async def test_every_tool_has_a_scenario(self):
+        """Test that new tools are either benchmarked or explicitly skipped."""
+        registered = [tool.name for tool in await main.mcp.list_tools()]
+        assert uncovered_tools(registered) == []
+        assert all(tool in registered for tool, _ in SCENARIOS)
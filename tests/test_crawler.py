@@ -0,0 +1,90 @@
+import json
+import os
+import pytest
+from unittest.mock import patch, MagicMock, PropertyMock
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE, connect
+
+
+class TestCrawler:
+    """Test class for crawling an app across several sessions."""
+
+    @pytest.fixture(autouse=True)
+    def open_sessions(self, fake_appium):
+        """Open two sessions on a fake app with several screens."""
+        backend, first = fake_appium(item_count=3, navigation=True)
+        capabilities = {"platformName": "Android", "appium:appPackage": APP_PACKAGE}
+        self.sessions = [
+            main.ManagedSession(session_driver, "http://fake", capabilities)
+            for session_driver in (first, connect(backend))
+        ]
+        self.screens = main.screen_index
+        self.graph = main.navigation_graph
+        main.screen_index = main.ScreenIndex(f"screens-{id(self)}.json")
+        main.navigation_graph = main.NavigationGraph(f"navigation-{id(self)}.json", learn=False)
+        with patch('main.active_session', self.sessions[0]), patch('main.CRAWL_SETTLE_INTERVAL', 0.0), \
+                patch.dict('main.open_sessions', {session.session_id: session for session in self.sessions}):
+            yield
+        main.screen_index = self.screens
+        main.navigation_graph = self.graph
+
+    @pytest.mark.asyncio
+    async def test_crawl_app(self, tmp_path):
+        """Test that every screen is found once, with its artifacts, using both sessions."""
+        result = await main.crawl_app(output_dir=str(tmp_path), avoid=["Item 2"])
+
+        assert result["success"] is True, result
+        assert (result["screens"], result["errors"], result["truncated"]) == (5, [], False)
+        assert set(result["sessions"]) == {session.session_id for session in self.sessions}
+        assert sum(result["sessions"].values()) == result["actions"]
+
+        with open(result["graph_file"]) as f:
+            graph = json.load(f)
+        depths = sorted(screen["depth"] for screen in graph["screens"].values())
+        assert depths == [0, 1, 2, 2, 3]
+        for screen in graph["screens"].values():
+            assert os.path.exists(screen["source"]) and os.path.exists(screen["screenshot"])
+        # Items are tapped by text, except the avoided one; tapping them stays on the login screen
+        login = graph["screens"][graph["root"]]
+        assert login["tappable"] == 3
+        assert sum(edge["tool"] == "go_back" for edge in graph["edges"]) == 4
+
+        # The crawl taught the navigation graph how to reach the screens it found
+        deepest = max(graph["screens"].values(), key=lambda screen: screen["depth"])
+        learned = main.navigation_graph.shortest_path(APP_PACKAGE, graph["root"], deepest["screen"])
+        assert [edge["arguments"]["value"] for edge in learned] == [value for _, value in deepest["path"]]
+
+    @pytest.mark.asyncio
+    async def test_limits(self, tmp_path):
+        """Test that the screen and depth limits stop the crawl and are reported."""
+        shallow = await main.crawl_app(max_depth=1, screenshots=False, output_dir=str(tmp_path / "shallow"))
+        capped = await main.crawl_app(session_ids=[self.sessions[1].session_id], max_screens=2,
+                                      output_dir=str(tmp_path / "capped"))
+
+        assert (shallow["screens"], shallow["truncated"]) == (2, True)
+        assert (capped["screens"], capped["truncated"]) == (2, True)
+        assert list(capped["sessions"]) == [self.sessions[1].session_id]
+        assert (await main.crawl_app(session_ids=["missing"]))["error"] == "Unknown session(s): missing"
+
+    def test_relaunch_waits_for_each_step(self):
+        """Test that replaying a path waits for its elements and fails on one that never appears."""
+        crawler = main.AppCrawler(APP_PACKAGE, "android", "", 10, 10, 3, [], False)
+        session_driver = self.sessions[0].driver
+        with patch('main.WebDriverWait') as mock_wait:
+            crawler.relaunch(session_driver, [("android_uiautomator", 'new UiSelector().text("Item 1")')])
+        mock_wait.assert_called_once_with(session_driver, main.CRAWL_STEP_TIMEOUT)
+
+        with patch('main.CRAWL_STEP_TIMEOUT', 0.1):
+            with pytest.raises(RuntimeError, match="Relaunch failed: step 1 id=missing"):
+                crawler.relaunch(session_driver, [("id", "missing")])
+
+    def test_waits_for_the_screen_to_settle(self):
+        """Test that a screen is identified only once its page source stops changing."""
+        animating = MagicMock()
+        page_source = PropertyMock(side_effect=["<a/>", "<b/>", "<c/>", "<c/>"])
+        type(animating).page_source = page_source
+
+        assert main.AppCrawler.settled_source(animating) == "<c/>"
+        assert page_source.call_count == 4
+
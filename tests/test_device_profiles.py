@@ -0,0 +1,153 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+import main
+
+
+def android_caps(app_path, **extra):
+    """Requested capabilities for an Android session on an emulator picked by udid."""
+    caps = {
+        "platformName": "Android",
+        "automationName": "UIAutomator2",
+        "appium:deviceName": "Android Emulator",
+        "appium:udid": "emulator-5554",
+        "appium:app": app_path,
+    }
+    caps.update(extra)
+    return caps
+
+
+def session_driver(udid="emulator-5554"):
+    """Create a mock driver with the capabilities UiAutomator2 reports."""
+    mock_driver = MagicMock()
+    mock_driver.session_id = "session-1"
+    mock_driver.capabilities = {
+        "platformName": "Android",
+        "udid": udid,
+        "appPackage": "com.example.app",
+        "appActivity": ".MainActivity",
+    }
+    return mock_driver
+
+
+class TestDeviceProfiles:
+    """Test class for persisted per-device capability profiles."""
+
+    def setup_method(self):
+        """Use a fresh store with a known Appium server version."""
+        main.device_profiles = main.DeviceProfileStore()
+        self.version = patch.object(main.device_profiles, "server_version", return_value="2.5.1")
+        self.version.start()
+
+    def teardown_method(self):
+        self.version.stop()
+        for name in list(main.device_profiles.load()):
+            main.device_profiles.forget(name)
+
+    def write_app(self, tmp_path, content=b"apk-v1"):
+        app = tmp_path / "app.apk"
+        app.write_bytes(content)
+        return str(app)
+
+    def test_no_profile_means_no_changes(self, tmp_path):
+        """Test that nothing is skipped for a device that has not been seen."""
+        assert main.device_profiles.optimize("http://hub", android_caps("/tmp/app.apk")) is None
+
+    def test_recorded_profile_skips_install_and_server_setup(self, tmp_path):
+        """Test that an identical app build is launched by package instead of reinstalled."""
+        app = self.write_app(tmp_path)
+        main.device_profiles.record("http://hub", android_caps(app), session_driver())
+
+        name, caps = main.device_profiles.optimize("http://hub", android_caps(app))
+
+        assert name == "android:emulator-5554"
+        assert caps["appium:skipServerInstallation"] is True
+        assert caps["appium:skipDeviceInitialization"] is True
+        assert "appium:app" not in caps
+        assert caps["appium:appPackage"] == "com.example.app"
+        assert caps["appium:appActivity"] == ".MainActivity"
+
+    def test_shared_device_names_select_no_profile(self, tmp_path):
+        """Test that a profile is keyed by the reported udid, not the device name."""
+        app = self.write_app(tmp_path)
+        caps = android_caps(app)
+        del caps["appium:udid"]
+        main.device_profiles.record("http://hub", caps, session_driver())
+
+        assert list(main.device_profiles.load()) == ["android:emulator-5554"]
+        assert main.device_profiles.optimize("http://hub", caps) is None
+        assert main.device_profiles.optimize("http://hub", android_caps(app)) is not None
+
+    def test_changed_app_build_is_installed(self, tmp_path):
+        """Test that a new app build is not skipped."""
+        app = self.write_app(tmp_path)
+        main.device_profiles.record("http://hub", android_caps(app), session_driver())
+        self.write_app(tmp_path, b"apk-v2-with-a-different-size")
+
+        name, caps = main.device_profiles.optimize("http://hub", android_caps(app))
+
+        assert caps["appium:app"] == app
+        assert "appium:appPackage" not in caps
+
+    def test_unsafe_conditions_disable_the_profile(self, tmp_path):
+        """Test that a different server version or a full reset uses no shortcuts."""
+        app = self.write_app(tmp_path)
+        main.device_profiles.record("http://hub", android_caps(app), session_driver())
+
+        assert main.device_profiles.optimize(
+            "http://hub", android_caps(app, **{"appium:fullReset": True})
+        ) is None
+
+        main.device_profiles.server_version.return_value = "2.6.0"
+        assert main.device_profiles.optimize("http://hub", android_caps(app)) is None
+
+    def test_failed_profile_start_falls_back_to_full_setup(self, tmp_path):
+        """Test that a session start failing with the profile is retried without it."""
+        app = self.write_app(tmp_path)
+        main.device_profiles.record("http://hub", android_caps(app), session_driver())
+        options = main.android_options(app_path=app)
+        options.udid = "emulator-5554"
+
+        with patch('main.webdriver.Remote',
+                   side_effect=[Exception("app not installed"), session_driver()]) as mock_remote:
+            session = main.launch_session("http://hub", options)
+
+        assert session.session_id == "session-1"
+        assert mock_remote.call_count == 2
+        assert mock_remote.call_args_list[1].kwargs["options"] is options
+        # The profile is recorded again from the successful fallback session
+        assert main.device_profiles.load()["android:emulator-5554"]["app_id"] == "com.example.app"
+
+    def test_profile_start_on_another_device_falls_back(self, tmp_path):
+        """Test that a session landing on a different device is restarted without the profile."""
+        app = self.write_app(tmp_path)
+        main.device_profiles.record("http://hub", android_caps(app), session_driver(), name="pixel")
+        options = main.android_options(app_path=app)
+        wrong_device = session_driver("emulator-5556")
+
+        with patch('main.webdriver.Remote', side_effect=[wrong_device, session_driver()]) as mock_remote:
+            main.launch_session("http://hub", options, device_profile="pixel")
+
+        wrong_device.quit.assert_called_once()
+        assert mock_remote.call_args_list[1].kwargs["options"] is options
+        assert main.device_profiles.load()["pixel"]["device"] == "emulator-5554"
+
+    @pytest.mark.asyncio
+    async def test_create_driver_records_profile(self, tmp_path):
+        """Test that creating a driver stores a named device profile."""
+        app = self.write_app(tmp_path)
+        with patch('main.webdriver.Remote', return_value=session_driver()):
+            result = await main.create_android_driver(
+                app_path=app, device_name="emulator-5554", device_profile="pixel",
+                reuse_session=False,
+            )
+        assert "Appium driver created successfully" in result
+
+        profiles = (await main.list_device_profiles())["profiles"]
+        assert profiles["pixel"]["app_hash"] == main.device_profiles.app_hash(app)
+        assert profiles["pixel"]["appium_version"] == "2.5.1"
+
+        result = await main.forget_device_profile("pixel")
+        assert result["success"] is True
+        result = await main.forget_device_profile("pixel")
+        assert result["success"] is False
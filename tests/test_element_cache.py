@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from selenium.common.exceptions import StaleElementReferenceException
+
+import main
+
+
+class TestElementCache:
+    """Test class for reusing element handles between tool calls."""
+
+    def setup_method(self):
+        self.cache = main.element_cache
+        main.element_cache = main.ElementCache(max_entries=2)
+
+    def teardown_method(self):
+        main.element_cache = self.cache
+
+    def test_entries_are_bounded(self):
+        """Test that the least recently stored elements are dropped first."""
+        cache = main.ElementCache(max_entries=2)
+        session_driver = MagicMock()
+        for name in ("a", "b", "c"):
+            cache.put(session_driver, ("id", name), name)
+
+        assert cache.get(session_driver, ("id", "a")) is None
+        assert cache.get(session_driver, ("id", "c")) == "c"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_element_falls_back_to_search(self):
+        """Test that a stale cached element is replaced by a fresh search."""
+        stale = MagicMock()
+        type(stale).text = property(lambda self: (_ for _ in ()).throw(StaleElementReferenceException("stale")))
+        fresh = MagicMock()
+        fresh.text = "Welcome"
+
+        with patch('main.driver') as mock_driver, patch('main.WebDriverWait') as mock_wait:
+            mock_wait.return_value.until.return_value = fresh
+            main.element_cache.put(mock_driver, ("id", "title"), stale)
+
+            result = await main.get_text("id", "title")
+            again = await main.get_text("id", "title")
+
+        assert result == {"success": True, "text": "Welcome"}
+        assert again == result
+        assert mock_wait.return_value.until.call_count == 1
+        assert main.element_cache.stats()["stale"] == 1
+        assert main.element_cache.get(mock_driver, ("id", "title")) is fresh
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test that a disabled cache always searches."""
+        main.element_cache = main.ElementCache(enabled=False)
+        with patch('main.driver'), patch('main.WebDriverWait') as mock_wait:
+            await main.get_text("id", "title")
+            await main.get_text("id", "title")
+
+        assert mock_wait.return_value.until.call_count == 2
@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import patch
+from selenium.common.exceptions import WebDriverException
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE
+
+USERNAME = {"by": "id", "value": f"{APP_PACKAGE}:id/username"}
+PASSWORD = {"by": "xpath", "value": "//*[@content-desc='Password']"}
+
+IOS_SOURCE = """<?xml version="1.0" encoding="UTF-8"?>
+<AppiumAUT>
+  <XCUIElementTypeApplication type="XCUIElementTypeApplication" name="Example">
+    <XCUIElementTypeTextField type="XCUIElementTypeTextField" name="email" label="Email" value="a@b.c"/>
+    <XCUIElementTypeSecureTextField type="XCUIElementTypeSecureTextField" name="password" value="&#8226;&#8226;"/>
+    <XCUIElementTypeButton type="XCUIElementTypeButton" name="login" label="Log in"/>
+  </XCUIElementTypeApplication>
+</AppiumAUT>"""
+
+
+class TestFillForm:
+    """Test class for filling several fields from one page snapshot."""
+
+    @pytest.fixture(autouse=True)
+    def connect(self, fake_appium):
+        """Connect a real WebDriver client to the fake backend in-process."""
+        self.backend, self.driver = fake_appium()
+        self.backend.reset_stats()
+
+    @pytest.mark.asyncio
+    async def test_fill_form(self):
+        """Test that fields are filled in order and missing or invalid ones reported."""
+        result = await main.fill_form([
+            dict(USERNAME, text="user@example.com"),
+            dict(PASSWORD, text="secret"),
+            {"by": "id", "value": "missing", "text": "x"},
+            {"by": "css", "value": "input", "text": "x"},
+        ], hide_keyboard=True, timeout=0.5)
+
+        assert (result["success"], result["filled"], result["failed"]) == (False, 2, 2)
+        assert [field["status"] for field in result["fields"]] == ["set", "set", "not_found", "error"]
+        assert all(field["verified"] for field in result["fields"][:2])
+        assert sorted(self.backend.ui.texts.values()) == ["secret", "user@example.com"]
+
+        # One search for the first field, two snapshots, one search and entry per field
+        commands = self.backend.stats()["by_command"]
+        assert commands.count("GET source") == 2
+        assert commands.count("POST element") == 2
+        assert len(commands) <= 8, commands
+
+    @pytest.mark.asyncio
+    async def test_wait_errors(self):
+        """Test that only a timeout waiting for the form is reported per field; other errors fail the call."""
+        missing = await main.fill_form([{"by": "id", "value": "missing", "text": "x"}], timeout=0.1)
+        assert missing["fields"][0]["status"] == "not_found"
+
+        with patch('main.with_element', side_effect=WebDriverException("invalid session id")):
+            dead = await main.fill_form([dict(USERNAME, text="user")])
+        assert "invalid session id" in dead["error"]
+        assert "fields" not in dead
+
+    @pytest.mark.asyncio
+    async def test_failed_verification_falls_back(self):
+        """Test that a field the second snapshot shows wrong is entered again with the next mode."""
+        execute = self.backend._execute
+
+        def ignore_replace(body):
+            if body.get("script") != "mobile: replaceElementValue":
+                return execute(body)
+
+        with patch.object(self.backend, "_execute", side_effect=ignore_replace):
+            result = await main.fill_form([dict(USERNAME, text="user")])
+            appended = await main.fill_form([dict(USERNAME, text="name")], clear_first=False, mode="keys")
+
+        assert result["fields"][0]["mode"] == "clipboard"
+        assert result["fields"][0]["verified"] is True
+        assert appended["fields"][0]["mode"] == "keys"
+        assert list(self.backend.ui.texts.values()) == ["username"]
+
+    def test_snapshot_locators(self):
+        """Test which locators a page snapshot answers, and which it leaves to the device."""
+        snapshot = main.PageSnapshot(IOS_SOURCE, "ios")
+
+        def match(by, value):
+            nodes = snapshot.match(main.compile_locator(by, value, "ios"))
+            return nodes if nodes is None else [node.get("name") for node in nodes]
+
+        assert match("id", "email") == ["email"]
+        assert match("accessibility_id", "login") == ["login"]
+        assert match("class_name", "XCUIElementTypeButton") == ["login"]
+        assert match("xpath", "//XCUIElementTypeTextField") == ["email"]
+        assert match("xpath", "//*[contains(@label, 'Log')]") is None  # rewritten to a predicate
+        assert match("id", "nothing") == []
+        assert snapshot.text(snapshot.match(main.compile_locator("id", "email", "ios"))[0]) == "a@b.c"
+
+        android = main.PageSnapshot(self.driver.page_source, "android")
+        selector = main.compile_locator("xpath", "//android.widget.Button[@text='Log in']", "android")
+        assert [node.get("content-desc") for node in android.match(selector)] == ["Login"]
+        assert len(android.match(main.compile_locator("id", "item", "android"))) == 5
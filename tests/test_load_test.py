@@ -0,0 +1,92 @@
+import json
+import random
+import pytest
+
+import main
+from benchmarks.fake_appium import FakeAppiumBackend, FakeAppiumServer
+from benchmarks.load_test import call_sequence, load_mix, run_load_test, summarize
+
+
+class TestLoadTest:
+    """Test class for the concurrent-client load testing harness."""
+
+    def test_load_mix_formats(self, tmp_path):
+        """Test loading call mixes and recorded action log entries."""
+        path = tmp_path / "mix.json"
+        path.write_text(json.dumps([
+            {"tool": "go_back", "weight": 2},
+            {"type": "get_text", "details": {"args": {"by": "id", "value": "title"}}, "success": True},
+        ]))
+
+        mix = load_mix(str(path))
+
+        assert mix[0] == {"tool": "go_back", "arguments": {}, "weight": 2}
+        assert mix[1] == {"tool": "get_text", "arguments": {"by": "id", "value": "title"}, "weight": None}
+
+    def test_unweighted_mix_is_replayed_in_order(self):
+        """Test that recorded calls without weights are replayed in their order."""
+        mix = [{"tool": "a", "weight": None}, {"tool": "b", "weight": None}]
+        sequence = call_sequence(mix, random.Random(0))
+
+        assert [next(sequence)["tool"] for _ in range(5)] == ["a", "b", "a", "b", "a"]
+
+    def test_summary(self):
+        """Test throughput, latency percentiles and the per-second timeline."""
+        calls = [
+            {"tool": "go_back", "t": 0.2, "latency_ms": 10.0, "error": False},
+            {"tool": "go_back", "t": 0.5, "latency_ms": 30.0, "error": False},
+            {"tool": "get_text", "t": 1.1, "latency_ms": 20.0, "error": True},
+        ]
+        samples = [
+            {"t": 0.0, "loop_lag_ms": 1.0, "rss_mb": 100.0, "peak_running": 1},
+            {"t": 1.0, "loop_lag_ms": 5.0, "rss_mb": 101.0, "peak_running": 2},
+        ]
+
+        report = summarize(calls, samples, 2.0, clients=1)
+
+        assert report["throughput_per_s"] == 1.5
+        assert report["peak_concurrency"] == 2
+        assert report["errors"] == 1
+        assert report["latency"]["max_ms"] == 30.0
+        assert report["tools"]["go_back"]["count"] == 2
+        assert [point["calls_per_s"] for point in report["server_timeline"]] == [2, 1, 0]
+        assert report["server_timeline"][1]["loop_lag_max_ms"] == 5.0
+        assert report["server_timeline"][2]["rss_mb"] is None
+
+    @pytest.mark.asyncio
+    async def test_get_server_stats(self):
+        """Test the server statistics tool used by the harness."""
+        result = await main.get_server_stats()
+
+        assert result["success"] is True
+        assert result["memory"]["max_rss_mb"] > 0
+        assert "event_loop_lag" in result
+        assert result["sessions"]["open"] == len(main.open_sessions)
+
+    @pytest.mark.asyncio
+    async def test_stdio_clients_against_fake_server(self):
+        """Test a short run with a server process spawned over stdio."""
+        with FakeAppiumServer() as fake_server:
+            report = await run_load_test(
+                fake_server.url, clients=1, duration=1.0, sample_interval=0.5,
+                mix=[{"tool": "go_back", "arguments": {}, "weight": None}],
+            )
+
+        assert report["calls"] > 0
+        assert report["errors"] == 0
+        assert report["server_timeline"][0]["rss_mb"] > 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("no_sessions")
+    async def test_memory_clients_share_one_server(self):
+        """Test that clients sharing one server run their calls concurrently."""
+        main.client_router = main.ClientRouter(max_pending=64)
+        with FakeAppiumServer(FakeAppiumBackend(latency=0.02)) as fake_server:
+            report = await run_load_test(
+                fake_server.url, clients=4, duration=1.0, transport="memory", sample_interval=0.5,
+                mix=[{"tool": "get_device_orientation", "arguments": {}, "weight": None}],
+            )
+
+        assert report["calls"] > 0
+        assert report["errors"] == 0
+        assert report["peak_concurrency"] > 1
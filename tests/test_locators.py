@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import patch
+
+import main
+
+
+class TestLocators:
+    """Test class for locator validation, caching and XPath rewriting."""
+
+    def test_validation(self):
+        """Test that unknown strategies, empty values and broken XPath are rejected."""
+        with pytest.raises(ValueError, match="Unknown locator strategy 'css'"):
+            main.compile_locator("css", "button", None)
+        with pytest.raises(ValueError, match="non-empty"):
+            main.compile_locator("id", "", None)
+        with pytest.raises(ValueError, match="Invalid XPath"):
+            main.compile_locator("xpath", "//*[@text='Log in'", None)
+
+        assert main.compile_locator("accessibility id", "Login", None).strategy == "ACCESSIBILITY_ID"
+        assert main.compile_locator("-android uiautomator", "x", None).strategy == "ANDROID_UIAUTOMATOR"
+
+    @pytest.mark.parametrize("xpath,platform,expected", [
+        ("//*[@resource-id='com.example.app:id/login']", "android", ("ID", "com.example.app:id/login")),
+        ("//*[@resource-id='login']", "android", ("ANDROID_UIAUTOMATOR", 'new UiSelector().resourceId("login")')),
+        ("//*[@content-desc=\"Login\"]", "android", ("ACCESSIBILITY_ID", "Login")),
+        ("//*[@text='Log in']", "android", ("ANDROID_UIAUTOMATOR", 'new UiSelector().text("Log in")')),
+        ("//android.widget.Button[@text='Log in']", "android",
+         ("ANDROID_UIAUTOMATOR", 'new UiSelector().className("android.widget.Button").text("Log in")')),
+        ("//*[contains(@text, 'Item')]", "android", ("ANDROID_UIAUTOMATOR", 'new UiSelector().textContains("Item")')),
+        ("//android.widget.EditText", "android", ("CLASS_NAME", "android.widget.EditText")),
+        ("//*[@name='Login']", "ios", ("ACCESSIBILITY_ID", "Login")),
+        ("//XCUIElementTypeButton[@label='Log in']", "ios",
+         ("IOS_PREDICATE", 'type == "XCUIElementTypeButton" AND label == "Log in"')),
+        ("//*[@text='Log in']", None, None),
+        ("//*[@text=\"it's\"]", "android", None),
+        ("//*[@text='Log in']/..", "android", None),
+    ])
+    def test_xpath_rewrites(self, xpath, platform, expected):
+        """Test which XPath patterns are rewritten, and to what."""
+        locator = main.compile_locator("xpath", xpath, platform)
+        if expected is None:
+            assert locator == ("XPATH", xpath, None)
+        else:
+            assert (locator.strategy, locator.value) == expected
+            assert locator.rewritten_from == ("xpath", xpath)
+
+    @pytest.mark.asyncio
+    async def test_explain_locator(self, fake_appium):
+        """Test that explain_locator measures the rewrite and the element's own locators."""
+        fake_appium()
+
+        result = await main.explain_locator("xpath", "//*[@text='Log in']")
+        found = await main.get_text("xpath", "//*[@text='Log in']")
+
+        assert result["strategy"] == "android_uiautomator"
+        assert result["rewritten"] is True
+        assert [(entry["by"], entry["matches"]) for entry in result["alternatives"]] == [
+            ("xpath", 1), ("android_uiautomator", 1), ("id", 1), ("accessibility_id", 1),
+        ]
+        assert result["fastest"]["by"] in ("xpath", "android_uiautomator", "id", "accessibility_id")
+        assert found["text"] == "Log in"
+
+    @pytest.mark.asyncio
+    async def test_webview_xpath_is_not_rewritten(self, make_driver):
+        """Test that XPath searches the DOM as is after switching to a webview context."""
+        mock_driver = make_driver("web")
+        mock_driver.capabilities = {"platformName": "Android"}
+
+        with patch('main.driver', mock_driver), patch('main.active_session', None):
+            assert main.resolve_locator("xpath", "//div") == (main.AppiumBy.CLASS_NAME, "div")
+            result = await main.switch_to_context("WEBVIEW_com.example.app")
+            assert result["success"] is True
+            assert main.resolve_locator("xpath", "//div") == (main.AppiumBy.XPATH, "//div")
+            assert main.resolve_locator("xpath", "//*[@class='x']") == (main.AppiumBy.XPATH, "//*[@class='x']")
+            await main.switch_to_context("NATIVE_APP")
+            assert main.resolve_locator("xpath", "//div") == (main.AppiumBy.CLASS_NAME, "div")
+
+    def test_rejected_rewrite_falls_back_to_xpath(self, make_driver):
+        """Test that a rewritten locator the server rejects is searched for as the original XPath."""
+        from selenium.common.exceptions import InvalidSelectorException
+
+        searches = []
+
+        def execute(command, params=None):
+            searches.append((params["using"], params["value"]))
+            if params["using"] != "xpath":
+                raise InvalidSelectorException("invalid selector: Unable to locate element")
+            return {"value": {"element-6066-11e4-a52e-4f735466cecf": "1"}}
+
+        mock_driver = make_driver("s1")
+        mock_driver.capabilities = {"platformName": "Android"}
+        mock_driver.execute = execute
+        mock_driver = main.instrument_driver(mock_driver)
+        xpath = "//*[@text='Log in']"
+
+        with patch('main.driver', mock_driver):
+            by_enum, value = main.resolve_locator("xpath", xpath)
+            mock_driver.execute("findElement", {"using": by_enum, "value": value})
+            assert main.resolve_locator("xpath", xpath) == (main.AppiumBy.XPATH, xpath)
+
+        assert searches == [(by_enum, value), ("xpath", xpath)]
+        assert by_enum == main.AppiumBy.ANDROID_UIAUTOMATOR
@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import json
+import socket
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import main
+
+
+def device_remote(server_url, options):
+    """Fake webdriver.Remote whose session reports its device name as orientation."""
+    device = options.to_capabilities()["appium:deviceName"]
+    mock_driver = MagicMock()
+    mock_driver.session_id = f"session-{device}"
+    mock_driver.capabilities = {"appPackage": "com.example.app"}
+    mock_driver.orientation = device
+    return mock_driver
+
+
+async def call(client, tool, **arguments):
+    result = await client.call_tool(tool, arguments)
+    text = result.content[0].text
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestMultiClient:
+    """Test class for serving several MCP clients from one server."""
+
+    def setup_method(self):
+        """Start each test with a fresh client router and no device profiles."""
+        main.client_router = main.ClientRouter(max_pending=8)
+        self.profiles = patch('main.use_device_profiles', False)
+        self.profiles.start()
+
+    def teardown_method(self):
+        self.profiles.stop()
+
+    @pytest.mark.asyncio
+    async def test_each_client_has_its_own_session(self):
+        """Test that tool calls run in the calling client's current session."""
+        async with contextlib.AsyncExitStack() as stack:
+            first = await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+            second = await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+
+            with patch('main.webdriver.Remote', side_effect=device_remote):
+                await call(first, "create_android_driver", app_path="app.apk", device_name="phone")
+                await call(second, "create_android_driver", app_path="app.apk", device_name="tablet")
+
+            first_result, second_result = await asyncio.gather(
+                call(first, "get_device_orientation"), call(second, "get_device_orientation")
+            )
+            assert first_result["orientation"] == "phone"
+            assert second_result["orientation"] == "tablet"
+
+            # Both clients see all sessions, each with its own as the active one
+            sessions = (await call(first, "list_sessions"))["sessions"]
+            assert {s["session_id"]: s["active"] for s in sessions} == {
+                "session-phone": True, "session-tablet": False,
+            }
+            assert {s["owner"] for s in sessions} == {"client-1", "client-2"}
+
+            # Another client's current session cannot be taken over
+            result = await call(second, "switch_session", session_id="session-phone")
+            assert "error" in result
+            assert (await call(second, "get_device_orientation"))["orientation"] == "tablet"
+
+            await call(first, "stop_appium_driver")
+            assert "not initialized" in str(await call(first, "get_device_orientation"))
+            assert (await call(second, "get_device_orientation"))["orientation"] == "tablet"
+
+    @pytest.mark.asyncio
+    async def test_clients_on_different_sessions_run_concurrently(self):
+        """Test that a slow call in one client's session does not hold up another client."""
+        started, release = threading.Event(), threading.Event()
+
+        def orientation(self):
+            started.set()
+            release.wait(5)
+            return "SLOW"
+
+        async with contextlib.AsyncExitStack() as stack:
+            first = await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+            second = await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+
+            with patch('main.webdriver.Remote', side_effect=device_remote):
+                await call(first, "create_android_driver", app_path="app.apk", device_name="phone")
+                await call(second, "create_android_driver", app_path="app.apk", device_name="tablet")
+            type(main.open_sessions["session-phone"].driver).orientation = property(orientation)
+
+            slow = asyncio.create_task(call(first, "get_device_orientation"))
+            assert await asyncio.to_thread(started.wait, 5)
+            result = await asyncio.wait_for(call(second, "get_device_orientation"), 5)
+            assert result["orientation"] == "tablet"
+            assert not slow.done()
+            assert main.client_router.stats()["peak_running"] == 2
+
+            release.set()
+            assert (await slow)["orientation"] == "SLOW"
+        # Calls ran in the clients' own state, not through the module-level driver
+        assert main.driver is None and main.active_session is None
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        """Test that calls beyond the waiting limit are rejected rather than queued."""
+        router = main.ClientRouter(max_pending=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with router.turn(None):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        with pytest.raises(main.ServerBusy):
+            async with router.turn(None):
+                pass
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert router.stats()["calls"] == 2
+        assert router.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backpressure_through_call_tool(self):
+        """Test that a running tool call leaves the loop free, so clients on the same driver queue or are rejected."""
+        main.client_router = main.ClientRouter(max_pending=1)
+        started, release = threading.Event(), threading.Event()
+
+        def orientation(self):
+            started.set()
+            release.wait(5)
+            return "PORTRAIT"
+
+        blocking = MagicMock()
+        type(blocking).orientation = property(orientation)
+        main.driver = blocking
+
+        async with contextlib.AsyncExitStack() as stack:
+            clients = [
+                await stack.enter_async_context(create_connected_server_and_client_session(main.mcp._mcp_server))
+                for _ in range(3)
+            ]
+            running = asyncio.create_task(call(clients[0], "get_device_orientation"))
+            assert await asyncio.to_thread(started.wait, 5)
+            waiting = asyncio.create_task(call(clients[1], "get_device_orientation"))
+            for _ in range(100):
+                if main.client_router.waiting:
+                    break
+                await asyncio.sleep(0.01)
+            assert main.client_router.waiting == 1
+
+            rejected = await asyncio.wait_for(call(clients[2], "get_device_orientation"), 5)
+            assert "Server busy" in str(rejected)
+            assert not running.done()
+
+            release.set()
+            assert (await running)["orientation"] == "PORTRAIT"
+            await waiting
+        assert main.client_router.stats()["rejected"] == 1
+
+    def test_transport_security(self):
+        """Test that DNS rebinding protection accepts the host the server is bound to."""
+        settings = main.transport_security("10.0.0.5", "proxy.example.com")
+        assert settings.enable_dns_rebinding_protection is True
+        assert "10.0.0.5:*" in settings.allowed_hosts
+        assert "proxy.example.com:*" in settings.allowed_hosts
+        assert "localhost:*" in settings.allowed_hosts
+        assert "http://10.0.0.5:*" in settings.allowed_origins
+        assert "evil.example.com:*" not in settings.allowed_hosts
+
+        wildcard = main.transport_security("0.0.0.0")
+        assert f"{socket.gethostname()}:*" in wildcard.allowed_hosts
+        assert "0.0.0.0:*" not in wildcard.allowed_hosts
+
+    def test_transport_arguments(self):
+        """Test the transport command line options and their defaults."""
+        args = main.parse_args([])
+        assert (args.transport, args.host, args.port) == ("stdio", "127.0.0.1", 8000)
+
+        args = main.parse_args(["--transport", "streamable-http", "--host", "0.0.0.0", "--port", "9000"])
+        assert (args.transport, args.host, args.port) == ("streamable-http", "0.0.0.0", 9000)
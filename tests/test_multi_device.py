@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+import threading
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import main
+
+
+def slow_remote(delays, make_driver):
+    """Fake webdriver.Remote that takes a per-device time to start a session."""
+    def remote(server_url, options):
+        device = options.to_capabilities()["appium:deviceName"]
+        if delays[device] is None:
+            raise Exception(f"{device} is offline")
+        time.sleep(delays[device])
+        return make_driver(f"session-{device}")
+    return remote
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestMultiDevice:
+    """Test class for creating and switching between sessions on several devices."""
+
+    def setup_method(self):
+        """Start each test with no device profiles."""
+        self.profiles = patch('main.use_device_profiles', False)
+        self.profiles.start()
+
+    def teardown_method(self):
+        self.profiles.stop()
+
+    @pytest.mark.asyncio
+    async def test_sessions_start_in_parallel(self, make_driver):
+        """Test that sessions start concurrently and are reported as they become ready."""
+        delays = {"slow": 0.4, "fast": 0.1, "medium": 0.2}
+        devices = [{"platform": "android", "app_path": "app.apk", "device_name": name} for name in delays]
+        ctx = MagicMock()
+        ctx.info = AsyncMock()
+        ctx.report_progress = AsyncMock()
+
+        with patch('main.webdriver.Remote', side_effect=slow_remote(delays, make_driver)):
+            result = await main.create_drivers(devices, ctx=ctx)
+
+        assert result["success"] is True
+        assert result["ready"] == 3
+        # About as long as the slowest device, not the sum of all of them
+        assert result["elapsed_ms"] < 650
+        assert [session["device_name"] for session in result["sessions"]] == ["slow", "fast", "medium"]
+        messages = [call.args[0] for call in ctx.info.call_args_list]
+        assert messages[0] == "Device 1 ready: session session-fast"
+        ctx.report_progress.assert_called_with(3, 3)
+        # The first session that became ready is the current driver
+        assert result["active_session_id"] == "session-fast"
+        assert main.driver.session_id == "session-fast"
+
+    @pytest.mark.asyncio
+    async def test_partial_failure_is_reported(self, make_driver):
+        """Test that one failing device does not prevent the others from starting."""
+        delays = {"ok": 0.0, "offline": None}
+        devices = [
+            {"platform": "android", "app_path": "app.apk", "device_name": "ok"},
+            {"platform": "android", "app_path": "app.apk", "device_name": "offline"},
+            {"platform": "android"},
+        ]
+
+        with patch('main.webdriver.Remote', side_effect=slow_remote(delays, make_driver)):
+            result = await main.create_drivers(devices)
+
+        assert result["success"] is False
+        assert result["ready"] == 1
+        assert result["failed"] == 2
+        ok, offline, invalid = result["sessions"]
+        assert ok["session_id"] == "session-ok"
+        assert offline["error"] == "offline is offline"
+        assert "Either app_path" in invalid["error"]
+
+    @pytest.mark.asyncio
+    async def test_switch_between_sessions(self, make_driver):
+        """Test switching the current driver between open sessions."""
+        devices = [
+            {"platform": "android", "app_path": "app.apk", "device_name": name} for name in ("a", "b")
+        ]
+        with patch('main.webdriver.Remote', side_effect=slow_remote({"a": 0.0, "b": 0.05}, make_driver)):
+            await main.create_drivers(devices, max_parallel=1)
+
+        sessions = (await main.list_sessions())["sessions"]
+        assert {session["session_id"] for session in sessions} == {"session-a", "session-b"}
+
+        result = await main.switch_session("session-b")
+        assert result["success"] is True
+        assert main.driver.session_id == "session-b"
+        assert main.active_session in main.managed_sessions()
+
+        await main.stop_appium_driver()
+        assert list(main.open_sessions) == ["session-a"]
+        assert "error" in await main.switch_session("session-b")
+
+    @pytest.mark.asyncio
+    async def test_cancellation_does_not_block_or_leak(self, make_driver):
+        """Test that cancelling returns at once and late sessions go to the warm pool."""
+        starting, release = threading.Event(), threading.Event()
+
+        def remote(server_url, options):
+            starting.set()
+            release.wait(5)
+            return make_driver(f"session-{options.to_capabilities()['appium:deviceName']}")
+
+        devices = [{"platform": "android", "app_path": "app.apk", "device_name": name} for name in ("slow", "queued")]
+        with patch('main.webdriver.Remote', side_effect=remote) as mock_remote:
+            task = asyncio.create_task(main.create_drivers(devices, max_parallel=1))
+            while not starting.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            cancelled_at = time.perf_counter()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert time.perf_counter() - cancelled_at < 0.5
+
+            release.set()
+            for _ in range(100):
+                if len(main.session_pool):
+                    break
+                await asyncio.sleep(0.01)
+
+        assert main.open_sessions == {}
+        assert [session.session_id for session in main.session_pool.sessions()] == ["session-slow"]
+        # The device still waiting for a worker was never started
+        assert mock_remote.call_count == 1
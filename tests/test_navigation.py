@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import patch
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE
+
+
+def tap(resource_id):
+    return main.tap_element("id", f"{APP_PACKAGE}:id/{resource_id}")
+
+
+class TestNavigation:
+    """Test class for learning the navigation graph and replaying paths with navigate_to."""
+
+    @pytest.fixture(autouse=True)
+    def connect(self, fake_appium):
+        """Connect a real WebDriver client to a fake app with several screens."""
+        self.backend, self.driver = fake_appium(item_count=3, navigation=True)
+        self.screens = main.screen_index
+        self.graph = main.navigation_graph
+        main.screen_index = main.ScreenIndex(f"screens-{id(self)}.json")
+        main.navigation_graph = main.NavigationGraph(f"navigation-{id(self)}.json", learn=True)
+        yield
+        main.screen_index = self.screens
+        main.navigation_graph = self.graph
+
+    async def explore(self):
+        """Walk login > home > settings > about, naming each screen, then go back to login."""
+        await main.save_screen("Login")
+        await tap("login")
+        await main.save_screen("Home")
+        await tap("settings")
+        await main.save_screen("Settings")
+        await tap("about")
+        await main.save_screen("About")
+        for _ in range(3):
+            await main.go_back()
+
+    @pytest.mark.asyncio
+    async def test_learn_and_navigate(self):
+        """Test that recorded transitions are replayed along the shortest path."""
+        await self.explore()
+        graph = await main.get_navigation_graph()
+        assert {(edge["from"], edge["to"], edge["tool"]) for edge in graph["edges"]} == {
+            ("Login", "Home", "tap_element"), ("Home", "Settings", "tap_element"),
+            ("Settings", "About", "tap_element"), ("About", "Settings", "go_back"),
+            ("Settings", "Home", "go_back"), ("Home", "Login", "go_back"),
+        }
+
+        self.backend.reset_stats()
+        result = await main.navigate_to("About")
+        assert result["success"] is True
+        assert [step["to"] for step in result["steps"]] == ["Home", "Settings", "About"]
+        assert self.backend.ui.screen == "about"
+
+        result = await main.navigate_to("Home")
+        assert [step["tool"] for step in result["steps"]] == ["go_back", "go_back"]
+
+        # Persisted, and usable by a new server
+        reloaded = main.NavigationGraph(main.navigation_graph.path, learn=False)
+        assert len(reloaded.shortest_path(APP_PACKAGE, "Login", "About")) == 3
+
+    @pytest.mark.asyncio
+    async def test_replanning_and_unknown_paths(self):
+        """Test that a step ending on another screen is counted as a failure and planned around."""
+        await self.explore()
+        assert "No known path" in (await main.navigate_to("Profile"))["error"]
+
+        # The settings button now opens the profile screen
+        with patch.dict("benchmarks.fake_appium.SCREENS", {"home": [
+            ("title", "TextView", "Home", None),
+            ("settings", "Button", "Settings", "profile"),
+        ]}):
+            self.backend.ui.show(["login"])
+            result = await main.navigate_to("Settings", max_steps=4)
+
+        assert "error" in result
+        assert result["steps"][1]["to"] not in ("Settings", "Home")
+        edge = next(edge for edge in main.navigation_graph.graph(APP_PACKAGE)["edges"]
+                    if (edge["from"], edge["to"]) == ("Home", "Settings"))
+        assert edge["failures"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_learning_is_off_by_default(self):
+        """Test that navigation tools send no extra commands unless learning is on."""
+        await main.configure_navigation(learn=False)
+        self.backend.reset_stats()
+        await tap("login")
+        assert "GET source" not in self.backend.stats()["by_command"]
+        assert main.navigation_graph.graph(APP_PACKAGE)["edges"] == []
@@ -0,0 +1,81 @@
+import base64
+import pytest
+from unittest.mock import patch
+
+from mcp.shared.memory import create_connected_server_and_client_session
+from pydantic import AnyUrl
+
+import main
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + (1080).to_bytes(4, "big") + (1920).to_bytes(4, "big") + bytes(4000)
+
+
+class TestPayloads:
+    """Test class for storing large tool payloads as MCP resources."""
+
+    def setup_method(self):
+        self.store = main.payload_store
+        main.payload_store = main.PayloadStore(max_bytes=10000, inline_limit=1000)
+
+    def teardown_method(self):
+        main.payload_store = self.store
+
+    def test_store_is_content_addressed_and_bounded(self):
+        """Test deduplication, least recently used eviction and byte ranges."""
+        store = main.PayloadStore(max_bytes=250, inline_limit=0)
+        first = store.put(b"a" * 100, "application/xml")
+        assert store.put(b"a" * 100, "application/xml") == first
+        second = store.put(b"b" * 100, "application/xml")
+        store.get(first)
+        store.put(b"c" * 100, "application/xml")
+
+        assert store.size == 200
+        with pytest.raises(KeyError):
+            store.get(second)
+        assert store.read(first, "10-14") == b"aaaaa"
+        assert store.read(first, "95-") == b"aaaaa"
+        with pytest.raises(ValueError):
+            store.read(first, "bytes=1")
+
+    @pytest.mark.asyncio
+    async def test_large_screenshot_is_returned_as_resource(self):
+        """Test that a large screenshot becomes a URI that read_payload can read."""
+        with patch('main.driver') as mock_driver:
+            mock_driver.get_screenshot_as_base64.return_value = base64.b64encode(PNG).decode("ascii")
+            result = await main.take_screenshot()
+
+        assert "screenshot" not in result
+        assert result["resource_uri"].startswith("appium://screenshots/")
+        assert (result["width"], result["height"], result["size_bytes"]) == (1080, 1920, len(PNG))
+
+        chunk = await main.read_payload(result["resource_uri"], offset=0, length=8)
+        assert base64.b64decode(chunk["data_base64"]) == PNG[:8]
+        assert chunk["more"] is True
+
+        ranged = await main.read_payload(result["resource_uri"] + "/16-23", offset=4, length=100)
+        assert base64.b64decode(ranged["data_base64"]) == PNG[20:24]
+        assert (ranged["offset"], ranged["more"]) == (20, False)
+        assert "Invalid byte range" in (await main.read_payload(result["resource_uri"] + "/x"))["error"]
+        assert "Not a page source" in (await main.read_payload("appium://other/abc"))["error"]
+
+        with patch('main.driver') as mock_driver:
+            mock_driver.get_screenshot_as_base64.return_value = base64.b64encode(PNG).decode("ascii")
+            result = await main.take_screenshot(inline=True)
+        assert base64.b64decode(result["screenshot"]) == PNG
+
+    @pytest.mark.asyncio
+    async def test_page_source_resource(self):
+        """Test reading a stored page source and a byte range of it through MCP."""
+        source = "<hierarchy>" + "<node text='x'/>" * 200 + "</hierarchy>"
+        with patch('main.driver') as mock_driver:
+            mock_driver.page_source = source
+            result = await main.get_page_source()
+
+        assert result["elements"] == 201
+        async with create_connected_server_and_client_session(main.mcp._mcp_server) as client:
+            full = await client.read_resource(AnyUrl(result["resource_uri"]))
+            part = await client.read_resource(AnyUrl(result["resource_uri"] + "/0-10"))
+
+        assert full.contents[0].text == source
+        assert full.contents[0].mimeType == "application/xml"
+        assert part.contents[0].text == "<hierarchy>"
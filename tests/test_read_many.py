@@ -0,0 +1,52 @@
+import pytest
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE
+
+
+class TestReadMany:
+    """Test class for reading many elements from one page snapshot."""
+
+    @pytest.fixture(autouse=True)
+    def connect(self, fake_appium):
+        """Connect a real WebDriver client to the fake backend in-process."""
+        self.backend, self.driver = fake_appium()
+        self.backend.reset_stats()
+
+    @pytest.mark.asyncio
+    async def test_read_from_snapshot(self):
+        """Test that simple locators are answered from one page source."""
+        result = await main.read_many([
+            {"by": "id", "value": f"{APP_PACKAGE}:id/title"},
+            {"by": "accessibility_id", "value": "Login", "name": "login", "attributes": ["text", "clickable"]},
+            {"by": "id", "value": "item"},
+            {"by": "id", "value": "missing"},
+            {"by": "css", "value": "h1"},
+        ])
+
+        values = result["values"]
+        assert values[f"id={APP_PACKAGE}:id/title"] == {
+            "found": True, "count": 1, "text": "Welcome", "source": "snapshot",
+        }
+        assert values["login"] == {"found": True, "count": 1, "text": "Log in", "clickable": "true", "source": "snapshot"}
+        assert values["id=item"]["count"] == 5
+        assert values["id=missing"] == {"found": False, "count": 0, "source": "snapshot"}
+        assert "Unknown locator strategy" in values["css=h1"]["error"]
+        assert (result["from_snapshot"], result["from_device"]) == (4, 0)
+        assert self.backend.stats()["by_command"] == ["GET source"]
+
+    @pytest.mark.asyncio
+    async def test_live_lookups(self):
+        """Test that locators and attributes the snapshot cannot answer are read on the device."""
+        result = await main.read_many([
+            {"by": "xpath", "value": "//android.widget.FrameLayout/android.widget.FrameLayout"},
+            {"by": "id", "value": "username", "attributes": ["checked"]},
+            {"by": "id", "value": "title"},
+        ])
+
+        values = result["values"]
+        assert values["xpath=//android.widget.FrameLayout/android.widget.FrameLayout"]["source"] == "device"
+        assert values["id=username"] == {"found": True, "count": 1, "checked": None, "source": "device"}
+        assert values["id=title"]["source"] == "snapshot"
+        assert (result["from_snapshot"], result["from_device"]) == (1, 2)
+        assert self.backend.stats()["by_command"].count("POST elements") == 2
@@ -0,0 +1,157 @@
+import pytest
+import os
+import xml.etree.ElementTree as ET
+from unittest.mock import patch, MagicMock
+
+import main
+
+
+class TestReporting:
+    """Test class for the incremental JUnit XML / HTML reports."""
+
+    def setup_method(self):
+        """Reset the action log, test info and report before each test."""
+        main.action_log.clear()
+        main.test_info = {
+            "name": "Checkout Flow",
+            "started_at": None,
+            "finished_at": None,
+            "status": "Not Started",
+            "success_count": 0,
+            "error_count": 0,
+        }
+        main.active_report = None
+
+    def teardown_method(self):
+        """Make sure no report leaks into other tests."""
+        main.active_report = None
+
+    def test_steps_are_appended_before_the_test_completes(self, tmp_path):
+        """Test that each step is on disk as soon as it is logged."""
+        main.active_report = main.IncrementalReport(str(tmp_path), screenshots="none")
+
+        main.log_action("tap_element", {"args": {"value": "login"}}, True, duration_ms=120)
+
+        with open(main.active_report.junit_path + ".part") as f:
+            assert "0001 tap_element" in f.read()
+        with open(main.active_report.html_path) as f:
+            html = f.read()
+        assert "tap_element" in html
+        assert "120 ms" in html
+
+    def test_entered_text_is_redacted(self, tmp_path):
+        """Test that text typed into fields, e.g. passwords, does not reach the report files."""
+        main.active_report = main.IncrementalReport(str(tmp_path), screenshots="none")
+
+        main.log_action("set_text", {"args": {"value": "password", "text": "hunter2"}}, True, duration_ms=10)
+        main.log_action("fill_form", {"args": {"fields": [{"value": "pin", "text": "1234"}]}}, True, duration_ms=10)
+        result = main.complete_test(True)
+
+        for path in (result["junit"], result["html"]):
+            with open(path) as f:
+                content = f.read()
+            assert "hunter2" not in content and "1234" not in content
+            assert "password" in content and "***" in content
+
+    def test_reports_started_together_do_not_collide(self, tmp_path):
+        """Test that reports started within the same second get their own files."""
+        first = main.IncrementalReport(str(tmp_path))
+        second = main.IncrementalReport(str(tmp_path))
+        assert first.junit_path != second.junit_path
+        assert first.html_path != second.html_path
+
+    def test_action_log_is_bounded(self):
+        """Test that only the most recent actions are kept in memory."""
+        for index in range(main.action_log.maxlen + 5):
+            main.log_action("tap_element", {"args": {"index": index}})
+        assert len(main.action_log) == main.action_log.maxlen
+        assert main.action_log[-1]["details"]["args"]["index"] == main.action_log.maxlen + 4
+
+    def test_complete_test_writes_junit_totals(self, tmp_path):
+        """Test that completing the test produces a valid JUnit XML file."""
+        main.active_report = main.IncrementalReport(str(tmp_path), screenshots="none")
+
+        main.log_action("tap_element", {"args": {}}, True, duration_ms=100)
+        main.log_action("get_text", {"args": {}, "error": "not found"}, False, duration_ms=400)
+        result = main.complete_test(False)
+
+        assert main.active_report is None
+        assert result["steps"] == 2
+        assert result["failures"] == 1
+        assert not os.path.exists(result["junit"] + ".part")
+
+        suite = ET.parse(result["junit"]).getroot().find("testsuite")
+        assert suite.get("name") == "Checkout Flow"
+        assert suite.get("tests") == "2"
+        assert suite.get("failures") == "1"
+        assert suite.get("time") == "0.500"
+        cases = suite.findall("testcase")
+        assert cases[1].find("failure").get("message") == "not found"
+
+        with open(result["html"]) as f:
+            html = f.read()
+        assert html.rstrip().endswith("</html>")
+        assert "Completed with Errors" in html
+
+    def test_failure_screenshot_is_linked_in_html(self, tmp_path):
+        """Test that failed steps get a screenshot thumbnail."""
+        main.active_report = main.IncrementalReport(str(tmp_path), screenshots="failures")
+        mock_driver = MagicMock()
+
+        assert main.active_report.wants_screenshot(True) is False
+        assert main.active_report.wants_screenshot(False) is True
+        name = main.active_report.capture_screenshot(mock_driver)
+        main.log_action("tap_element", {"args": {}}, False, duration_ms=10, screenshot=name)
+
+        mock_driver.save_screenshot.assert_called_once_with(os.path.join(str(tmp_path), name))
+        with open(main.active_report.html_path) as f:
+            assert f'src="{name}"' in f.read()
+
+    def test_invalid_screenshot_policy(self, tmp_path):
+        """Test that an unknown screenshot policy is rejected."""
+        with pytest.raises(ValueError):
+            main.IncrementalReport(str(tmp_path), screenshots="sometimes")
+
+    @pytest.mark.asyncio
+    async def test_tools_are_logged_with_duration(self):
+        """Test that tool calls are recorded as report steps."""
+        with patch('main.driver') as mock_driver:
+            result = await main.swipe(100, 200, 300, 400)
+
+        assert result["success"] is True
+        assert len(main.action_log) == 1
+        assert main.action_log[0]["type"] == "swipe"
+        assert main.action_log[0]["details"]["args"]["start_x"] == 100
+        assert main.action_log[0]["duration_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_tool_call_is_logged_as_failure(self):
+        """Test that a tool returning an error is recorded as a failed step."""
+        with patch('main.driver') as mock_driver:
+            mock_driver.back.side_effect = Exception("Test error")
+            await main.go_back()
+
+        assert main.action_log[0]["success"] is False
+        assert main.action_log[0]["details"]["error"] == "Test error"
+        assert main.test_info["error_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_start_and_finish_report_tools(self, tmp_path):
+        """Test the start_report and finish_report tools."""
+        result = await main.start_report(output_dir=str(tmp_path), screenshots="none")
+        assert result["success"] is True
+
+        result = await main.start_report(output_dir=str(tmp_path))
+        assert "error" in result
+
+        with patch('main.driver'):
+            await main.go_back()
+
+        result = await main.finish_report()
+        assert result["success"] is True
+        assert result["steps"] == 1
+        assert main.test_info["status"] == "Completed Successfully"
+        assert os.path.exists(result["junit"])
+
+        result = await main.finish_report()
+        assert result["success"] is False
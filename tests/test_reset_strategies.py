@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+import main
+
+
+# Mark all tests in this module as asyncio tests
+pytestmark = pytest.mark.asyncio
+
+
+def make_driver(platform="Android"):
+    """Create a mock driver for an app with a known package and app path."""
+    mock_driver = MagicMock()
+    mock_driver.capabilities = {
+        "platformName": platform,
+        "appium:appPackage": "com.example.app",
+        "appium:app": "/tmp/app.apk",
+    }
+    return mock_driver
+
+
+class TestResetStrategies:
+    """Test class for the app reset strategies."""
+
+    def setup_method(self):
+        """Forget measured reset timings before each test."""
+        main.reset_timings.clear()
+        main.active_session = None
+
+    def teardown_method(self):
+        main.reset_timings.clear()
+
+    async def test_clear_data_on_android(self):
+        """Test that clear_data runs pm clear through mobile: shell and relaunches the app."""
+        mock_driver = make_driver()
+        with patch('main.driver', mock_driver):
+            result = await main.reset_app(strategy="clear_data")
+
+        assert result["success"] is True
+        assert result["strategy"] == "clear_data"
+        mock_driver.execute_script.assert_called_once_with(
+            "mobile: shell", {"command": "pm", "args": ["clear", "com.example.app"]}
+        )
+        mock_driver.activate_app.assert_called_once_with("com.example.app")
+        assert ("com.example.app", "clear_data") in main.reset_timings
+
+    async def test_auto_uses_fastest_strategy_for_isolation(self):
+        """Test that auto picks the cheapest strategy satisfying the isolation level."""
+        mock_driver = make_driver()
+        with patch('main.driver', mock_driver):
+            result = await main.reset_app(isolation="process")
+
+        assert result["strategy"] == "terminate_activate"
+        mock_driver.terminate_app.assert_called_once_with("com.example.app")
+        mock_driver.activate_app.assert_called_once_with("com.example.app")
+
+    async def test_auto_prefers_measured_faster_strategy(self):
+        """Test that measured timings override the initial estimates."""
+        main.reset_timings[("com.example.app", "terminate_activate")] = 3.0
+        main.reset_timings[("com.example.app", "clear_data")] = 1.0
+        mock_driver = make_driver()
+        with patch('main.driver', mock_driver):
+            result = await main.reset_app(isolation="process")
+
+        assert result["strategy"] == "clear_data"
+        mock_driver.terminate_app.assert_not_called()
+
+    async def test_auto_falls_back_when_a_strategy_fails(self):
+        """Test that auto moves on to the next strategy when one fails."""
+        mock_driver = make_driver()
+        mock_driver.execute_script.side_effect = Exception("relaxed security is not enabled")
+        with patch('main.driver', mock_driver):
+            result = await main.reset_app(isolation="data")
+
+        assert result["success"] is True
+        assert result["strategy"] == "reinstall"
+        assert "relaxed security" in result["failed_strategies"]["clear_data"]
+
+    async def test_deep_link_requires_url(self):
+        """Test that deep_link reports an error without a start route."""
+        with patch('main.driver', make_driver()):
+            result = await main.reset_app(strategy="deep_link")
+
+        assert "deep_link_url" in result["error"]
+
+    async def test_deep_link_on_ios(self):
+        """Test that deep_link opens the start route for the app's bundle."""
+        mock_driver = make_driver("iOS")
+        mock_driver.capabilities["appium:bundleId"] = "com.example.ios"
+        del mock_driver.capabilities["appium:appPackage"]
+        with patch('main.driver', mock_driver):
+            result = await main.reset_app(isolation="navigation", deep_link_url="app://home")
+
+        assert result["strategy"] == "deep_link"
+        mock_driver.execute_script.assert_called_once_with(
+            "mobile: deepLink", {"url": "app://home", "bundleId": "com.example.ios"}
+        )
+
+    async def test_invalid_isolation_level(self):
+        """Test that an unknown isolation level is rejected."""
+        with patch('main.driver', make_driver()):
+            result = await main.reset_app(isolation="everything")
+
+        assert "Unknown isolation level" in result["error"]
@@ -0,0 +1,129 @@
+"""
+Round-trip budgets: the maximum number of WebDriver commands each tool may send.
+
+Every command is a round trip to the Appium server and, behind it, the device,
+so extra commands are the usual way tools get slower. The tools run against
+the fake Appium backend through an in-process command executor that records
+each command, which makes the counts deterministic. If a budget fails, look at
+the recorded command sequence in the assertion message. Raise a budget only
+when the extra round trip is intended.
+"""
+import pytest
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE
+
+# Commands element_to_dict sends per element: rect twice (location and size),
+# text, tag name, six attributes, displayed and enabled
+ELEMENT_DETAILS = 12
+
+LOGIN = {"by": "id", "value": f"{APP_PACKAGE}:id/login"}
+
+BUDGETS = [
+    ("find_element", LOGIN, 1 + ELEMENT_DETAILS),
+    ("wait_for_element", LOGIN, 1 + ELEMENT_DETAILS),
+    ("wait_for_element_to_be_clickable", LOGIN, 3 + ELEMENT_DETAILS),
+    ("tap_element", LOGIN, 4),
+    ("long_press_element", dict(LOGIN, duration_ms=0), 3),
+    ("get_text", LOGIN, 2),
+    # Fast text entry reads the field back to verify it; appending reads it first too
+    ("set_text", dict(LOGIN, text="hello"), 3),
+    ("set_text", dict(LOGIN, text="hello", clear_first=False), 4),
+    ("set_text", dict(LOGIN, text="hello", mode="keys"), 3),
+    ("set_text", dict(LOGIN, text="hello", clear_first=False, mode="keys"), 2),
+    ("set_text", dict(LOGIN, text="hello", mode="clipboard"), 6),
+    # One search for the first field, a snapshot before and after, a search and an entry per other field
+    ("fill_form", {"fields": [dict(LOGIN, text="a"), dict(LOGIN, value=f"{APP_PACKAGE}:id/title", text="b")]}, 6),
+    ("get_attribute", dict(LOGIN, attribute="content-desc"), 2),
+    ("read_many", {"locators": [LOGIN, dict(LOGIN, value=f"{APP_PACKAGE}:id/title")], "attributes": ["text", "enabled"]}, 1),
+    ("scroll_to_element", LOGIN, 2 + ELEMENT_DETAILS),
+    ("identify_screen", {}, 1),
+    ("save_screen", {"name": "LoginScreen"}, 1),
+    ("go_back", {}, 1),
+    ("go_home", {}, 1),
+    ("reset_app", {"strategy": "terminate_activate"}, 2),
+    ("get_page_source", {}, 1),
+    ("swipe", {"start_x": 1, "start_y": 2, "end_x": 3, "end_y": 4, "duration_ms": 0}, 1),
+    ("take_screenshot", {}, 1),
+    ("get_device_time", {}, 1),
+    ("get_device_info", {}, 2),
+    ("get_device_orientation", {}, 1),
+    ("set_device_orientation", {"orientation": "LANDSCAPE"}, 1),
+    ("get_current_context", {}, 1),
+    ("get_contexts", {}, 1),
+    ("switch_to_context", {"context_name": "NATIVE_APP"}, 1),
+]
+
+
+class TestRoundTripBudgets:
+    """Test class for the number of WebDriver commands each tool sends."""
+
+    @pytest.fixture(autouse=True)
+    def connect(self, fake_appium):
+        """Connect a real WebDriver client to the fake backend in-process."""
+        self.backend, self.driver = fake_appium(item_count=20)
+        self.backend.reset_stats()
+
+    async def commands_for(self, tool, **arguments):
+        self.backend.reset_stats()
+        result = await getattr(main, tool)(**arguments)
+        assert "error" not in result, result
+        return self.backend.stats()["by_command"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("tool,arguments,budget", BUDGETS)
+    async def test_tool_budget(self, tool, arguments, budget):
+        """Test that a tool stays within its round-trip budget."""
+        commands = await self.commands_for(tool, **arguments)
+        assert len(commands) <= budget, f"{tool} sent {len(commands)} commands: {commands}"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("matches", [1, 5, 20])
+    async def test_find_elements_budget(self, matches):
+        """Test that find_elements searches once, plus the details of each match."""
+        self.backend.ui.item_count = matches
+        self.backend.ui._root = None
+
+        commands = await self.commands_for("find_elements", by="id", value=f"{APP_PACKAGE}:id/item")
+
+        assert commands.count("POST elements") == 1, commands
+        assert len(commands) <= 1 + ELEMENT_DETAILS * matches, commands
+
+    @pytest.mark.asyncio
+    async def test_device_metadata_is_cached(self):
+        """Test that window size, orientation and contexts are fetched once until invalidated."""
+        await self.commands_for("scroll_to_element", **LOGIN)
+        await self.commands_for("get_device_orientation")
+        await self.commands_for("get_contexts")
+
+        assert "GET window/rect" not in await self.commands_for("scroll_to_element", **LOGIN)
+        assert await self.commands_for("get_device_orientation") == []
+        assert await self.commands_for("get_contexts") == []
+        assert await self.commands_for("get_device_info") == []
+
+        # Rotating changes the window size; the new orientation is known without asking
+        await self.commands_for("set_device_orientation", orientation="LANDSCAPE")
+        assert await self.commands_for("get_device_orientation") == []
+        assert len(await self.commands_for("get_device_info")) == 1
+        assert len(await self.commands_for("get_contexts", refresh=True)) == 1
+
+    @pytest.mark.asyncio
+    async def test_element_handles_are_reused(self):
+        """Test that repeated calls on a locator reuse its element until navigation."""
+        title = {"by": "id", "value": f"{APP_PACKAGE}:id/title"}
+        await self.commands_for("get_text", **title)
+
+        assert await self.commands_for("get_text", **title) == ["GET elementText"]
+        assert await self.commands_for("get_attribute", attribute="text", **title) == ["GET elementAttribute"]
+
+        await self.commands_for("go_back")
+        assert await self.commands_for("get_text", **title) == ["POST element", "GET elementText"]
+
+    @pytest.mark.asyncio
+    async def test_missing_element_without_timeout(self):
+        """Test that a failed lookup with no timeout searches only once."""
+        self.backend.reset_stats()
+        result = await main.find_element("id", "missing", timeout=0)
+
+        assert "error" in result
+        assert self.backend.stats()["by_command"] == ["POST element"]
@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import patch
+
+import main
+from benchmarks.fake_appium import FakeUI
+
+CHECKOUT = """<hierarchy rotation="0">
+  <android.widget.FrameLayout class="android.widget.FrameLayout" resource-id="">
+    <android.widget.TextView class="android.widget.TextView" resource-id="com.example.app:id/total" text="$42.00"/>
+    <android.widget.EditText class="android.widget.EditText" resource-id="com.example.app:id/card" text=""/>
+    <android.widget.Button class="android.widget.Button" resource-id="com.example.app:id/pay" text="Pay"/>
+  </android.widget.FrameLayout>
+</hierarchy>"""
+
+CAPABILITIES = {"platformName": "Android", "appPackage": "com.example.app"}
+
+
+def login_source(item_count, greeting="Welcome"):
+    ui = FakeUI(item_count=item_count)
+    ui.texts["el-0"] = greeting
+    return ui.source()
+
+
+class TestScreens:
+    """Test class for screen fingerprints and the named screen index."""
+
+    def setup_method(self):
+        self.index = main.screen_index
+        main.screen_index = main.ScreenIndex(f"screens-{id(self)}.json")
+
+    def teardown_method(self):
+        main.screen_index = self.index
+
+    def test_features_ignore_text_and_list_length(self):
+        """Test that texts and the number of repeated rows do not change the fingerprint."""
+        def fingerprint(source):
+            return main.screen_fingerprint(main.screen_features(main.PageSnapshot(source, "android")))
+
+        assert fingerprint(login_source(5)) == fingerprint(login_source(50, greeting="Hello Ada"))
+        assert fingerprint(login_source(5)) != fingerprint(CHECKOUT)
+
+    @pytest.mark.asyncio
+    async def test_identify_screen(self):
+        """Test naming screens, identifying them later and the persisted index."""
+        with patch('main.driver') as mock_driver:
+            mock_driver.capabilities = CAPABILITIES
+            mock_driver.page_source = login_source(5)
+            assert (await main.identify_screen())["screen"] is None
+            await main.save_screen("LoginScreen")
+            mock_driver.page_source = CHECKOUT
+            await main.save_screen("CheckoutScreen")
+
+            mock_driver.page_source = login_source(20, greeting="Welcome back")
+            login = await main.identify_screen()
+            mock_driver.page_source = CHECKOUT.replace("$42.00", "$7.50")
+            checkout = await main.identify_screen()
+
+        assert (login["screen"], login["confidence"]) == ("LoginScreen", 1.0)
+        assert [candidate["screen"] for candidate in login["candidates"]] == ["LoginScreen", "CheckoutScreen"]
+        assert checkout["screen"] == "CheckoutScreen"
+
+        reloaded = main.ScreenIndex(main.screen_index.path)
+        assert set(reloaded.summary()) == {"LoginScreen", "CheckoutScreen"}
+        assert (await main.forget_screen("LoginScreen"))["success"] is True
+        assert list((await main.list_screens())["screens"]) == ["CheckoutScreen"]
+
+    def test_other_apps_and_threshold(self):
+        """Test that screens of another app are not candidates and weak matches are not named."""
+        login = main.screen_features(main.PageSnapshot(login_source(5), "android"))
+        checkout = main.screen_features(main.PageSnapshot(CHECKOUT, "android"))
+        main.screen_index.save("LoginScreen", login, "com.example.app")
+
+        assert main.screen_index.identify(login, "com.other.app") == []
+        score = main.screen_index.identify(checkout, "com.example.app")[0][1]
+        assert score < main.SCREEN_MATCH_THRESHOLD
@@ -0,0 +1,137 @@
+import pytest
+from unittest.mock import patch
+
+import main
+
+
+@pytest.fixture
+def make_session(make_driver):
+    """Factory for managed sessions around mock drivers."""
+    def make(session_id):
+        return main.ManagedSession(
+            make_driver(session_id), "http://localhost:4723", {"platformName": "Android", "app": "a.apk"}
+        )
+    return make
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestSessionHealth:
+    """Test class for session heartbeats and transparent reconnects."""
+
+    def setup_method(self):
+        """Start each test with no device profiles."""
+        self.profiles = patch('main.use_device_profiles', False)
+        self.profiles.start()
+
+    def teardown_method(self):
+        self.profiles.stop()
+
+    def activate(self, session):
+        main.active_session = session
+        main.driver = session.driver
+
+    def test_dead_session_errors(self):
+        """Test recognising errors that mean the session is gone."""
+        assert main.is_dead_session_error("Message: invalid session id")
+        assert main.is_dead_session_error(
+            "A session is either terminated or not started"
+        )
+        assert not main.is_dead_session_error("no such element")
+
+    def test_heartbeat_pings_only_quiet_sessions(self, make_session):
+        """Test that the heartbeat pings idle sessions and detects dead ones."""
+        heartbeat = main.SessionHeartbeat(interval=30)
+        busy, idle, dead = make_session("busy"), make_session("idle"), make_session("dead")
+        dead.driver.execute.side_effect = Exception("invalid session id")
+        main.session_pool.release(idle)
+        main.session_pool.release(dead)
+        self.activate(busy)
+        now = busy.last_used + 40
+        busy.last_used = now - 5
+
+        result = heartbeat.beat(now=now)
+
+        busy.driver.execute.assert_not_called()
+        idle.driver.execute.assert_called_once_with("getTimeouts")
+        assert result == [dead]
+        assert dead.dead is True
+        assert main.session_pool.sessions() == [idle]
+
+    def test_heartbeat_keeps_unreachable_sessions(self, make_session):
+        """Test that a transient heartbeat failure does not mark a session dead."""
+        heartbeat = main.SessionHeartbeat(interval=30)
+        session = make_session("flaky")
+        session.driver.execute.side_effect = [Exception("Connection reset by peer"), {}]
+        main.session_pool.release(session)
+        now = session.last_used + 40
+
+        assert heartbeat.beat(now=now) == []
+        assert session.dead is False
+        assert main.session_pool.sessions() == [session]
+
+        assert heartbeat.beat(now=now) == []
+        assert session.failure is None
+        assert session.driver.execute.call_count == 2
+
+    def test_check_driver_recreates_dead_session(self, make_driver, make_session):
+        """Test that the next call after a failed heartbeat gets a new session."""
+        session = make_session("old")
+        session.dead = True
+        self.activate(session)
+        new_driver = make_driver("new")
+
+        with patch('main.webdriver.Remote', return_value=new_driver) as mock_remote:
+            main.check_driver()
+
+        assert main.driver is new_driver
+        assert main.active_session.session_id == "new"
+        options = mock_remote.call_args.kwargs["options"]
+        assert options.to_capabilities()["appium:app"] == "a.apk"
+
+    @pytest.mark.asyncio
+    async def test_tool_call_is_retried_after_reconnect(self, make_driver, make_session):
+        """Test that a tool failing on a dead session is retried on a new one."""
+        session = make_session("old")
+        session.driver.back.side_effect = Exception("invalid session id")
+        self.activate(session)
+        new_driver = make_driver("new")
+
+        with patch('main.webdriver.Remote', return_value=new_driver):
+            result = await main.go_back()
+
+        assert result["success"] is True
+        new_driver.back.assert_called_once()
+        assert main.active_session.session_id == "new"
+
+    @pytest.mark.asyncio
+    async def test_reconnect_attempts_are_bounded(self, make_session):
+        """Test that reconnecting gives up after the configured attempts."""
+        session = make_session("old")
+        session.driver.back.side_effect = Exception("invalid session id")
+        self.activate(session)
+
+        with patch('main.webdriver.Remote', side_effect=Exception("device offline")) as mock_remote, \
+             patch('main.time.sleep') as mock_sleep:
+            result = await main.go_back()
+
+        assert "invalid session id" in result["error"]
+        assert mock_remote.call_count == main.RECONNECT_ATTEMPTS
+        assert mock_sleep.call_count == main.RECONNECT_ATTEMPTS - 1
+
+    @pytest.mark.asyncio
+    async def test_check_session_health(self, make_driver, make_session):
+        """Test the health check tool for live and dead sessions."""
+        session = make_session("old")
+        self.activate(session)
+
+        result = await main.check_session_health()
+        assert result["alive"] is True
+
+        session.driver.execute.side_effect = Exception("invalid session id")
+        with patch('main.webdriver.Remote', return_value=make_driver("new")):
+            result = await main.check_session_health()
+
+        assert result["alive"] is False
+        assert result["reconnected"] is True
+        assert result["previous_session_id"] == "old"
+        assert result["session_id"] == "new"
@@ -0,0 +1,268 @@
+import time
+import pytest
+from unittest.mock import patch
+
+import main
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestSessionPool:
+    """Test class for warm session reuse."""
+
+    def setup_method(self):
+        """Forget the reset timings of earlier tests."""
+        main.reset_timings.clear()
+
+    def test_session_key_normalizes_capabilities(self):
+        """Test that vendor prefixes and reset flags do not change the key."""
+        key1 = main.session_key(
+            "http://localhost:4723/wd/hub/",
+            {"platformName": "Android", "appium:app": "a.apk", "appium:noReset": False},
+        )
+        key2 = main.session_key(
+            "http://localhost:4723/wd/hub",
+            {"app": "a.apk", "platformName": "Android", "noReset": True},
+        )
+        key3 = main.session_key(
+            "http://localhost:4723/wd/hub", {"platformName": "Android", "app": "b.apk"}
+        )
+
+        assert key1 == key2
+        assert key1 != key3
+
+    @pytest.mark.asyncio
+    async def test_warm_session_is_reused(self, make_driver):
+        """Test that a released session is reused by a matching create call."""
+        first = make_driver("session-1")
+        with patch('main.webdriver.Remote', return_value=first) as mock_remote:
+            result = await main.create_android_driver(app_path="app.apk")
+            assert result == "Appium driver created successfully."
+
+            result = await main.stop_appium_driver(keep_warm=True)
+            assert result["success"] is True
+            assert main.driver is None
+            first.quit.assert_not_called()
+            assert len(main.session_pool) == 1
+
+            result = await main.create_android_driver(app_path="app.apk")
+
+        assert "reused warm session session-1" in result
+        assert mock_remote.call_count == 1
+        assert main.driver is first
+        assert len(main.session_pool) == 0
+
+    @pytest.mark.asyncio
+    async def test_reused_session_clears_app_data(self, make_driver):
+        """Test that without no_reset the reused session's app data is cleared, as in a new session."""
+        first = make_driver("session-1")
+        first.capabilities = {"platformName": "Android", "appPackage": "com.example.app"}
+        with patch('main.webdriver.Remote', return_value=first) as mock_remote:
+            await main.create_android_driver(app_path="app.apk")
+            await main.stop_appium_driver(keep_warm=True)
+            await main.create_android_driver(app_path="app.apk", no_reset=False)
+
+        assert mock_remote.call_count == 1
+        first.execute_script.assert_called_once_with(
+            "mobile: shell", {"command": "pm", "args": ["clear", "com.example.app"]}
+        )
+        first.activate_app.assert_called_once_with("com.example.app")
+
+    @pytest.mark.asyncio
+    async def test_no_reset_only_restarts_the_app(self, make_driver):
+        """Test that reusing a session with no_reset restarts the app but keeps its data."""
+        first = make_driver("session-1")
+        with patch('main.webdriver.Remote', return_value=first):
+            await main.create_android_driver(app_path="app.apk", no_reset=True)
+            await main.stop_appium_driver(keep_warm=True)
+            await main.create_android_driver(app_path="app.apk", no_reset=True)
+
+        first.terminate_app.assert_called_once_with("com.example.app")
+        first.activate_app.assert_called_once_with("com.example.app")
+        first.execute_script.assert_not_called()
+        first.reset.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_full_reset_reinstalls_the_app(self, make_driver):
+        """Test that reusing a session with full_reset reinstalls the app."""
+        first = make_driver("session-1")
+        with patch('main.webdriver.Remote', return_value=first) as mock_remote:
+            await main.create_android_driver(app_path="app.apk", no_reset=True)
+            await main.stop_appium_driver(keep_warm=True)
+            await main.create_android_driver(app_path="app.apk", full_reset=True)
+
+        assert mock_remote.call_count == 1
+        first.reset.assert_called_once()
+        first.terminate_app.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_reset_starts_a_new_session(self, make_driver):
+        """Test that a warm session whose app cannot be reset as requested is replaced."""
+        first, second = make_driver("session-1"), make_driver("session-2")
+        first.reset.side_effect = Exception("not supported")
+        with patch('main.webdriver.Remote', side_effect=[first, second]) as mock_remote:
+            await main.create_android_driver(app_path="app.apk")
+            await main.stop_appium_driver(keep_warm=True)
+            result = await main.create_android_driver(app_path="app.apk", full_reset=True)
+
+        assert result == "Appium driver created successfully."
+        assert mock_remote.call_count == 2
+        assert main.driver is second
+        first.quit.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_different_capabilities_create_new_session(self, make_driver):
+        """Test that a pooled session is not reused for other capabilities."""
+        first, second = make_driver("session-1"), make_driver("session-2")
+        with patch('main.webdriver.Remote', side_effect=[first, second]) as mock_remote:
+            await main.create_android_driver(app_path="app.apk")
+            await main.stop_appium_driver(keep_warm=True)
+            result = await main.create_android_driver(app_path="other.apk")
+
+        assert result == "Appium driver created successfully."
+        assert mock_remote.call_count == 2
+        assert main.driver is second
+        assert len(main.session_pool) == 1
+
+    @pytest.mark.asyncio
+    async def test_reuse_can_be_disabled(self, make_driver):
+        """Test that reuse_session=False always starts a new session."""
+        first, second = make_driver("session-1"), make_driver("session-2")
+        with patch('main.webdriver.Remote', side_effect=[first, second]):
+            await main.create_android_driver(app_path="app.apk")
+            await main.stop_appium_driver(keep_warm=True)
+            await main.create_android_driver(app_path="app.apk", reuse_session=False)
+
+        assert main.driver is second
+
+    def test_dead_pooled_session_is_discarded(self, make_driver):
+        """Test that a pooled session that no longer exists is not handed out."""
+        dead = make_driver("session-1")
+        dead.execute.side_effect = Exception("invalid session id")
+        session = main.ManagedSession(dead, "http://localhost:4723", {"app": "a.apk"})
+        main.session_pool.release(session)
+
+        assert main.session_pool.acquire(session.key) is None
+        assert len(main.session_pool) == 0
+
+    def test_idle_sessions_are_evicted_after_ttl(self, make_driver):
+        """Test that sessions idle for longer than the TTL are quit."""
+        old = main.ManagedSession(make_driver("old"), "http://localhost:4723", {"app": "a.apk"})
+        fresh = main.ManagedSession(make_driver("fresh"), "http://localhost:4723", {"app": "a.apk"})
+        main.session_pool.release(old)
+        main.session_pool.release(fresh)
+        old.last_used -= 301
+
+        evicted = main.session_pool.evict_expired()
+
+        assert evicted == [old]
+        old.driver.quit.assert_called_once()
+        fresh.driver.quit.assert_not_called()
+        assert main.session_pool.sessions() == [fresh]
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestSessionPrewarming:
+    """Test class for background pre-warming of sessions."""
+
+    def setup_method(self):
+        """Start each test with a prewarmer without profiles."""
+        main.session_prewarmer = main.SessionPrewarmer()
+
+    def teardown_method(self):
+        main.session_prewarmer.profiles.clear()
+
+    def wait_for_prewarmer(self):
+        """Wait until all background session starts have finished."""
+        executor = main.session_prewarmer._executor
+        if executor is not None:
+            executor.shutdown(wait=True)
+            main.session_prewarmer._executor = None
+
+    @pytest.mark.asyncio
+    async def test_create_call_takes_prewarmed_session(self, make_driver):
+        """Test that a create call returns a pre-warmed session and a new one is started."""
+        drivers = [make_driver("warm-1"), make_driver("warm-2"), make_driver("warm-3")]
+        with patch('main.webdriver.Remote', side_effect=drivers) as mock_remote:
+            result = await main.prewarm_sessions(
+                "pixel", "android", 2, {"app_path": "app.apk", "device_name": "Pixel 7"}
+            )
+            assert result["success"] is True
+            self.wait_for_prewarmer()
+            assert main.session_prewarmer.status()["pixel"]["ready"] == 2
+
+            result = await main.create_android_driver(
+                app_path="app.apk", device_name="Pixel 7", no_reset=True
+            )
+            self.wait_for_prewarmer()
+
+        assert "reused warm session" in result
+        assert main.driver in drivers[:2]
+        assert mock_remote.call_count == 3
+        assert main.session_prewarmer.status()["pixel"]["ready"] == 2
+
+    @pytest.mark.asyncio
+    async def test_prewarmed_sessions_outlive_the_pool_ttl(self, make_driver):
+        """Test that pre-warmed sessions ask the server not to expire them while idle."""
+        with patch('main.webdriver.Remote', return_value=make_driver("warm-1")) as mock_remote:
+            await main.prewarm_sessions("pixel", "android", 1, {"app_path": "app.apk"})
+            self.wait_for_prewarmer()
+
+        options = mock_remote.call_args.kwargs["options"]
+        assert options.new_command_timeout.total_seconds() >= main.session_pool.idle_ttl
+
+    @pytest.mark.asyncio
+    async def test_unclaimed_prewarmed_sessions_are_not_reaped(self, make_driver):
+        """Test that idle eviction keeps unclaimed prewarmed sessions, and replacements follow max_age."""
+        drivers = [make_driver("warm-1"), make_driver("warm-2")]
+        reaper = main.SessionReaper(interval=0, idle_ttl=1800, max_age=3600)
+        with patch('main.webdriver.Remote', side_effect=drivers) as mock_remote:
+            await main.prewarm_sessions("pixel", "android", 1, {"app_path": "app.apk"})
+            self.wait_for_prewarmer()
+
+            now = time.time() + main.session_pool.idle_ttl + 60
+            assert reaper.reap(now) == []
+            assert main.session_prewarmer.status()["pixel"]["ready"] == 1
+            drivers[0].quit.assert_not_called()
+
+            reclaimed = reaper.reap(time.time() + 7200)
+            self.wait_for_prewarmer()
+
+        assert [entry["reason"] for entry in reclaimed] == ["max_age"]
+        assert mock_remote.call_count == 2
+        assert [session.session_id for session in main.session_pool.sessions()] == ["warm-2"]
+
+    @pytest.mark.asyncio
+    async def test_released_sessions_still_expire(self, make_driver):
+        """Test that a claimed prewarmed session returned to the pool expires like any other."""
+        with patch('main.webdriver.Remote', side_effect=[make_driver("warm-1"), make_driver("warm-2")]):
+            await main.prewarm_sessions("pixel", "android", 1, {"app_path": "app.apk"})
+            self.wait_for_prewarmer()
+            main.session_prewarmer.remove("pixel")
+            await main.create_android_driver(app_path="app.apk", no_reset=True)
+            await main.stop_appium_driver(keep_warm=True)
+
+        expired = main.session_pool.evict_expired(time.time() + main.session_pool.idle_ttl + 60)
+        assert [session.session_id for session in expired] == ["warm-1"]
+
+    @pytest.mark.asyncio
+    async def test_failed_prewarm_is_reported_and_backs_off(self):
+        """Test that a failing profile records the error and is not retried immediately."""
+        with patch('main.webdriver.Remote', side_effect=Exception("device offline")) as mock_remote:
+            await main.prewarm_sessions("pixel", "android", 1, {"app_path": "app.apk"})
+            self.wait_for_prewarmer()
+            main.session_prewarmer.replenish()
+            self.wait_for_prewarmer()
+
+        status = (await main.get_prewarm_status())["profiles"]["pixel"]
+        assert status["failures"] == 1
+        assert status["last_error"] == "device offline"
+        assert mock_remote.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_and_removed_profiles(self):
+        """Test profile validation and removal."""
+        result = await main.prewarm_sessions("bad", "android", 1, {})
+        assert "Either app_path" in result["error"]
+
+        result = await main.prewarm_sessions("missing", count=0)
+        assert result["success"] is False
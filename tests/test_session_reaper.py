@@ -0,0 +1,103 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+import main
+
+
+def make_session(session_id, device_name="emulator-5554"):
+    """Create a managed session around a mock driver."""
+    mock_driver = MagicMock()
+    mock_driver.session_id = session_id
+    mock_driver.capabilities = {"appPackage": "com.example.app"}
+    return main.ManagedSession(
+        mock_driver, "http://localhost:4723", {"platformName": "Android", "appium:deviceName": device_name}
+    )
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestSessionReaper:
+    """Test class for the idle session reaper and session limits."""
+
+    def setup_method(self):
+        """Start each test with a reaper with known limits."""
+        self.reaper = main.session_reaper
+        main.session_reaper = main.SessionReaper(interval=0, idle_ttl=600, max_sessions=2, max_age=3600)
+
+    def teardown_method(self):
+        main.session_reaper = self.reaper
+
+    def test_idle_and_old_sessions_are_reaped(self):
+        """Test that abandoned, expired and dead sessions are quit and reported."""
+        idle, old, busy, dead = (make_session(name, name) for name in ("idle", "old", "busy", "dead"))
+        main.activate_session(busy)
+        for session in (idle, old, dead):
+            main.open_sessions[session.session_id] = session
+        now = busy.last_used + 60
+        idle.last_used = now - 601
+        old.created_at = now - 3601
+        dead.dead = True
+
+        reclaimed = main.session_reaper.reap(now=now)
+
+        assert {entry["session_id"]: entry["reason"] for entry in reclaimed} == {
+            "idle": "idle", "old": "max_age", "dead": "dead",
+        }
+        assert reclaimed[0]["device_name"] == "idle"
+        idle.driver.quit.assert_called_once()
+        old.driver.quit.assert_called_once()
+        dead.driver.quit.assert_not_called()
+        assert list(main.open_sessions) == ["busy"]
+        assert main.driver is busy.driver
+
+    def test_abandoned_active_session_is_released(self):
+        """Test that reaping the current session leaves no driver behind."""
+        session = make_session("s1")
+        main.activate_session(session)
+
+        main.session_reaper.reap(now=session.last_used + 601)
+
+        assert main.driver is None
+        assert main.active_session is None
+        session.driver.quit.assert_called_once()
+
+    def test_session_limit_evicts_pooled_sessions_first(self):
+        """Test that the limit frees pooled sessions before refusing new ones."""
+        main.activate_session(make_session("open"))
+        pooled = make_session("pooled")
+        main.session_pool.release(pooled)
+        lock_held = []
+        pooled.driver.quit.side_effect = lambda: lock_held.append(main.session_reaper._lock.locked())
+
+        with main.session_reaper.reserve():
+            pass
+
+        pooled.driver.quit.assert_called_once()
+        assert lock_held == [False]
+        assert len(main.session_pool) == 0
+        assert main.session_reaper.reclaimed[-1]["reason"] == "limit"
+
+    @pytest.mark.asyncio
+    async def test_session_limit_refuses_new_sessions(self):
+        """Test that creating a session beyond the limit fails with a clear error."""
+        main.activate_session(make_session("a"))
+        main.open_sessions["b"] = make_session("b")
+
+        with patch('main.webdriver.Remote') as mock_remote:
+            result = await main.create_android_driver(app_path="app.apk", reuse_session=False)
+
+        mock_remote.assert_not_called()
+        assert "Session limit of 2 reached" in result
+
+    @pytest.mark.asyncio
+    async def test_reap_sessions_tool(self):
+        """Test that the tool reports reclaimed sessions and the limits."""
+        main.open_sessions["s1"] = session = make_session("s1")
+        session.last_used -= 601
+
+        result = await main.reap_sessions()
+
+        assert result["success"] is True
+        assert result["reclaimed"][0]["session_id"] == "s1"
+        assert result["recently_reclaimed"] == result["reclaimed"]
+        assert result["live_sessions"] == 0
+        assert result["limits"]["max_sessions"] == 2
@@ -0,0 +1,128 @@
+import os
+import pytest
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import main
+
+
+def exited_pid():
+    """Process id of a process that is no longer running."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def record(state, pid, last_used=None):
+    return {
+        "server_url": "http://localhost:4723",
+        "capabilities": {"platformName": "Android", "appium:app": "a.apk"},
+        "session_capabilities": {"appPackage": "com.example.app"},
+        "created_at": time.time() - 60,
+        "last_used": time.time() - 10 if last_used is None else last_used,
+        "state": state,
+        "pid": pid,
+    }
+
+
+@pytest.mark.usefixtures("no_sessions")
+class TestSessionStore:
+    """Test class for persisting sessions and reattaching to them after a restart."""
+
+    def setup_method(self):
+        """Start each test with an empty session store."""
+        main.write_state_file(main.SessionStore.FILE_NAME, {})
+
+    def teardown_method(self):
+        main.write_state_file(main.SessionStore.FILE_NAME, {})
+
+    def test_sessions_are_persisted(self, make_driver):
+        """Test that open and pooled sessions are recorded with their role."""
+        other_server = {"other": record("active", os.getppid())}
+        main.write_state_file(main.SessionStore.FILE_NAME, other_server)
+        active = main.ManagedSession(make_driver("s1"), "http://localhost:4723", {"app": "a.apk"})
+        pooled = main.ManagedSession(make_driver("s2"), "http://localhost:4723", {"app": "a.apk"})
+
+        main.activate_session(active)
+        main.session_pool.release(pooled)
+        main.session_store.save()
+
+        records = main.session_store.load()
+        assert records["s1"]["state"] == "active"
+        assert records["s1"]["server_url"] == "http://localhost:4723"
+        assert records["s2"]["state"] == "pooled"
+        assert records["s2"]["pid"] == os.getpid()
+        # Sessions of another server that is still running are kept
+        assert records["other"]["pid"] == os.getppid()
+
+    def test_restore_reattaches_and_reaps_orphans(self, make_driver):
+        """Test that a restarted server adopts live sessions and cleans up the rest."""
+        dead_pid = exited_pid()
+        main.write_state_file(main.SessionStore.FILE_NAME, {
+            "active": record("active", dead_pid),
+            "pooled": record("pooled", dead_pid),
+            "gone": record("open", dead_pid),
+            "stale": record("open", dead_pid, last_used=time.time() - 3600),
+            "running": record("active", os.getppid()),
+        })
+        drivers = {session_id: make_driver(session_id) for session_id in ("active", "pooled", "gone", "stale")}
+        drivers["gone"].execute.side_effect = Exception("invalid session id")
+
+        def attach(server_url, session_id, capabilities):
+            return drivers[session_id]
+
+        with patch('main.AttachedRemote', side_effect=attach) as mock_attach:
+            result = main.session_store.restore()
+
+        assert sorted(result["reattached"]) == ["active", "pooled"]
+        assert result["reaped"] == ["stale"]
+        assert result["gone"] == ["gone"]
+        assert mock_attach.call_count == 4
+        drivers["stale"].quit.assert_called_once()
+        assert main.driver is drivers["active"]
+        assert main.active_session.reattached is True
+        assert [session.session_id for session in main.session_pool.sessions()] == ["pooled"]
+
+        records = main.session_store.load()
+        assert sorted(records) == ["active", "pooled", "running"]
+        assert records["active"]["pid"] == os.getpid()
+
+    def test_sessions_in_use_survive_a_restart(self, make_driver):
+        """Test that using a session records its last use, so a restart reattaches instead of reaping it."""
+        session = main.ManagedSession(make_driver("busy"), "http://localhost:4723", {"app": "a.apk"})
+        session.created_at = time.time() - 600
+        main.activate_session(session)
+        session.last_used = session.persisted_at = time.time() - 600
+        main.session_store.save()
+        session.last_used = session.persisted_at = time.time() - 600
+
+        session.touch()
+        last_used = main.session_store.load()["busy"]["last_used"]
+        assert time.time() - last_used < 5
+        session.touch()
+        assert main.session_store.load()["busy"]["last_used"] == last_used  # throttled
+
+        records = main.session_store.load()
+        records["busy"]["pid"] = exited_pid()
+        main.write_state_file(main.SessionStore.FILE_NAME, records)
+        main.open_sessions.clear()
+        main.driver = None
+        main.active_session = None
+        with patch('main.AttachedRemote', return_value=make_driver("busy")):
+            result = main.session_store.restore()
+
+        assert result["reattached"] == ["busy"]
+        assert result["reaped"] == []
+
+    def test_attached_driver_does_not_create_a_session(self):
+        """Test that the reattaching client takes over the recorded session id."""
+        with patch('main.AttachedRemote.execute') as mock_execute:
+            attached = main.AttachedRemote(
+                "http://localhost:4723", "abc", {"platformName": "Android"}
+            )
+
+        mock_execute.assert_not_called()
+        assert attached.session_id == "abc"
+        assert attached.capabilities == {"platformName": "Android"}
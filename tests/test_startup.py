@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import pytest
+
+import main
+from benchmarks.startup import first_response, import_profile, server_env
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class TestStartup:
+    """Test class for lazy imports and server cold start."""
+
+    def test_import_does_not_load_webdriver(self, tmp_path):
+        """Test that importing main leaves Appium and Selenium unimported."""
+        env = dict(os.environ, APPIUM_MCP_STATE_DIR=str(tmp_path), APPIUM_MCP_LOG_FILE="")
+        code = (
+            "import sys, main; "
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('appium', 'selenium')))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_lazy_names_resolve_from_outside(self):
+        """Test that main.AppiumBy and friends import on first attribute access."""
+        from appium.webdriver.common.appiumby import AppiumBy
+        from selenium.webdriver.support import expected_conditions
+
+        assert main.AppiumBy is AppiumBy
+        assert main.EC is expected_conditions
+        assert issubclass(main.AttachedRemote, main.webdriver.Remote)
+        with pytest.raises(AttributeError):
+            main.not_a_module_attribute
+
+    def test_startup_benchmark(self, tmp_path):
+        """Test that the startup benchmark measures imports and the first response."""
+        env = dict(server_env(), APPIUM_MCP_STATE_DIR=str(tmp_path), APPIUM_MCP_LOG_FILE="")
+
+        profile = import_profile(env)
+        response = first_response(env)
+
+        assert profile["total_ms"] > 0
+        assert "mcp.server.fastmcp" in profile["modules"]
+        assert not any(name.startswith("appium") for name in profile["modules"])
+        assert 0 < response["initialize_ms"] <= response["list_tools_ms"]
+        assert response["tools"] == len(main.mcp._tool_manager.list_tools())
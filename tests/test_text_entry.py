@@ -0,0 +1,113 @@
+import pytest
+from unittest.mock import patch
+from selenium.common.exceptions import WebDriverException
+
+import main
+from benchmarks.fake_appium import APP_PACKAGE
+from benchmarks.text_entry import run_text_entry
+
+USERNAME = {"by": "id", "value": f"{APP_PACKAGE}:id/username"}
+
+
+class TestTextEntry:
+    """Test class for the set_text entry modes."""
+
+    @pytest.fixture(autouse=True)
+    def connect(self, fake_appium):
+        """Connect a real WebDriver client to the fake backend in-process."""
+        self.backend, self.driver = fake_appium()
+
+    def field_text(self):
+        return self.driver.find_element(main.AppiumBy.ID, USERNAME["value"]).text
+
+    @pytest.mark.asyncio
+    async def test_auto_mode_replaces_and_verifies(self):
+        """Test that auto mode uses replaceElementValue on Android and checks the field."""
+        result = await main.set_text(text="user@example.com", **USERNAME)
+        assert (result["mode"], result["verified"]) == ("replace", True)
+
+        result = await main.set_text(text=".org", clear_first=False, **USERNAME)
+        assert result["mode"] == "replace"
+        assert self.field_text() == "user@example.com.org"
+
+        result = await main.set_text(text="typed", mode="keys", **USERNAME)
+        assert (result["mode"], result["verified"]) == ("keys", False)
+        assert self.field_text() == "typed"
+
+    @pytest.mark.asyncio
+    async def test_auto_mode_falls_back(self):
+        """Test that a rejected fast mode is skipped from then on and the next one used."""
+        execute_script = self.driver.execute_script
+        calls = []
+
+        def without_replace(script, *args):
+            calls.append(script)
+            if script == "mobile: replaceElementValue":
+                raise WebDriverException("Unknown mobile command")
+            return execute_script(script, *args)
+
+        with patch.object(self.driver, "execute_script", side_effect=without_replace):
+            first = await main.set_text(text="pasted", **USERNAME)
+            second = await main.set_text(text="pasted again", **USERNAME)
+            explicit = await main.set_text(text="x", mode="replace", **USERNAME)
+
+        assert (first["mode"], first["verified"]) == ("clipboard", True)
+        assert second["mode"] == "clipboard"
+        assert calls.count("mobile: replaceElementValue") == 2
+        assert "Unknown mobile command" in explicit["error"]
+        assert self.field_text() == "pasted again"
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_do_not_disable_a_mode(self):
+        """Test that only a driver without the command marks a mode unsupported."""
+        execute_script = self.driver.execute_script
+
+        def flaky_replace(script, *args):
+            if script == "mobile: replaceElementValue":
+                raise WebDriverException("UiAutomator2 instrumentation process is not running")
+            return execute_script(script, *args)
+
+        with patch.object(self.driver, "execute_script", side_effect=flaky_replace):
+            first = await main.set_text(text="pasted", **USERNAME)
+        second = await main.set_text(text="replaced", **USERNAME)
+
+        assert first["mode"] == "clipboard"
+        assert second["mode"] == "replace"
+        assert self.field_text() == "replaced"
+
+    @pytest.mark.asyncio
+    async def test_fallback_does_not_append_twice(self):
+        """Test that typing after a failed fast mode rewrites the field instead of appending to it."""
+        await main.set_text(text="user", mode="keys", **USERNAME)
+
+        def reformat(element, text, mode):
+            element.clear()
+            element.send_keys(text.upper())
+
+        with patch('main.write_text', side_effect=reformat):
+            result = await main.set_text(text="name", clear_first=False, **USERNAME)
+
+        assert result["mode"] == "keys"
+        assert self.field_text() == "username"
+
+    @pytest.mark.asyncio
+    async def test_verification(self):
+        """Test that a fast mode that leaves the wrong text is reported, masked fields excepted."""
+        with patch('main.write_text'):
+            result = await main.set_text(text="hello", mode="replace", **USERNAME)
+        assert "field shows 0 characters that do not match" in result["error"]
+        assert "hello" not in result["error"]
+
+        assert "Unknown text entry mode" in (await main.set_text(text="a", mode="fast", **USERNAME))["error"]
+        assert main.text_matches("•••••", "hello")
+        assert not main.text_matches("••••", "hello")
+
+    @pytest.mark.asyncio
+    async def test_text_entry_benchmark(self):
+        """Test that every mode enters the text correctly in the benchmark."""
+        with patch('main.driver', None):
+            results = await run_text_entry([10, 100], runs=1, latency_ms=0, key_latency_ms=0)
+
+        assert len(results) == 8
+        assert all(row["correct"] for row in results)
+        assert {row["used"] for row in results if row["mode"] == "auto"} == {"replace"}
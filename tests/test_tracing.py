@@ -0,0 +1,114 @@
+import pytest
+import json
+from unittest.mock import patch, MagicMock
+from selenium.webdriver.support.ui import WebDriverWait
+
+import main
+
+
+class ListExporter(main.SpanExporter):
+    """Exporter that keeps exported traces in memory."""
+
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(list(spans))
+
+
+class TestTracing:
+    """Test class for the trace spans and exporters."""
+
+    def setup_method(self):
+        """Install an in-memory exporter before each test."""
+        self.exporter = ListExporter()
+        main.tracer.set_exporter(self.exporter)
+
+    def teardown_method(self):
+        """Disable tracing again after each test."""
+        main.tracer.set_exporter(None)
+
+    def test_spans_are_nested_under_the_tool_call(self):
+        """Test that wait and WebDriver command spans share the tool call's trace."""
+        mock_driver = MagicMock()
+        mock_driver.execute.return_value = {"value": {"ELEMENT": "1"}}
+        main.instrument_driver(mock_driver)
+
+        with patch('main.driver', mock_driver), \
+             patch('main.WebDriverWait', WebDriverWait):
+            with main.tracer.start_span("tool find_element"):
+                main.wait_until(
+                    lambda d: d.execute("findElement", {"using": "id", "value": "login"}), 1
+                )
+
+        assert len(self.exporter.traces) == 1
+        command, wait, tool = self.exporter.traces[0]
+        assert tool.parent_id is None
+        assert wait.parent_id == tool.span_id
+        assert command.parent_id == wait.span_id
+        assert command.trace_id == tool.trace_id
+        assert command.kind == "client"
+        assert command.attributes["webdriver.command"] == "findElement"
+        assert command.attributes["webdriver.value"] == "login"
+
+    @pytest.mark.asyncio
+    async def test_tool_span_attributes_and_error(self):
+        """Test that a failing tool call records locator attributes and an error status."""
+        mock_driver = MagicMock()
+        mock_driver.session_id = "session-1"
+        mock_driver.capabilities = {"deviceName": "Pixel 7", "platformName": "Android"}
+
+        with patch('main.driver', mock_driver), \
+             patch('main.WebDriverWait', side_effect=Exception("Test error")):
+            result = await main.find_element("id", "login")
+
+        assert "error" in result
+        wait, tool = self.exporter.traces[0]
+        assert tool.name == "tool find_element"
+        assert tool.attributes["appium.locator.by"] == "id"
+        assert tool.attributes["appium.locator.value"] == "login"
+        assert tool.attributes["appium.session_id"] == "session-1"
+        assert tool.attributes["appium.device"] == "Pixel 7"
+        assert tool.error == "Test error"
+        assert "Test error" in wait.error
+
+    def test_disabled_tracer_records_nothing(self):
+        """Test that no spans are created when tracing is off."""
+        main.tracer.set_exporter(None)
+
+        with main.tracer.start_span("tool go_back") as span:
+            assert span is None
+
+        assert self.exporter.traces == []
+
+    def test_otlp_json_file_exporter(self, tmp_path):
+        """Test that the file exporter writes one OTLP/JSON request per trace."""
+        path = tmp_path / "traces.jsonl"
+        main.tracer.set_exporter(main.OTLPJsonFileExporter(str(path)))
+
+        with main.tracer.start_span("tool tap_element", {"appium.locator.by": "id", "retries": 2}):
+            with main.tracer.start_span("webdriver click", kind="client"):
+                pass
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 1
+        request = json.loads(lines[0])
+        spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [span["name"] for span in spans] == ["webdriver click", "tool tap_element"]
+        assert len(spans[1]["traceId"]) == 32
+        assert len(spans[1]["spanId"]) == 16
+        assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+        assert spans[0]["kind"] == 3
+        assert {"key": "retries", "value": {"intValue": "2"}} in spans[1]["attributes"]
+        assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
+
+    @pytest.mark.asyncio
+    async def test_configure_tracing_tool(self, tmp_path):
+        """Test enabling and disabling tracing through the tool."""
+        result = await main.configure_tracing(path=str(tmp_path / "out.jsonl"))
+        assert result["success"] is True
+        assert main.tracer.enabled
+
+        result = await main.configure_tracing(enabled=False)
+        assert result["success"] is True
+        assert not main.tracer.enabled